@@ -17,11 +17,33 @@ import traceback
 import contextlib
 import itertools
 import errno
+import array
+import atexit
+import codecs
+import mmap
+import struct
+import binascii
+import zlib
+import hashlib
+import functools
+import json
+import marshal
+import types
+import threading
+import pickle
+import tempfile
+import multiprocessing
 
 from subprocess import Popen, PIPE
 
+try:
+    import queue
+except ImportError:  ## pragma: no cover
+    import Queue as queue  ## python 2
+
 try:
     import pystache
+    import pystache.context
 except ImportError:  ## pragma: no cover
     pystache = None
 
@@ -364,18 +386,60 @@ def load_config_file(filename, default_filename=None,
 
 @available_in_config
 class TextProc(object):
+    r"""Text processing stage, chained with others through ``|``
+
+    Chains are flattened in one ``TextPipeline`` applying the list of
+    their stages in a row:
 
-    def __init__(self, fun):
+        >>> pipeline = strip | ReSub(r'^new: ', '') | noop | ucfirst
+        >>> pipeline.describe()
+        ['strip', "ReSub('^new: ', '')", 'ucfirst']
+        >>> pipeline("  new: foo ")
+        'Foo'
+        >>> pipeline.map(["new: foo", "bar"])
+        ['Foo', 'Bar']
+
+    """
+
+    def __init__(self, fun, label=None, idempotent=False, pure=True):
         self.fun = fun
         if hasattr(fun, "__name__"):
             self.__name__ = fun.__name__
+        self.label = label or getattr(fun, "__name__", repr(fun))
+        ## applying it twice in a row gives the same result than once
+        self.idempotent = idempotent
+        ## result depends only on the text, and it has no side effects
+        self.pure = pure
+
+    @property
+    def stages(self):
+        return (self, )
 
     def __call__(self, text):
         return self.fun(text)
 
+    def map(self, texts):
+        """Return the list of the processed ``texts``"""
+        funs = [stage.fun for stage in self.stages]
+        processed = []
+        for text in texts:
+            for fun in funs:
+                text = fun(text)
+            processed.append(text)
+        return processed
+
+    def describe(self):
+        """Return the list of the labels of the stages"""
+        return [stage.label for stage in self.stages]
+
+    def memoizers(self):
+        """Return the list of ``Memoize`` stages, nested ones included"""
+        return [memoizer for stage in self.stages if stage is not self
+                for memoizer in stage.memoizers()]
+
     def __or__(self, value):
         if isinstance(value, TextProc):
-            return TextProc(lambda text: value.fun(self.fun(text)))
+            return TextPipeline(self.stages + value.stages)
         import inspect
         (_frame, filename, lineno, _function_name, lines, _index) = \
                 inspect.stack()[1]
@@ -385,6 +449,111 @@ class TextProc(object):
              % (value, indent("".join(lines).strip(), "  | "))))
 
 
+class TextPipeline(TextProc):
+    """Flat list of ``TextProc`` stages, applied in order
+
+    ``noop`` stages are dropped, and a stage following itself is
+    applied only once when it is idempotent (as ``strip``).
+
+    """
+
+    def __init__(self, stages):
+        fused = []
+        for stage in stages:
+            if stage is noop or \
+                   (fused and fused[-1] is stage and stage.idempotent):
+                continue
+            fused.append(stage)
+        self._stages = tuple(fused)
+        self.fun = self.__call__
+        self.label = " | ".join(self.describe())
+        self.idempotent = False
+        self.pure = all(stage.pure for stage in fused)
+
+    @property
+    def stages(self):
+        return self._stages
+
+    def __call__(self, text):
+        for stage in self._stages:
+            text = stage.fun(text)
+        return text
+
+
+@available_in_config
+class Memoize(TextProc):
+    r"""Cache results of a ``TextProc`` for the last texts seen
+
+    Histories have many identical subjects or bodies (empty ones, merge
+    commits, bots' commits...), so ``process`` is applied only once to
+    each of the last ``maxsize`` distinct texts (``None`` for no limit):
+
+        >>> process = Memoize(strip | ucfirst, maxsize=2)
+        >>> process.map(["a", "b", "a", "c", "b", "c"])
+        ['A', 'B', 'A', 'C', 'B', 'C']
+        >>> sorted(process.stats().items())
+        [('hits', 2), ('maxsize', 2), ('misses', 4), ('size', 2)]
+
+    Memoized stages of a chain are listed by its ``memoizers()``:
+
+        >>> (strip | process).memoizers() == [process]
+        True
+
+    Stages with side effects, or depending on other things than the text,
+    must be declared with ``TextProc(fun, pure=False)``: stages of
+    ``process`` from the first one of these are always applied.
+
+    It counts as one stage in a bigger chain.
+
+    """
+
+    def __init__(self, process, maxsize=1024):
+        stages = process.stages if isinstance(process, TextProc) \
+                 else (TextProc(process), )
+        nb_pure = 0
+        while nb_pure < len(stages) and stages[nb_pure].pure:
+            nb_pure += 1
+        self._cached = TextPipeline(stages[:nb_pure])
+        self._uncached = TextPipeline(stages[nb_pure:])
+        self.maxsize = maxsize
+        self._cache = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.fun = self.__call__
+        self.label = "Memoize(%s, maxsize=%r)" % (
+            TextPipeline(stages).label, maxsize)
+        self.idempotent = False
+        self.pure = self._uncached.pure
+
+    def __call__(self, text):
+        cache = self._cache
+        try:
+            result = cache.pop(text)  ## re-inserted as most recent
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            result = self._cached(text)
+            if self.maxsize is not None and len(cache) >= self.maxsize:
+                if not cache:  ## ``maxsize`` is 0
+                    return self._uncached(result)
+                cache.popitem(last=False)  ## least recently used
+        cache[text] = result
+        return self._uncached(result)
+
+    def memoizers(self):
+        return [self] + self._cached.memoizers() + \
+            self._uncached.memoizers()
+
+    def stats(self):
+        """Return cache usage counters"""
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self._cache), "maxsize": self.maxsize}
+
+    def clear(self):
+        self._cache.clear()
+        self.hits = self.misses = 0
+
+
 def set_if_empty(text, msg="No commit message."):
     if len(text):
         return text
@@ -427,13 +596,64 @@ def indent(text, chars="  ", first=None):
       This is second line
 
     """
+    lines = text.split("\n")
     if first:
-        first_line = text.split("\n")[0]
-        rest = '\n'.join(text.split("\n")[1:])
-        return '\n'.join([(first + first_line).rstrip(),
-                          indent(rest, chars=chars)])
-    return '\n'.join([(chars + line).rstrip()
-                      for line in text.split('\n')])
+        ## an empty rest is still indented as an empty line
+        return '\n'.join([(first + lines[0]).rstrip()] +
+                         [(chars + line).rstrip()
+                          for line in lines[1:] or [""]])
+    return '\n'.join([(chars + line).rstrip() for line in lines])
+
+
+## chars ``textwrap`` turns into spaces (tabs are expanded)
+REGEX_WRAP_WHITESPACE = re.compile(r'[\n\x0b\x0c\r]')
+REGEX_WRAP_SPACES = re.compile(r'( +)')
+## tabs, hyphens, and other whitespaces (they don't separate words, but
+## ``textwrap`` drops them at line ends as ``str.strip()`` does)
+REGEX_WRAP_UNSUPPORTED = re.compile(
+    r'[-\t]|[^\S\n\x0b\x0c\r ]', re.UNICODE)
+
+
+def wrap_text(text, width=70, **kwargs):
+    """Return the same list of lines as ``textwrap.wrap()``, faster
+
+    Texts with tabs, hyphens (that ``textwrap`` can break lines after),
+    non-ASCII whitespaces or words longer than ``width`` (that are
+    broken), and calls with other ``textwrap.TextWrapper`` options, are
+    left to ``textwrap.wrap()``.
+
+        >>> wrap_text("  short subject ")
+        ['  short subject']
+        >>> wrap_text("a few words to wrap", width=8)
+        ['a few', 'words to', 'wrap']
+
+    """
+    if kwargs or REGEX_WRAP_UNSUPPORTED.search(text):
+        return textwrap.wrap(text, width, **kwargs)
+    text = REGEX_WRAP_WHITESPACE.sub(" ", text)
+    if len(text) <= width:
+        ## only the trailing spaces are dropped on the first line
+        text = text.rstrip(" ")
+        return [text] if text else []
+    chunks = [chunk for chunk in REGEX_WRAP_SPACES.split(text) if chunk]
+    if any(len(chunk) > width for chunk in chunks):
+        return textwrap.wrap(text, width)
+
+    ## greedy filling of lines with chunks, as ``TextWrapper`` does
+    lines = []
+    idx, nb_chunks = 0, len(chunks)
+    while idx < nb_chunks:
+        if lines and chunks[idx][0] == " ":
+            idx += 1  ## spaces are dropped at the start of next lines
+            continue
+        start, line_len = idx, 0
+        while idx < nb_chunks and line_len + len(chunks[idx]) <= width:
+            line_len += len(chunks[idx])
+            idx += 1
+        end = idx - 1 if idx > start and chunks[idx - 1][0] == " " else idx
+        if end > start:
+            lines.append("".join(chunks[start:end]))
+    return lines
 
 
 def paragraph_wrap(text, regexp="\n\n"):
@@ -450,22 +670,56 @@ def paragraph_wrap(text, regexp="\n\n"):
     Notice that that each paragraph has been wrapped separately.
 
     """
-    regexp = re.compile(regexp, re.MULTILINE)
-    return "\n".join("\n".join(textwrap.wrap(paragraph.strip()))
+    if isinstance(regexp, basestring):
+        regexp = re.compile(regexp, re.MULTILINE)
+    return "\n".join("\n".join(wrap_text(paragraph.strip()))
                      for paragraph in regexp.split(text)).strip()
 
 
-def curryfy(f):
-    return lambda *a, **kw: TextProc(lambda txt: f(txt, *a, **kw))
+def call_label(name, args, kwargs):
+    return "%s(%s)" % (name, ", ".join(
+        [repr(arg) for arg in args] +
+        ["%s=%r" % (key, kwargs[key]) for key in sorted(kwargs)]))
+
+
+def curryfy(f, name=None):
+    return lambda *a, **kw: TextProc(
+        lambda txt: f(txt, *a, **kw),
+        label=call_label(name or f.__name__, a, kw))
 
 ## these are curryfied version of their lower case definition
 
-Indent = curryfy(indent)
-Wrap = curryfy(paragraph_wrap)
-ReSub = lambda p, r, **k: TextProc(lambda txt: re.sub(p, r, txt, **k))
-noop = TextProc(lambda txt: txt)
-strip = TextProc(lambda txt: txt.strip())
-SetIfEmpty = curryfy(set_if_empty)
+Indent = curryfy(indent, "Indent")
+SetIfEmpty = curryfy(set_if_empty, "SetIfEmpty")
+
+
+def Wrap(regexp="\n\n"):
+    ## regexes are compiled once, and not at each call
+    compiled = re.compile(regexp, re.MULTILINE)
+    return TextProc(lambda txt: paragraph_wrap(txt, compiled),
+                    label=call_label("Wrap", (regexp, ), {}))
+
+
+def ReSub(pattern, replacement, **kwargs):
+    label = call_label("ReSub", (pattern, replacement), kwargs)
+    regexp = re.compile(pattern, kwargs.pop("flags", 0))
+    count = kwargs.pop("count", 0)
+    if kwargs:
+        raise TypeError("ReSub() got unexpected keyword arguments %s"
+                        % ", ".join(sorted(kwargs)))
+    return TextProc(lambda txt: regexp.sub(replacement, txt, count),
+                    label=label)
+
+
+def text_map(process, texts):
+    """Return the list of ``texts`` processed by callable ``process``"""
+    if isinstance(process, TextProc):
+        return process.map(texts)
+    return [process(text) for text in texts]
+
+
+noop = TextProc(lambda txt: txt, label="noop")
+strip = TextProc(lambda txt: txt.strip(), label="strip", idempotent=True)
 
 for _label in ("Indent", "Wrap", "ReSub", "noop", "final_dot",
               "ucfirst", "strip", "SetIfEmpty"):
@@ -598,26 +852,70 @@ class Phile(object):
 
     """
 
+    ## reading more than a pipe can hold at once is useless
+    MAX_BUFFERSIZE = 65536
+
     def __init__(self, filename, buffersize=4096, encoding=_preferred_encoding):
         self._file = filename
         self._buffersize = buffersize
         self._encoding = encoding
 
+    def _chunks(self):
+        """Iterate through decoded chunks of the file
+
+        Bytes are read in a reused buffer, and decoded incrementally so
+        that multi-bytes chars can span chunks. Buffer size doubles
+        each time the caller asks for more.
+
+        """
+        decoder = codecs.getincrementaldecoder(self._encoding)()
+        readinto = getattr(self._file, "readinto", None)
+        size = self._buffersize
+        buf = bytearray(size)
+        view = memoryview(buf)
+        while True:
+            if readinto is None:
+                data = self._file.read(size)
+                length = len(data)
+            else:
+                length = readinto(view[:size])
+                data = view[:length]
+            if not length:
+                yield decoder.decode(b"", True)
+                return
+            grow = yield decoder.decode(data)
+            if grow and size < self.MAX_BUFFERSIZE:
+                size = min(size * 2, self.MAX_BUFFERSIZE)
+                if size > len(buf):
+                    buf = bytearray(size)
+                    view = memoryview(buf)
+
     def read(self, delimiter="\n"):
-        buf = ""
-        if PY3:
-            delimiter = delimiter.encode(_preferred_encoding)
-            buf = buf.encode(_preferred_encoding)
+        ## pieces of current record are only joined once it is complete
+        pending = []
+        chunks = self._chunks()
+        text = next(chunks)
         while True:
-            chunk = self._file.read(self._buffersize)
-            if not chunk:
-                yield buf.decode(self._encoding)
+            overlap = len(delimiter) - 1
+            if pending and overlap:
+                ## delimiter could span the previous chunk
+                text = pending[-1][-overlap:] + text
+                pending[-1] = pending[-1][:-overlap]
+            records = text.split(delimiter)
+            if len(records) == 1:
+                pending.append(text)
+            else:
+                pending.append(records[0])
+                yield "".join(pending)
+                for record in records[1:-1]:
+                    yield record
+                pending = [records[-1]]
+            try:
+                ## records bigger than the buffer: read bigger chunks
+                text = chunks.send(len(records) == 1)
+            except StopIteration:
+                yield "".join(pending)
                 return
-            records = chunk.split(delimiter)
-            records[0] = buf + records[0]
-            for record in records[:-1]:
-                yield record.decode(self._encoding)
-            buf = records[-1]
 
     def write(self, buf):
         if PY3:
@@ -642,6 +940,19 @@ class Proc(Popen):
         self.stderr = Phile(self.stderr, encoding=encoding)
 
 
+def terminate(proc):
+    """Stop ``proc`` if it is still running, and reap it"""
+    if proc.poll() is None:
+        try:
+            proc.terminate()
+        except OSError:  ## already exited
+            pass
+    for stream in (proc.stdin, proc.stdout, proc.stderr):
+        if stream is not None:
+            stream.close()
+    proc.wait()
+
+
 def cmd(command, env=None, shell=True):
 
     p = Popen(command, shell=shell,
@@ -740,13 +1051,1037 @@ GIT_FORMAT_KEYS = {
 
 GIT_FULL_FORMAT_STRING = "%x00".join(GIT_FORMAT_KEYS.values())
 
+## ``git log`` fields needed by ``versions_data_iter`` itself
+GIT_LOG_BASE_FIELDS = ("sha1", "subject", "author_name", "author_email",
+                       "body")
+
+## ``git log`` fields needed by computed commit values
+GIT_LOG_FIELD_DEPENDENCIES = {
+    "identifier": ("sha1", ),
+    "date": ("author_date_timestamp", ),
+    "authors": ("author_name", "author_email", "body"),
+    "author_names": ("author_name", "author_email", "body"),
+    "author_names_joined": ("author_name", "author_email", "body"),
+    "body_indented": ("body", ),
+}
+
+
+def git_log_fields(names):
+    """Return ``git log`` fields needed to provide given attribute names
+
+    Unknown names are ignored, fields are in ``GIT_FORMAT_KEYS`` order:
+
+        >>> git_log_fields(["date", "subject", "foo"])
+        ('subject', 'author_date_timestamp')
+
+    """
+    fields = set()
+    for name in names:
+        if name in GIT_FORMAT_KEYS:
+            fields.add(name)
+        fields.update(GIT_LOG_FIELD_DEPENDENCIES.get(name, ()))
+    return tuple(key for key in GIT_FORMAT_KEYS if key in fields)
+
+
+def log_format_keys(fields=None, with_parents=False):
+    """Return ``git log`` format keys of commit attributes to read
+
+    Only ``fields`` are asked if given (``sha1`` is always asked), and
+    ``parents`` are added if ``with_parents`` is set:
+
+        >>> list(log_format_keys(("subject", ), with_parents=True))
+        ['sha1', 'subject', 'parents']
+
+    """
+    if fields is None:
+        format_keys = GIT_FORMAT_KEYS.copy()
+    else:
+        format_keys = collections.OrderedDict(
+            (key, value) for key, value in GIT_FORMAT_KEYS.items()
+            if key == "sha1" or key in fields)
+    if with_parents:
+        format_keys["parents"] = "%P"
+    return format_keys
+
+
+def template_log_fields(template):
+    """Return ``git log`` fields that a template source could reference
+
+    This is a conservative static analysis: any word of the template
+    that names a commit attribute is considered as used.
+
+        >>> template_log_fields("{{#commits}}{{sha1_short}}{{/commits}}")
+        ('sha1_short',)
+
+    """
+    return git_log_fields(set(re.findall(r"\w+", template)))
+
+
+## Tag metadata collected by ``GitRepos.tag_index()``. Fields prefixed
+## with ``*`` are read on the object the tag points to.
+GIT_TAG_FORMAT_KEYS = collections.OrderedDict([
+    ('refname', "%(refname)"),
+    ('objecttype', "%(objecttype)"),
+    ('objectname', "%(objectname)"),
+    ('authordate', "%(authordate:raw)"),
+    ('committerdate', "%(committerdate:raw)"),
+    ('taggerdate', "%(taggerdate:raw)"),
+    ('peeled_objecttype', "%(*objecttype)"),
+    ('peeled_objectname', "%(*objectname)"),
+    ('peeled_authordate', "%(*authordate:raw)"),
+    ('peeled_committerdate', "%(*committerdate:raw)"),
+])
+
+GIT_TAG_FORMAT_STRING = "%00".join(GIT_TAG_FORMAT_KEYS.values())
+
 REGEX_RFC822_KEY_VALUE = \
     r'(^|\n)(?P<key>[A-Z]\w+(-\w+)*): (?P<value>[^\n]*(\n\s+[^\n]*)*)'
 REGEX_RFC822_POSTFIX = \
     r'(%s)+$' % REGEX_RFC822_KEY_VALUE
 
 
-class GitCommit(SubGitObjectMixin):
+def trailers_start(body):
+    r"""Return the index in ``body`` where its trailers start, or None
+
+    This is the position where ``REGEX_RFC822_POSTFIX`` would match, but
+    found by scanning lines once from the end of ``body``: the regex
+    itself is prone to catastrophic backtracking on long bodies full of
+    ``Key: value`` looking lines.
+
+        >>> trailers_start("Stuff\nChange-Id: 1234\n  more")
+        5
+        >>> trailers_start("Change-Id: 1234")
+        0
+        >>> trailers_start("Change-Id: 1234\nStuff") is None
+        True
+
+    Trailers are a sequence of ``Key: value`` lines, each one possibly
+    followed by continuation lines which are the ones starting with a
+    space, or following a blank line (as does ``\n\s+`` in the regex).
+
+    """
+    lines = body.split("\n")
+    nb_lines = len(lines)
+    is_key = re.compile(r'[A-Z]\w+(-\w+)*: ').match
+    is_blank = re.compile(r'\s*\Z').match
+    starts_with_space = re.compile(r'\s').match
+    ## ``tail`` tells if lines after ``i`` are only continuations and
+    ## trailers up to the end. ``blank_tail`` tells the same of lines
+    ## after any of the blank lines directly following ``i`` (a
+    ## continuation started on a blank line can end on any of these).
+    tail = True
+    blank_tail = False
+    start = None
+    for i in range(nb_lines - 1, -1, -1):
+        line = lines[i]
+        key_here = tail and is_key(line) is not None
+        if key_here:
+            start = i
+        blank = is_blank(line) is not None
+        ## can a continuation starting on this line close the trailers ?
+        if blank:
+            ends_here = (tail or blank_tail) if line else blank_tail
+        elif starts_with_space(line):
+            ends_here = tail
+        else:
+            ends_here = False
+        ## the final newline doesn't need to be consumed (as for ``$``)
+        last_newline = i == nb_lines - 1 and not line
+        blank_tail, tail = (
+            (tail or blank_tail) if blank else tail,
+            last_newline or ends_here or key_here)
+    if start is None:
+        return None
+    ## position of the preceding newline, that belongs to the trailers
+    return max(0, sum(len(line) + 1 for line in lines[:start]) - 1)
+
+
+def parse_trailers(body):
+    r"""Split RFC822-like trailers from the end of ``body``
+
+    Returns the body without its trailers, and a dict of trailer values
+    keyed by ``trailer_<key>``. Repeated keys get a list of values:
+
+        >>> body, trailers = parse_trailers(
+        ...     "Stuff\nCo-Authored-By: Bob\nCo-Authored-By: Alice")
+        >>> body
+        'Stuff'
+        >>> trailers
+        {'trailer_co_authored_by': ['Bob', 'Alice']}
+
+    """
+    trailers = {}
+    pos = trailers_start(body)
+    if pos is None:
+        return body, trailers
+    postfix = body[pos:]
+    for match in re.finditer(REGEX_RFC822_KEY_VALUE, postfix):
+        dct = match.groupdict()
+        key = "trailer_%s" % dct["key"].replace("-", "_").lower()
+        if "\n" in dct["value"]:
+            first_line, remaining = dct["value"].split('\n', 1)
+            value = "%s\n%s" % (first_line,
+                                textwrap.dedent(remaining))
+        else:
+            value = dct["value"]
+        try:
+            prev_value = trailers[key]
+        except KeyError:
+            trailers[key] = value
+        else:
+            trailers[key] = prev_value + [value, ] \
+                            if isinstance(prev_value, list) \
+                            else [prev_value, value, ]
+    return body[:pos], trailers
+
+
+def _skip_blank_lines(lines):
+    idx = 0
+    while idx < len(lines) and lines[idx].strip() == "":
+        idx += 1
+    return lines[idx:]
+
+
+def parse_commit_object(raw):
+    r"""Return dict of ``GIT_FORMAT_KEYS`` values from a raw commit object
+
+    Values are the ones ``git log`` would give, except ``sha1``,
+    ``sha1_short`` and ``author_date`` that can't be inferred from the
+    object content. ``parents`` is also given as a list of sha1.
+
+        >>> raw = (b'tree 4b825dc642cb6eb9a060e54bf8d69288fbee4904\n'
+        ...        b'parent 0000000000000000000000000000000000000001\n'
+        ...        b'author John Smith <john@x.org> 1487079082 +0700\n'
+        ...        b'committer Alice Wang <alice@x.org> 1487079083 +0000\n'
+        ...        b'\n'
+        ...        b'my subject\n'
+        ...        b'on two lines\n'
+        ...        b'\n'
+        ...        b'my body\n')
+        >>> fields = parse_commit_object(raw)
+        >>> print(fields["subject"])
+        my subject on two lines
+        >>> print(fields["body"])
+        my body
+        <BLANKLINE>
+        >>> print(fields["author_name"], fields["author_email"],
+        ...       fields["author_date_timestamp"], fields["committer_name"])
+        John Smith john@x.org 1487079082 Alice Wang
+
+    """
+    header, _sep, message = raw.partition(b"\n\n")
+    headers = {}
+    parents = []
+    for line in header.split(b"\n"):
+        if line.startswith(b" "):  ## continuation of multi-line header
+            continue
+        key, _sep, value = line.partition(b" ")
+        if key == b"parent":
+            parents.append(value.decode("ascii"))
+        elif key not in headers:
+            headers[key] = value
+
+    encoding = headers.get(b"encoding", b"utf-8").decode("ascii")
+    try:
+        codecs.lookup(encoding)
+    except LookupError:
+        encoding = DEFAULT_GIT_LOG_ENCODING
+
+    def ident(value):
+        """Split ``Name <email> timestamp tz`` as git does"""
+        value = value.decode(encoding, "replace")
+        name, _sep, rest = value.partition("<")
+        email, _sep, _rest = rest.partition(">")
+        date = value[value.rfind(">") + 1:].split()
+        return name.rstrip(), email, date[0] if date else ""
+
+    author_name, author_email, author_date_timestamp = \
+        ident(headers.get(b"author", b""))
+    committer_name, _committer_email, committer_date_timestamp = \
+        ident(headers.get(b"committer", b""))
+
+    raw_body = message.decode(encoding, "replace")
+    lines = _skip_blank_lines(raw_body.split("\n"))
+    subject_lines = []
+    while lines and lines[0].strip() != "":
+        subject_lines.append(lines.pop(0).rstrip())
+
+    return {
+        'subject': " ".join(subject_lines),
+        'author_name': author_name,
+        'author_email': author_email,
+        'author_date_timestamp': author_date_timestamp,
+        'committer_name': committer_name,
+        'committer_date_timestamp': committer_date_timestamp,
+        'raw_body': raw_body,
+        'body': "\n".join(_skip_blank_lines(lines)),
+        'parents': parents,
+    }
+
+
+class GitCatFile(object):
+    """Long-lived ``git cat-file --batch`` process serving raw objects
+
+    Process is launched upon first request, and shut down on exit or
+    on ``close()``. If it dies, it'll be launched again on next request.
+
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._proc = None
+        self._devnull = None
+        self._atexit_registered = False
+
+    def _start(self):
+        self._devnull = open(os.devnull, "wb")
+        self._proc = Popen(
+            ["git", "cat-file", "--batch"], cwd=self._path,
+            stdin=PIPE, stdout=PIPE, stderr=self._devnull,
+            close_fds=PLT_CFG['close_fds'])
+        if not self._atexit_registered:
+            atexit.register(self.close)
+            self._atexit_registered = True
+
+    def read(self, name):
+        """Return ``(sha1, type, content)`` of object ``name``
+
+        ``None`` is returned if object is not found, or can't be
+        queried through this process.
+
+        """
+        if "\n" in name:
+            return None
+        if self._proc is None:
+            self._start()
+        try:
+            self._proc.stdin.write(name.encode(_preferred_encoding) + b"\n")
+            self._proc.stdin.flush()
+            header = self._proc.stdout.readline()
+            if not header:
+                raise IOError(errno.EPIPE, "git cat-file exited")
+            if header.rstrip(b"\n").endswith((b" missing", b" ambiguous")):
+                return None
+            sha1, obj_type, size = header.split()
+            content = self._proc.stdout.read(int(size) + 1)[:-1]
+        except (IOError, OSError, ValueError):
+            ## Broken pipe or garbled output: the process is unusable.
+            self.close()
+            return None
+        return sha1.decode("ascii"), obj_type.decode("ascii"), content
+
+    def close(self):
+        if self._proc is None:
+            return
+        proc, self._proc = self._proc, None
+        try:
+            proc.stdin.close()
+        except (IOError, OSError):  ## Broken pipe
+            pass
+        proc.stdout.close()
+        proc.wait()
+        self._devnull.close()
+
+
+def delta_copy_args(delta, opcode, pos):
+    r"""Return offset and size of a delta copy instruction, and next pos
+
+    Bits 0-3 of ``opcode`` tell which offset bytes follow it in
+    ``delta`` (a ``bytearray``) from ``pos``, and bits 4-6 which size
+    bytes follow them. A size of 0 stands for 0x10000:
+
+        >>> delta_copy_args(bytearray(b'\x01\x04'), 0x91, 0)
+        (1, 4, 2)
+        >>> delta_copy_args(bytearray(b''), 0x80, 0)
+        (0, 65536, 0)
+
+    """
+    offset = size = 0
+    for idx in range(4):
+        if opcode & (1 << idx):
+            offset |= delta[pos] << (8 * idx)
+            pos += 1
+    for idx in range(3):
+        if opcode & (1 << (4 + idx)):
+            size |= delta[pos] << (8 * idx)
+            pos += 1
+    return offset, size or 0x10000, pos
+
+
+def apply_delta(base, delta):
+    r"""Return the result of applying git binary ``delta`` to ``base``
+
+        >>> delta = b'\x05\x08\x91\x01\x04\x04ment'
+        >>> apply_delta(b'stuff', delta) == b'tuffment'
+        True
+
+    """
+    delta = bytearray(delta)
+
+    def varint(pos):
+        value = shift = 0
+        while True:
+            byte = delta[pos]
+            pos += 1
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value, pos
+
+    _base_size, pos = varint(0)
+    result_size, pos = varint(pos)
+    chunks = []
+    while pos < len(delta):
+        opcode = delta[pos]
+        pos += 1
+        if opcode & 0x80:  ## copy from base
+            offset, size, pos = delta_copy_args(delta, opcode, pos)
+            chunks.append(base[offset:offset + size])
+        elif opcode:  ## insert literal data
+            chunks.append(bytes(delta[pos:pos + opcode]))
+            pos += opcode
+        else:
+            raise ValueError("Invalid delta opcode 0.")
+    result = b"".join(chunks)
+    if len(result) != result_size:
+        raise ValueError("Delta result size mismatch.")
+    return result
+
+
+class GitPackIndex(object):
+    """Memory-mapped ``.idx`` file of a git pack (version 1 or 2)"""
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if self._map[0:4] == b"\377tOc":
+                if struct.unpack_from(">I", self._map, 4)[0] != 2:
+                    raise ValueError("Unsupported pack index version.")
+                self._version = 2
+                self._fanout = 8
+            else:
+                self._version = 1
+                self._fanout = 0
+            self._count = self._fanout_at(255)
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError("Invalid pack index file: %r" % filename)
+
+    def close(self):
+        self._map.close()
+
+    def _fanout_at(self, byte):
+        return struct.unpack_from(">I", self._map, self._fanout + 4 * byte)[0]
+
+    def _oid_at(self, num):
+        if self._version == 2:
+            start = self._fanout + 1024 + num * 20
+        else:
+            start = self._fanout + 1024 + num * 24 + 4
+        return self._map[start:start + 20]
+
+    def offset(self, oid):
+        """Return offset in pack of binary ``oid`` or ``None``"""
+        first = bytearray(oid[0:1])[0]
+        low = self._fanout_at(first - 1) if first else 0
+        high = self._fanout_at(first)
+        while low < high:
+            middle = (low + high) // 2
+            current = self._oid_at(middle)
+            if current == oid:
+                return self._offset_at(middle)
+            if current < oid:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _offset_at(self, num):
+        if self._version == 1:
+            return struct.unpack_from(
+                ">I", self._map, self._fanout + 1024 + num * 24)[0]
+        offsets = self._fanout + 1024 + self._count * 24
+        offset = struct.unpack_from(">I", self._map, offsets + num * 4)[0]
+        if offset & 0x80000000:
+            large_offsets = offsets + self._count * 4
+            offset = struct.unpack_from(
+                ">Q", self._map,
+                large_offsets + (offset & 0x7fffffff) * 8)[0]
+        return offset
+
+
+class GitObjectStore(object):
+    """In-process reader of git objects, refs and packs
+
+    Same interface than ``GitCatFile``, but objects are read directly
+    from loose object files and packs in the git directory, without
+    launching any process.
+
+    Only full sha1, ``HEAD`` and ref names (as ``git rev-parse``
+    would complete them) optionally followed by ``^{<type>}`` are
+    understood. Any other revision syntax returns ``None``.
+
+    """
+
+    TYPES = {1: "commit", 2: "tree", 3: "blob", 4: "tag"}
+    OFS_DELTA = 6
+    REF_DELTA = 7
+    REF_PREFIXES = ["refs/", "refs/tags/", "refs/heads/", "refs/remotes/"]
+    CACHE_SIZE = 256
+
+    def __init__(self, gitdir):
+        self._gitdir = gitdir
+        commondir = os.path.join(gitdir, "commondir")
+        self._commondir = normpath(file_get_contents(commondir).strip(),
+                                   cwd=gitdir) \
+            if os.path.isfile(commondir) else gitdir
+        objects = os.environ.get("GIT_OBJECT_DIRECTORY") or \
+                  os.path.join(self._commondir, "objects")
+        self._object_dirs = [objects]
+        alternates = os.path.join(objects, "info", "alternates")
+        if os.path.isfile(alternates):
+            self._object_dirs.extend(
+                normpath(line.strip(), cwd=objects)
+                for line in file_get_contents(alternates).split("\n")
+                if line.strip() and not line.startswith("#"))
+        self._packs = collections.OrderedDict()  ## idx file: (idx, pack)
+        self._cache = {}
+
+    def close(self):
+        for idx, pack in self._packs.values():
+            idx.close()
+            pack.close()
+        self._packs.clear()
+        self._cache.clear()
+
+    ## Refs
+
+    def _read_ref(self, refname, depth=0):
+        if depth > 5:  ## symbolic ref loop
+            return None
+        for directory in (self._gitdir, self._commondir):
+            filename = os.path.join(directory, refname)
+            if os.path.isfile(filename):
+                with open(filename, "rb") as f:
+                    content = f.read().decode("utf-8").strip()
+                if content.startswith("ref: "):
+                    return self._read_ref(content[5:], depth + 1)
+                return content[:40] \
+                       if re.match("^[0-9a-f]{40}", content) else None
+        return self._packed_refs().get(refname)
+
+    def _packed_refs(self):
+        refs = {}
+        filename = os.path.join(self._commondir, "packed-refs")
+        if not os.path.isfile(filename):
+            return refs
+        with open(filename, "rb") as f:
+            for line in f.read().decode("utf-8").split("\n"):
+                if not line or line[0] in "#^":
+                    continue
+                sha1, _sep, refname = line.partition(" ")
+                refs[refname] = sha1
+        return refs
+
+    def resolve(self, name):
+        """Return sha1 of ``name`` or ``None``"""
+        if re.match("^[0-9a-f]{40}$", name):
+            return name
+        if not re.match(r"^[\w./-]+$", name) or ".." in name:
+            return None
+        ## only special refs as ``HEAD`` are looked up in the git directory
+        prefixes = ([""] if re.match("^[A-Z_]+$", name) or
+                    name.startswith("refs/") else []) + self.REF_PREFIXES
+        for prefix in prefixes:
+            sha1 = self._read_ref(prefix + name)
+            if sha1 is not None:
+                return sha1
+        return self._read_ref("refs/remotes/%s/HEAD" % name)
+
+    ## Objects
+
+    def read(self, name):
+        """Return ``(sha1, type, content)`` of object ``name``
+
+        ``None`` is returned if object is not found, or if ``name`` is not
+        understood.
+
+        """
+        match = re.match(r"^(.*?)(\^\{(\w*)\})?$", name)
+        sha1 = self.resolve(match.group(1))
+        if sha1 is None:
+            return None
+        obj = self.read_object(sha1)
+        ## ``^{}`` peels tags until a non tag object is found
+        peel = match.group(3)
+        while obj is not None and peel is not None and obj[0] != peel:
+            if obj[0] != "tag":
+                return None if peel else (sha1, obj[0], obj[1])
+            sha1 = obj[1].split(b"\n", 1)[0].split(b" ")[1].decode("ascii")
+            obj = self.read_object(sha1)
+        if obj is None:
+            return None
+        return sha1, obj[0], obj[1]
+
+    def read_object(self, sha1):
+        """Return ``(type, content)`` of object of given sha1 or ``None``"""
+        oid = binascii.unhexlify(sha1)
+        for objects in self._object_dirs:
+            filename = os.path.join(objects, sha1[:2], sha1[2:])
+            if os.path.isfile(filename):
+                with open(filename, "rb") as f:
+                    raw = zlib.decompress(f.read())
+                header, _sep, content = raw.partition(b"\0")
+                return header.split(b" ")[0].decode("ascii"), content
+        obj = self._read_packed(oid)
+        if obj is None and self._load_packs():  ## new packs since last time
+            obj = self._read_packed(oid)
+        return obj
+
+    def _load_packs(self):
+        new = False
+        for objects in self._object_dirs:
+            for filename in sorted(glob.glob(
+                    os.path.join(objects, "pack", "pack-*.idx"))):
+                if filename in self._packs:
+                    continue
+                pack_filename = filename[:-len(".idx")] + ".pack"
+                try:
+                    idx = GitPackIndex(filename)
+                    with open(pack_filename, "rb") as f:
+                        pack = mmap.mmap(f.fileno(), 0,
+                                         access=mmap.ACCESS_READ)
+                except (IOError, OSError, ValueError):  ## being written ?
+                    continue
+                self._packs[filename] = (idx, pack)
+                new = True
+        return new
+
+    def _read_packed(self, oid):
+        for idx, pack in self._packs.values():
+            offset = idx.offset(oid)
+            if offset is not None:
+                return self._unpack(pack, offset)
+        return None
+
+    def _unpack(self, pack, start):
+        key = (id(pack), start)
+        if key in self._cache:
+            return self._cache[key]
+        obj_type, size, offset = self._entry_header(pack, start)
+        if obj_type == self.OFS_DELTA:
+            byte = bytearray(pack[offset:offset + 1])[0]
+            offset += 1
+            distance = byte & 0x7f
+            while byte & 0x80:
+                byte = bytearray(pack[offset:offset + 1])[0]
+                offset += 1
+                distance = ((distance + 1) << 7) | (byte & 0x7f)
+            base = self._unpack(pack, start - distance)
+        elif obj_type == self.REF_DELTA:
+            base = self.read_object(
+                binascii.hexlify(pack[offset:offset + 20]).decode("ascii"))
+            offset += 20
+        else:
+            base = None
+        if obj_type in self.TYPES:
+            obj = self.TYPES[obj_type], self._inflate(pack, offset, size)
+        elif base is not None:
+            obj = base[0], apply_delta(base[1],
+                                       self._inflate(pack, offset, size))
+        else:
+            return None
+        ## delta bases are often shared by many objects
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = obj
+        return obj
+
+    @staticmethod
+    def _entry_header(pack, offset):
+        byte = bytearray(pack[offset:offset + 1])[0]
+        offset += 1
+        obj_type = (byte >> 4) & 0x7
+        size = byte & 0x0f
+        shift = 4
+        while byte & 0x80:
+            byte = bytearray(pack[offset:offset + 1])[0]
+            offset += 1
+            size |= (byte & 0x7f) << shift
+            shift += 7
+        return obj_type, size, offset
+
+    @staticmethod
+    def _inflate(pack, offset, size):
+        decompressor = zlib.decompressobj()
+        chunks = []
+        total = 0
+        while total < size and offset < len(pack):
+            ## compressed data is rarely much bigger than uncompressed one
+            chunk_size = max(4096, size - total + 1024)
+            chunk = decompressor.decompress(pack[offset:offset + chunk_size])
+            chunks.append(chunk)
+            total += len(chunk)
+            offset += chunk_size
+        return b"".join(chunks)[:size]
+
+
+class CommitDAG(object):
+    """Ancestry queries on a commit graph
+
+    Subclasses number commits and must implement ``_number(sha1)``
+    (``None`` if unknown), ``_parents_of(num)`` and ``_generation_of(num)``.
+    Generation numbers must be greater than the ones of any ancestor, or
+    ``0`` if not available.
+
+    """
+
+    def __contains__(self, sha1):
+        return self._number(sha1) is not None
+
+    def close(self):
+        pass
+
+    def is_ancestor(self, ancestor, descendant):
+        """Return whether ``ancestor`` is reachable from ``descendant``
+
+        A commit is considered as its own ancestor, as ``git merge-base
+        --is-ancestor`` does. ``None`` is returned if any of the commits
+        is unknown.
+
+        """
+        anc = self._number(ancestor)
+        desc = self._number(descendant)
+        if anc is None or desc is None:
+            return None
+        if anc == desc:
+            return True
+        gen = self._generation_of(anc)
+        if gen and self._generation_of(desc) <= gen:
+            return False
+        stack = [desc]
+        seen = set(stack)
+        while stack:
+            num = stack.pop()
+            for parent in self._parents_of(num):
+                if parent == anc:
+                    return True
+                if parent not in seen and \
+                       (not gen or self._generation_of(parent) > gen):
+                    seen.add(parent)
+                    stack.append(parent)
+        return False
+
+    def contains(self, sha1, candidates):
+        """Return the list of ``candidates`` that have ``sha1`` as ancestor
+
+        ``None`` is returned if any of the commits is unknown.
+
+        """
+        target = self._number(sha1)
+        nums = [self._number(c) for c in candidates]
+        if target is None or None in nums:
+            return None
+        gen = self._generation_of(target)
+        reach = {target: True}
+        for num in nums:
+            ## depth first walk, each commit is computed only once.
+            stack = [num]
+            while stack:
+                current = stack[-1]
+                if current in reach:
+                    stack.pop()
+                    continue
+                if gen and self._generation_of(current) <= gen:
+                    reach[current] = False
+                    stack.pop()
+                    continue
+                parents = self._parents_of(current)
+                pending = [p for p in parents if p not in reach]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                reach[current] = any(reach[p] for p in parents)
+                stack.pop()
+        return [c for c, num in zip(candidates, nums) if reach[num]]
+
+
+class AncestryIndex(CommitDAG):
+    """In-memory commit graph answering ancestry queries
+
+    It is fed with the lines of ``git rev-list --parents --topo-order``
+    (``<sha1> <parent sha1>...``). Commits are numbered on first sight,
+    parent lists are stored in flat arrays, and each commit gets a
+    generation number (1 for root commits, 1 + max of parents
+    generation otherwise) that allows to prune walks early.
+
+        >>> index = AncestryIndex(["c b", "b a", "d a", "a"])
+        >>> index.is_ancestor("a", "c"), index.is_ancestor("c", "a")
+        (True, False)
+        >>> index.is_ancestor("d", "c"), index.is_ancestor("c", "c")
+        (False, True)
+        >>> sorted(index.contains("b", ["a", "b", "c", "d"]))
+        ['b', 'c']
+
+    Queries on commits unknown to the index return ``None``:
+
+        >>> print(index.is_ancestor("a", "e"))
+        None
+
+    """
+
+    def __init__(self, lines):
+        self._index = {}
+        self._ranks = array.array('i')      ## rank in rev-list output
+        self._starts = array.array('i')     ## parents are in
+        self._ends = array.array('i')       ## ``_parents[start:end]``
+        self._parents = array.array('i')
+        self._order = array.array('i')      ## commit number by rank
+
+        for line in lines:
+            shas = line.split()
+            if not shas:
+                continue
+            num = self._new_number(shas[0])
+            self._ranks[num] = len(self._order)
+            self._order.append(num)
+            self._starts[num] = len(self._parents)
+            self._parents.extend(self._new_number(sha) for sha in shas[1:])
+            self._ends[num] = len(self._parents)
+
+        ## parents are listed after their children
+        self._generations = array.array('i', [1]) * len(self._ranks)
+        generations, parents = self._generations, self._parents
+        for num in reversed(self._order):
+            for parent in parents[self._starts[num]:self._ends[num]]:
+                if generations[parent] >= generations[num]:
+                    generations[num] = generations[parent] + 1
+
+    def _new_number(self, sha1):
+        num = self._index.get(sha1)
+        if num is None:
+            num = self._index[sha1] = len(self._ranks)
+            self._ranks.append(-1)
+            self._starts.append(0)
+            self._ends.append(0)
+        return num
+
+    def _number(self, sha1):
+        num = self._index.get(sha1)
+        return num if num is not None and self._ranks[num] >= 0 else None
+
+    def _parents_of(self, num):
+        return self._parents[self._starts[num]:self._ends[num]]
+
+    def _generation_of(self, num):
+        return self._generations[num]
+
+    def contains(self, sha1, candidates):
+        """Return the list of ``candidates`` that have ``sha1`` as ancestor
+
+        ``None`` is returned if any of the commits is unknown.
+
+        """
+        if sha1 not in self or not all(c in self for c in candidates):
+            return None
+        ## faster than the generic walk: descendants are ranked before
+        ## their ancestors, so reachability can be propagated backward
+        ## from ``sha1`` rank to rank 0.
+        parents, starts, ends = self._parents, self._starts, self._ends
+        rank = self._ranks[self._index[sha1]]
+        reach = bytearray(len(self._ranks))
+        reach[self._index[sha1]] = 1
+        for num in reversed(self._order[:rank]):
+            for parent in parents[starts[num]:ends[num]]:
+                if reach[parent]:
+                    reach[num] = 1
+                    break
+        return [c for c in candidates if reach[self._index[c]]]
+
+
+class CommitGraph(CommitDAG):
+    """Reader of git's ``commit-graph`` file
+
+    The file is memory-mapped and every lookup is done directly in it:
+    nothing is loaded upfront, so opening it costs the same whatever the
+    size of the history. Commits are numbered by their position in the
+    file. Split commit-graph chains are not supported.
+
+    See git's ``Documentation/technical/commit-graph-format.txt``.
+
+    """
+
+    PARENT_NONE = 0x70000000
+    PARENT_EXTRA_EDGES = 0x80000000
+    GENERATION_MAX = 0x3FFFFFFF  ## capped value, unusable for pruning
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            signature, version, hash_version, nb_chunks, nb_bases = \
+                struct.unpack_from(">4sBBBB", self._map, 0)
+            if signature != b"CGPH" or version != 1:
+                raise ValueError("Not a commit-graph file: %r" % filename)
+            if nb_bases:
+                raise ValueError("Split commit-graph are not supported.")
+            self._hash_len = {1: 20, 2: 32}[hash_version]
+            chunks = {}
+            for idx in range(nb_chunks):
+                chunk_id, offset = struct.unpack_from(">4sQ", self._map,
+                                                      8 + 12 * idx)
+                chunks[chunk_id] = offset
+            self._fanout = chunks[b"OIDF"]
+            self._oids = chunks[b"OIDL"]
+            self._data = chunks[b"CDAT"]
+            self._edges = chunks.get(b"EDGE")
+            self._count = self._fanout_at(255)
+        except (KeyError, struct.error):
+            self.close()
+            raise ValueError("Invalid commit-graph file: %r" % filename)
+        except ValueError:
+            self.close()
+            raise
+
+    @classmethod
+    def open(cls, gitdir):
+        """Return the ``CommitGraph`` of given git directory or ``None``
+
+        ``None`` is returned when there are no usable commit-graph file,
+        or if the repository uses replace refs, grafts or is shallow (as
+        git itself would then ignore it).
+
+        """
+        commondir = os.path.join(gitdir, "commondir")
+        if os.path.isfile(commondir):
+            gitdir = normpath(file_get_contents(commondir).strip(),
+                              cwd=gitdir)
+        objects = os.environ.get("GIT_OBJECT_DIRECTORY") or \
+                  os.path.join(gitdir, "objects")
+        for filename in [os.path.join(gitdir, "shallow"),
+                         os.path.join(objects, "info", "grafts")]:
+            if os.path.exists(filename):
+                return None
+        replace_refs = os.path.join(gitdir, "refs", "replace")
+        if os.path.isdir(replace_refs) and os.listdir(replace_refs):
+            return None
+        filename = os.path.join(objects, "info", "commit-graph")
+        if not os.path.isfile(filename):
+            return None
+        try:
+            return cls(filename)
+        except (IOError, OSError, ValueError):  ## unreadable or empty
+            return None
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return self._count
+
+    def _fanout_at(self, byte):
+        return struct.unpack_from(">I", self._map, self._fanout + 4 * byte)[0]
+
+    def _number(self, sha1):
+        try:
+            oid = binascii.unhexlify(sha1)
+        except (TypeError, ValueError):  ## not an hexadecimal sha1
+            return None
+        if len(oid) != self._hash_len:
+            return None
+        first = bytearray(oid[0:1])[0]
+        low = self._fanout_at(first - 1) if first else 0
+        high = self._fanout_at(first)
+        while low < high:
+            middle = (low + high) // 2
+            start = self._oids + middle * self._hash_len
+            current = self._map[start:start + self._hash_len]
+            if current == oid:
+                return middle
+            if current < oid:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def sha1(self, num):
+        start = self._oids + num * self._hash_len
+        return binascii.hexlify(
+            self._map[start:start + self._hash_len]).decode("ascii")
+
+    def _parents_of(self, num):
+        offset = self._data + num * (self._hash_len + 16) + self._hash_len
+        first, second = struct.unpack_from(">II", self._map, offset)
+        if first == self.PARENT_NONE:
+            return []
+        if second == self.PARENT_NONE:
+            return [first]
+        if not second & self.PARENT_EXTRA_EDGES:
+            return [first, second]
+        parents = [first]
+        edge = second & ~self.PARENT_EXTRA_EDGES
+        while True:
+            parent = struct.unpack_from(">I", self._map,
+                                        self._edges + 4 * edge)[0]
+            parents.append(parent & ~self.PARENT_EXTRA_EDGES)
+            if parent & self.PARENT_EXTRA_EDGES:
+                return parents
+            edge += 1
+
+    def _generation_and_date(self, num):
+        offset = self._data + num * (self._hash_len + 16) + \
+                 self._hash_len + 8
+        high, low = struct.unpack_from(">II", self._map, offset)
+        return high >> 2, ((high & 0x3) << 32) | low
+
+    def _generation_of(self, num):
+        """Topological level of the commit (``0`` if not available)"""
+        generation = self._generation_and_date(num)[0]
+        return 0 if generation == self.GENERATION_MAX else generation
+
+    def parents(self, sha1):
+        """Return the list of parents sha1 or ``None`` if unknown"""
+        num = self._number(sha1)
+        if num is None:
+            return None
+        return [self.sha1(parent) for parent in self._parents_of(num)]
+
+    def generation(self, sha1):
+        num = self._number(sha1)
+        return None if num is None else self._generation_of(num)
+
+    def commit_date_timestamp(self, sha1):
+        num = self._number(sha1)
+        return None if num is None else self._generation_and_date(num)[1]
+
+
+class CommitInfoMixin(object):
+    """Values computed from commit attributes, common to commit types"""
+
+    __slots__ = ()
+
+    @property
+    def author_names(self):
+        return [re.sub(r'^([^<]+)<[^>]+>\s*$', r'\1', author).strip()
+                for author in self.authors]
+
+    @property
+    def authors(self):
+        co_authors = getattr(self, 'trailer_co_authored_by', [])
+        co_authors = co_authors if isinstance(co_authors, list) \
+                     else [co_authors]
+        return sorted(co_authors +
+                      ["%s <%s>" % (self.author_name, self.author_email)])
+
+    @property
+    def date(self):
+        d = datetime.datetime.utcfromtimestamp(
+            float(self.author_date_timestamp))
+        return d.strftime('%Y-%m-%d')
+
+
+class GitCommit(SubGitObjectMixin, CommitInfoMixin):
     r"""Represent a Git Commit and expose through its attribute many information
 
     Let's create a fake GitRepos:
@@ -756,21 +2091,29 @@ class GitCommit(SubGitObjectMixin):
 
     Initialization:
 
+        >>> def commit_fields():
+        ...     return {
+        ...         'sha1': "000000",
+        ...         'sha1_short': "000",
+        ...         'subject': SUBJECT,
+        ...         'author_name': "John Smith",
+        ...         'author_date': "Tue Feb 14 20:31:22 2017 +0700",
+        ...         'author_email': "john.smith@example.com",
+        ...         'author_date_timestamp': "0",   ## epoch
+        ...         'committer_name': "Alice Wang",
+        ...         'committer_date_timestamp': "0", ## epoch
+        ...         'raw_body': "my subject\n\n%s" % BODY,
+        ...         'body': BODY,
+        ...     }
+        >>> repos.read_commit.mock_returns_func = \
+        ...     lambda identifier: dict(
+        ...         (key, value) for key, value in commit_fields().items()
+        ...         if key not in ("sha1_short", "author_date"))
         >>> repos.git = Mock("gitRepos.git")
         >>> repos.git.log.mock_returns_func = \
-        ...     lambda *a, **kwargs: "\x00".join([{
-        ...             'sha1': "000000",
-        ...             'sha1_short': "000",
-        ...             'subject': SUBJECT,
-        ...             'author_name': "John Smith",
-        ...             'author_date': "Tue Feb 14 20:31:22 2017 +0700",
-        ...             'author_email': "john.smith@example.com",
-        ...             'author_date_timestamp': "0",   ## epoch
-        ...             'committer_name': "Alice Wang",
-        ...             'committer_date_timestamp': "0", ## epoch
-        ...             'raw_body': "my subject\n\n%s" % BODY,
-        ...             'body': BODY,
-        ...         }[key] for key in GIT_FORMAT_KEYS.keys()])
+        ...     lambda *a, **kwargs: "\x00".join(
+        ...         commit_fields()[key]
+        ...         for key in ("sha1_short", "author_date"))
         >>> repos.git.rev_list.mock_returns = "123456"
 
     Query, by attributes or items:
@@ -780,13 +2123,20 @@ class GitCommit(SubGitObjectMixin):
 
         >>> head = GitCommit(repos, "HEAD")
         >>> head.subject
-        Called gitRepos.git.log(...'HEAD'...)
+        Called gitRepos.read_commit('HEAD')
         'fee fie foh'
         >>> head.author_name
         'John Smith'
 
-    Notice that on the second call, there's no need to call again git log as
-    all the values have already been computed.
+    Notice that on the second call, there's no need to read again the
+    commit as all the values have already been computed.
+
+    Values that can't be read from the commit object itself are asked to
+    ``git log`` only when requested:
+
+        >>> head.sha1_short
+        Called gitRepos.git.log(...'HEAD'...)
+        '000'
 
     Trailer
     =======
@@ -802,7 +2152,7 @@ class GitCommit(SubGitObjectMixin):
 
         >>> head = GitCommit(repos, "HEAD")
         >>> head.trailer_change_id
-        Called gitRepos.git.log(...'HEAD'...)
+        Called gitRepos.read_commit('HEAD')
         '1234'
         >>> head.trailer_value_x
         'Supports multi\nline values'
@@ -819,7 +2169,7 @@ class GitCommit(SubGitObjectMixin):
 
         >>> head = GitCommit(repos, "HEAD")
         >>> head.trailer_co_authored_by
-        Called gitRepos.git.log(...'HEAD'...)
+        Called gitRepos.read_commit('HEAD')
         ['Bob', 'Alice', 'Jack']
 
 
@@ -838,7 +2188,7 @@ class GitCommit(SubGitObjectMixin):
 
         >>> head = GitCommit(repos, "HEAD")
         >>> head.author_names
-        Called gitRepos.git.log(...'HEAD'...)
+        Called gitRepos.read_commit('HEAD')
         ['Alice', 'Bob', 'Jack', 'John Smith']
 
     Notice that they are printed in alphabetical order.
@@ -849,23 +2199,70 @@ class GitCommit(SubGitObjectMixin):
         super(GitCommit, self).__init__(repos)
         self.identifier = identifier
         self._trailer_parsed = False
+        self._object_read = False
+        self._tag_info = None  ## set by ``GitRepos.tags()``
+
+    def __getstate__(self):
+        ## pickled without its repository (see ``VersionRenderPool``)
+        state = self.__dict__.copy()
+        state["_repos"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
 
     def __getattr__(self, label):
         """Completes commits attributes upon request."""
-        attrs = GIT_FORMAT_KEYS.keys()
-        if label not in attrs:
-            try:
-                return self.__dict__[label]
-            except KeyError:
-                if self._trailer_parsed:
-                    raise AttributeError(label)
+        if label in GIT_FORMAT_KEYS:
+            self._complete(label)
+            return self.__dict__[label]
+        if label.startswith("trailer_") and not self._trailer_parsed:
+            self._parse_trailers()
+            return getattr(self, label)
+        raise AttributeError(label)
+
+    @property
+    def body(self):
+        """Body of the commit message, without its trailers"""
+        if not self._trailer_parsed:
+            self._parse_trailers()
+        return self.__dict__["body"]
+
+    @body.setter
+    def body(self, value):
+        self.__dict__["body"] = value
+
+    def _parse_trailers(self):
+        """Interpret RFC822-like header keys that could end the body"""
+        if "body" not in self.__dict__:
+            self._complete("body")
+        self.body, trailers = parse_trailers(self.__dict__["body"])
+        for key, value in trailers.items():
+            setattr(self, key, value)
+        self._trailer_parsed = True
 
+    def _complete(self, label):
+        attrs = GIT_FORMAT_KEYS.keys()
         identifier = self.identifier
 
         ## Compute only missing information
         missing_attrs = [l for l in attrs if l not in self.__dict__]
+        if missing_attrs and self._repos is None:
+            raise AttributeError(
+                "%r of commit %r is not available out of its repository."
+                % (label, identifier))
         ## some commit can be already fully specified (see ``mk_commit``)
-        if missing_attrs:
+        if missing_attrs and not self._object_read:
+            self._object_read = True
+            values = self._repos.read_commit(identifier) or {}
+            for attr in missing_attrs:
+                if attr in values:
+                    setattr(self, attr, values[attr].strip())
+            missing_attrs = [l for l in missing_attrs
+                             if l not in self.__dict__]
+
+        ## ``git log`` is used only for what the commit object can't give
+        if label in missing_attrs:
             aformat = "%x00".join(GIT_FORMAT_KEYS[l]
                                   for l in missing_attrs)
             try:
@@ -880,66 +2277,24 @@ class GitCommit(SubGitObjectMixin):
             for attr, value in zip(missing_attrs, attr_values):
                 setattr(self, attr, value.strip())
 
-        ## Let's interpret RFC822-like header keys that could be in the body
-        match = re.search(REGEX_RFC822_POSTFIX, self.body)
-        if match is not None:
-            pos = match.start()
-            postfix = self.body[pos:]
-            self.body = self.body[:pos]
-            for match in re.finditer(REGEX_RFC822_KEY_VALUE, postfix):
-                dct = match.groupdict()
-                key = dct["key"].replace("-", "_").lower()
-                if "\n" in dct["value"]:
-                    first_line, remaining = dct["value"].split('\n', 1)
-                    value = "%s\n%s" % (first_line,
-                                        textwrap.dedent(remaining))
-                else:
-                    value = dct["value"]
-                try:
-                    prev_value = self.__dict__["trailer_%s" % key]
-                except KeyError:
-                    setattr(self, "trailer_%s" % key, value)
-                else:
-                    setattr(self, "trailer_%s" % key,
-                            prev_value + [value, ]
-                            if isinstance(prev_value, list)
-                            else [prev_value, value, ])
-        self._trailer_parsed = True
-        return getattr(self, label)
-
-    @property
-    def author_names(self):
-        return [re.sub(r'^([^<]+)<[^>]+>\s*$', r'\1', author).strip()
-                for author in self.authors]
-
-    @property
-    def authors(self):
-        co_authors = getattr(self, 'trailer_co_authored_by', [])
-        co_authors = co_authors if isinstance(co_authors, list) \
-                     else [co_authors]
-        return sorted(co_authors +
-                      ["%s <%s>" % (self.author_name, self.author_email)])
-
-    @property
-    def date(self):
-        d = datetime.datetime.utcfromtimestamp(
-            float(self.author_date_timestamp))
-        return d.strftime('%Y-%m-%d')
-
-    @property
-    def has_annotated_tag(self):
-        try:
-            self.git.rev_parse(['%s^{tag}' % self.identifier, "--"])
-            return True
-        except ShellError as e:
-            if e.errlvl != 128:
-                raise
-            return False
+    @property
+    def has_annotated_tag(self):
+        if self._tag_info is not None:
+            return self._tag_info["annotated"]
+        try:
+            self.git.rev_parse(['%s^{tag}' % self.identifier, "--"])
+            return True
+        except ShellError as e:
+            if e.errlvl != 128:
+                raise
+            return False
 
     @property
     def tagger_date_timestamp(self):
         if not self.has_annotated_tag:
             raise ValueError("Can't access 'tagger_date_timestamp' on commit without annotated tag.")
+        if self._tag_info is not None:
+            return self._tag_info["tagger_date_timestamp"]
         tagger_date_utc = self.git.for_each_ref(
             'refs/tags/%s' % self.identifier, format='%(taggerdate:raw)')
         return tagger_date_utc.split(" ", 1)[0]
@@ -951,8 +2306,14 @@ class GitCommit(SubGitObjectMixin):
         return d.strftime('%Y-%m-%d')
 
     def __le__(self, value):
-        if not isinstance(value, GitCommit):
+        if not isinstance(value, (GitCommit, CommitRecord)):
             value = self._repos.commit(value)
+        ancestry = self._repos.ancestry
+        is_ancestor = None if ancestry is None else \
+            ancestry.is_ancestor(self.sha1, value.sha1)
+        if is_ancestor is not None:
+            return is_ancestor
+        ## no ancestry index, or commit unknown to it (it could be newer)
         try:
             self.git.merge_base(value.sha1, is_ancestor=self.sha1)
             return True
@@ -962,12 +2323,12 @@ class GitCommit(SubGitObjectMixin):
             return False
 
     def __lt__(self, value):
-        if not isinstance(value, GitCommit):
+        if not isinstance(value, (GitCommit, CommitRecord)):
             value = self._repos.commit(value)
-        return self <= value and self != value
+        return self != value and self <= value
 
     def __eq__(self, value):
-        if not isinstance(value, GitCommit):
+        if not isinstance(value, (GitCommit, CommitRecord)):
             value = self._repos.commit(value)
         return self.sha1 == value.sha1
 
@@ -978,6 +2339,155 @@ class GitCommit(SubGitObjectMixin):
         return "<%s %r>" % (self.__class__.__name__, self.identifier)
 
 
+class CommitRecord(CommitInfoMixin):
+    r"""Compact and immutable commit yielded by ``GitRepos.log()``
+
+    Values read by ``git log`` are kept as one string, fields being
+    separated by ``\x00`` as they came in the log output. There is no
+    per-instance ``__dict__``, and the tuple of field names is shared by
+    all records of a log. Trailers are parsed on first access. Any
+    other attribute upgrades the record to a full ``GitCommit``, that
+    is created once and answers from then on.
+
+        >>> from minimock import Mock
+        >>> repos = Mock("gitRepos")
+        >>> repos.commit.mock_returns_func = \
+        ...     lambda identifier: GitCommit(repos, identifier)
+
+        >>> record = CommitRecord(
+        ...     repos,
+        ...     ("sha1", "subject", "author_name", "author_email",
+        ...      "author_date_timestamp", "body"),
+        ...     ["000000", "foo", "John Smith", "john.smith@example.com",
+        ...      "0", "bar\nCo-Authored-By: Bob"])
+        >>> record.subject, record.date
+        ('foo', '1970-01-01')
+        >>> record.body
+        'bar'
+        >>> record.author_names
+        ['Bob', 'John Smith']
+
+    Records can't be modified:
+
+        >>> record.subject = "wiz"  ## doctest: +ELLIPSIS
+        Traceback (most recent call last):
+        ...
+        AttributeError: ...
+
+    Unknown attributes are asked to the ``GitCommit``:
+
+        >>> record.has_annotated_tag
+        Called gitRepos.commit('000000')
+        Called gitRepos.git.rev_parse(['000000^{tag}', '--'])
+        True
+        >>> record.has_annotated_tag
+        Called gitRepos.git.rev_parse(['000000^{tag}', '--'])
+        True
+
+    """
+
+    __slots__ = ("_repos", "_fields", "_data", "_trailers", "_commit")
+
+    def __init__(self, repos, fields, values):
+        set_slot = object.__setattr__
+        set_slot(self, "_repos", repos)
+        set_slot(self, "_fields", fields)
+        set_slot(self, "_data", "\x00".join(values))
+        set_slot(self, "_trailers", None)  ## not yet parsed
+        set_slot(self, "_commit", None)    ## not yet upgraded
+
+    def __getstate__(self):
+        ## pickled without its repository (see ``VersionRenderPool``)
+        return self._fields, self._data, self._trailers, self._commit
+
+    def __setstate__(self, state):
+        set_slot = object.__setattr__
+        set_slot(self, "_repos", None)
+        for slot, value in zip(self.__slots__[1:], state):
+            set_slot(self, slot, value)
+
+    def __setattr__(self, label, value):
+        raise AttributeError("%s is immutable, can't set %r."
+                             % (self.__class__.__name__, label))
+
+    @property
+    def identifier(self):
+        return self.sha1
+
+    def _value(self, idx):
+        data = self._data
+        start = 0
+        for _idx in range(idx):
+            start = data.index("\x00", start) + 1
+        end = data.find("\x00", start)
+        return data[start:] if end < 0 else data[start:end]
+
+    def _parse_trailers(self):
+        """Return dict of trailers and the length of body without them"""
+        if self._trailers is None:
+            body = self._value(self._fields.index("body"))
+            stripped, trailers = parse_trailers(body)
+            ## most commits have no trailers: don't store anything
+            object.__setattr__(
+                self, "_trailers",
+                (trailers, len(stripped)) if trailers else ())
+        return self._trailers or ({}, None)
+
+    def _upgrade(self):
+        """Return the full ``GitCommit`` of this record"""
+        if self._commit is None:
+            commit = self._repos.commit(self.sha1)
+            for field in self._fields:
+                setattr(commit, field, getattr(self, field))
+            if "body" in self._fields:
+                for key, value in self._parse_trailers()[0].items():
+                    setattr(commit, key, value)
+                commit._trailer_parsed = True
+            object.__setattr__(self, "_commit", commit)
+        return self._commit
+
+    def __getattr__(self, label):
+        if label.startswith("__"):
+            raise AttributeError(label)
+        if label in self._fields:
+            value = self._value(self._fields.index(label))
+            if label == "body":
+                return value[:self._parse_trailers()[1]]
+            if label == "parents":
+                return tuple(value.split())
+            return value
+        if label.startswith("trailer_") and "body" in self._fields:
+            try:
+                return self._parse_trailers()[0][label]
+            except KeyError:
+                raise AttributeError(label)
+        if self._repos is None and self._commit is None:
+            raise AttributeError(
+                "%r of commit %r is not available out of its repository."
+                % (label, self.sha1))
+        return getattr(self._upgrade(), label)
+
+    def __eq__(self, value):
+        if not isinstance(value, (GitCommit, CommitRecord)):
+            value = self._repos.commit(value)
+        return self.sha1 == value.sha1
+
+    def __ne__(self, value):
+        return not self == value
+
+    def __le__(self, value):
+        return self._upgrade() <= value
+
+    def __lt__(self, value):
+        return self._upgrade() < value
+
+    def __hash__(self):
+        return hash(self.sha1)
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, self.sha1)
+
+
 def normpath(path, cwd=None):
     """path can be absolute or relative, if relative it uses the cwd given as
     param.
@@ -990,7 +2500,7 @@ def normpath(path, cwd=None):
 
 
 class GitConfig(SubGitObjectMixin):
-    """Interface to config values of git
+    r"""Interface to config values of git
 
     Let's create a fake GitRepos:
 
@@ -1001,20 +2511,26 @@ class GitConfig(SubGitObjectMixin):
 
         >>> cfg = GitConfig(repos)
 
+    Whole effective config is loaded once upon first query, values are
+    then looked up in this snapshot:
+
+        >>> repos.git.config.mock_returns = (
+        ...     "file:.git/config\0foo\nbar\0"
+        ...     "file:.git/config\0foo.wiz\nbar\0"
+        ...     "file:.git/config\0foo.multi\na\0"
+        ...     "command line:\0foo.multi\nb\0"
+        ...     "file:.git/config\0foo.flag\0")
+
     Query, by attributes or items:
 
-        >>> repos.git.config.mock_returns = "bar"
         >>> cfg.foo
-        Called gitRepos.git.config('foo')
+        Called gitRepos.git.config(['-z', '--list', '--show-origin'])
         'bar'
         >>> cfg["foo"]
-        Called gitRepos.git.config('foo')
         'bar'
         >>> cfg.get("foo")
-        Called gitRepos.git.config('foo')
         'bar'
         >>> cfg["foo.wiz"]
-        Called gitRepos.git.config('foo.wiz')
         'bar'
 
     Notice that you can't use attribute search in subsection as ``cfg.foo.wiz``
@@ -1024,54 +2540,147 @@ class GitConfig(SubGitObjectMixin):
     Nevertheless, you can do:
 
         >>> getattr(cfg, "foo.wiz")
-        Called gitRepos.git.config('foo.wiz')
         'bar'
 
+    Section and key names are case insensitive:
+
+        >>> cfg["FOO.Wiz"]
+        'bar'
+
+    As ``git config`` does, last value of multi-valued keys is returned,
+    and keys without values are valued to an empty string:
+
+        >>> cfg["foo.multi"], cfg["foo.flag"]
+        ('b', '')
+        >>> cfg.get_all("foo.multi")
+        ['a', 'b']
+        >>> cfg.origin("foo.multi")
+        'command line:'
+
     Default values
     --------------
 
     get item, and getattr default values can be used:
 
-        >>> del repos.git.config.mock_returns
-        >>> repos.git.config.mock_raises = ShellError('Key not found',
-        ...                                           errlvl=1, out="", err="")
-
-        >>> getattr(cfg, "foo", "default")
-        Called gitRepos.git.config('foo')
+        >>> getattr(cfg, "bar", "default")
         'default'
 
-        >>> cfg["foo"]  ## doctest: +ELLIPSIS
+        >>> cfg["bar"]  ## doctest: +ELLIPSIS
         Traceback (most recent call last):
         ...
-        KeyError: 'foo'
+        KeyError: 'bar'
 
-        >>> getattr(cfg, "foo")  ## doctest: +ELLIPSIS
+        >>> getattr(cfg, "bar")  ## doctest: +ELLIPSIS
         Traceback (most recent call last):
         ...
         AttributeError...
 
-        >>> cfg.get("foo", "default")
-        Called gitRepos.git.config('foo')
+        >>> cfg.get("bar", "default")
         'default'
 
-        >>> print("%r" % cfg.get("foo"))
-        Called gitRepos.git.config('foo')
+        >>> print("%r" % cfg.get("bar"))
+        None
+
+        >>> cfg.get_all("bar")
+        []
+
+    Invalidation
+    ------------
+
+    Changes made to the git config after the first query are not seen
+    until the snapshot is invalidated:
+
+        >>> repos.git.config.mock_returns = "file:.git/config\0bar\nwiz\0"
+        >>> cfg.invalidate()
+        >>> cfg.bar
+        Called gitRepos.git.config(['-z', '--list', '--show-origin'])
+        'wiz'
+
+    Older git
+    ---------
+
+    Before git 2.8, ``--show-origin`` is not supported: values are then
+    loaded without their origin:
+
+        >>> def config(args):
+        ...     if "--show-origin" in args:
+        ...         raise ShellError("unknown option")
+        ...     return "foo\nbar\0"
+        >>> repos.git.config.mock_returns = None
+        >>> repos.git.config.mock_returns_func = config
+        >>> cfg.invalidate()
+        >>> cfg.foo
+        Called gitRepos.git.config(['-z', '--list', '--show-origin'])
+        Called gitRepos.git.config(['-z', '--list'])
+        'bar'
+        >>> print(cfg.origin("foo"))
         None
 
     """
 
     def __init__(self, repos):
         super(GitConfig, self).__init__(repos)
+        self._values = None
 
-    def __getattr__(self, label):
+    @staticmethod
+    def _normalize(label):
+        ## only subsection names are case sensitive
+        section, _sep, rest = label.partition(".")
+        subsection, _sep, key = rest.rpartition(".")
+        return ".".join([section.lower()] +
+                        ([subsection] if subsection else []) +
+                        [key.lower()])
+
+    def _list(self):
+        """Return list of ``(origin, "key\\nvalue")`` of the whole config
+
+        Origins are None with git before 2.8, that doesn't support
+        ``--show-origin``.
+
+        """
         try:
-            res = self.git.config(label)
-        except ShellError as e:
-            if e.errlvl == 1 and e.out == "":
-                raise AttributeError("key %r is not found in git config."
-                                     % label)
-            raise
-        return res
+            fields = self.git.config(["-z", "--list", "--show-origin"]) \
+                         .split("\x00")
+        except ShellError:
+            return [(None, entry)
+                    for entry in self.git.config(["-z", "--list"])
+                                         .split("\x00")
+                    if entry]
+        return list(zip(fields[0::2], fields[1::2]))
+
+    def _load(self):
+        values = collections.defaultdict(list)
+        for origin, entry in self._list():
+            key, _sep, value = entry.partition("\n")
+            values[self._normalize(key)].append((value, origin))
+        return values
+
+    def invalidate(self):
+        """Forget the loaded config: next query will load it again"""
+        self._values = None
+
+    def _entries(self, label):
+        if self._values is None:
+            self._values = self._load()
+        return self._values.get(self._normalize(label), [])
+
+    def get_all(self, label):
+        """List of all values of a multi-valued key"""
+        return [value for value, _origin in self._entries(label)]
+
+    def origin(self, label):
+        """Origin of the value of ``label`` (as ``--show-origin``)"""
+        entries = self._entries(label)
+        return entries[-1][1] if entries else None
+
+    def __getattr__(self, label):
+        if label.startswith("_"):
+            raise AttributeError(label)
+        entries = self._entries(label)
+        if not entries:
+            raise AttributeError("key %r is not found in git config."
+                                 % label)
+        return entries[-1][0]
 
     def get(self, label, default=None):
         return getattr(self, label, default)
@@ -1116,36 +2725,69 @@ class GitCmd(SubGitObjectMixin):
 
 class GitRepos(object):
 
-    def __init__(self, path):
+    OBJECT_BACKENDS = ("subprocess", "native")
+
+    def __init__(self, path, object_backend="subprocess"):
 
         ## Saving this original path to ensure all future git commands
         ## will be done from this location.
         self._orig_path = os.path.abspath(path)
 
-        ## verify ``git`` command is accessible:
+        ## Probe the repository layout with only one ``git`` call. In
+        ## bare repositories, ``--show-toplevel`` fails after the other
+        ## values were printed.
         try:
-            self._git_version = self.git.version()
-        except ShellError:
+            with set_cwd(self._orig_path):
+                out, err, errlvl = cmd(
+                    ["git", "rev-parse", "--is-bare-repository", "--git-dir",
+                     "--show-toplevel"], shell=False)
+        except OSError:
             if DEBUG:
                 raise
             raise EnvironmentError(
                 "Required ``git`` command not found or broken in $PATH. "
-                "(calling ``git version`` failed.)")
-
-        ## verify that we are in a git repository
-        try:
-            self.git.remote()
-        except ShellError:
+                "(calling ``git rev-parse`` failed.)")
+        lines = out.split("\n")
+        if len(lines) < 2 or \
+               (lines[0] != "true" and (errlvl != 0 or len(lines) < 3)):
             if DEBUG:
-                raise
+                raise ShellError(
+                    "Wrapped command 'git rev-parse' exited with "
+                    "errorlevel %d.\n%s" % (errlvl, indent(err, "  | ")),
+                    errlvl=errlvl, command="git rev-parse", out=out, err=err)
             raise EnvironmentError(
-                "Not in a git repository. (calling ``git remote`` failed.)")
+                "Not in a git repository. (calling ``git rev-parse`` failed.)")
+
+        self.bare = lines[0] == "true"
+        self.toplevel = None if self.bare else lines[2]
+        self.gitdir = normpath(lines[1], cwd=self._orig_path)
+        self._cat_file = GitCatFile(self._orig_path)
+        self._procs = set()  ## running ``git log`` processes
+        self._object_store = None
+        self._ancestry = None
+        self._config = None
+        self.object_backend = object_backend
+
+    _sessions = {}  ## directory: shared ``GitRepos`` instance
+
+    @classmethod
+    def session(cls, path):
+        """Return the ``GitRepos`` shared by all lookups in ``path``
+
+        The repository is probed only once per run: the same instance
+        is returned for ``path`` and for its top level directory, until
+        it is closed.
 
-        self.bare = self.git.rev_parse(is_bare_repository=True) == "true"
-        self.toplevel = (None if self.bare else
-                         self.git.rev_parse(show_toplevel=True))
-        self.gitdir = normpath(self.git.rev_parse(git_dir=True),
-                               cwd=self._orig_path)
+        """
+        path = os.path.abspath(path)
+        repos = cls._sessions.get(path)
+        if repos is None:
+            repos = cls(path)
+            cls._sessions[path] = repos
+            if repos.toplevel:
+                cls._sessions.setdefault(
+                    normpath(repos.toplevel, cwd=path), repos)
+        return repos
 
     @classmethod
     def create(cls, directory, *args, **kwargs):
@@ -1166,78 +2808,481 @@ class GitRepos(object):
     def commit(self, identifier):
         return GitCommit(self, identifier)
 
+    @property
+    def object_backend(self):
+        """How single objects are read
+
+        - ``subprocess``: through a long-lived ``git cat-file`` process
+        - ``native``: directly from the git directory files, in
+          process. ``git cat-file`` is still used for what it can't
+          read (as complex revision syntax).
+
+        """
+        return self._object_backend
+
+    @object_backend.setter
+    def object_backend(self, value):
+        if value not in self.OBJECT_BACKENDS:
+            raise ValueError(
+                "Invalid object backend %r (choose among: %s)."
+                % (value, ", ".join(self.OBJECT_BACKENDS)))
+        self._object_backend = value
+        self._object_backends = [self._cat_file]
+        if value == "native":
+            if self._object_store is None:
+                self._object_store = GitObjectStore(self.gitdir)
+            self._object_backends.insert(0, self._object_store)
+
+    def read_object(self, name):
+        """Return ``(sha1, type, content)`` of object ``name`` or ``None``
+
+        Object is read by the object backend, so this won't launch any
+        process.
+
+        """
+        for backend in self._object_backends:
+            obj = backend.read(name)
+            if obj is not None:
+                return obj
+        return None
+
+    def read_commit(self, identifier):
+        """Return dict of values of commit ``identifier`` from its object
+
+        ``None`` is returned if the commit can't be read by the object
+        backend.
+
+        """
+        obj = self.read_object("%s^{commit}" % identifier)
+        if obj is None:
+            return None
+        sha1, _obj_type, content = obj
+        values = parse_commit_object(content)
+        values["sha1"] = sha1
+        return values
+
+    def close(self):
+        """Shut down long-lived git processes and release open files
+
+        Logs that are still being read are stopped.
+
+        """
+        for proc in list(self._procs):
+            terminate(proc)
+        self._procs.clear()
+        self._cat_file.close()
+        if self._object_store is not None:
+            self._object_store.close()
+        if self._ancestry is not None:
+            self._ancestry.close()
+            self._ancestry = None
+        for path, repos in list(self._sessions.items()):
+            if repos is self:
+                del self._sessions[path]
+
+    @property
+    def ancestry(self):
+        """``CommitDAG`` answering ancestry queries, or ``None``
+
+        The ``commit-graph`` file of the repository is used if it knows
+        about ``HEAD``. Otherwise only an ``AncestryIndex`` built by
+        ``index_ancestry()`` is used. Later commits are unknown to both,
+        and queries are then left to git.
+
+        """
+        if self._ancestry is None:
+            graph = CommitGraph.open(self.gitdir)
+            if graph is not None:
+                head = self.read_object("HEAD^{commit}")
+                if head is not None and head[0] in graph:
+                    self._ancestry = graph
+                    return graph
+                graph.close()  ## stale
+        return self._ancestry
+
+    def index_ancestry(self, refs):
+        """Build an ``AncestryIndex`` of the commits reachable from ``refs``
+
+        Note: refs can be GitCommit instance list or identifier list.
+
+        Only one ``git rev-list`` is run, but it walks all the history
+        of ``refs``: this is worth it only when this history is walked
+        anyway, as many ancestry queries are then answered without git.
+        Nothing is done if the ``commit-graph`` file is used.
+
+        """
+        if self.ancestry is not None:
+            return
+        with set_cwd(self._orig_path):
+            plog = Proc("git rev-list --parents --topo-order --stdin")
+        for ref in self._commits(refs):
+            plog.stdin.write("%s\n" % ref.sha1)
+        plog.stdin.close()
+        try:
+            self._ancestry = AncestryIndex(plog.stdout.read("\n"))
+        finally:
+            plog.stdout.close()
+            plog.stderr.close()
+            plog.wait()
+
     @property
     def git(self):
         return GitCmd(self)
 
     @property
     def config(self):
-        return GitConfig(self)
+        """``GitConfig`` snapshot, shared by all lookups
+
+        Use ``.config.invalidate()`` to see later changes.
+
+        """
+        if self._config is None:
+            self._config = GitConfig(self)
+        return self._config
+
+    def tag_index(self):
+        """Ordered dict of tag names to their metadata
 
-    def tags(self, contains=None):
-        """String list of repository's tag names
+        All tags are read with only one ``git for-each-ref``. Tags that
+        do not point to a commit are ignored. Metadata is a dict
+        holding:
+
+          - ``annotated``: whether this is an annotated tag
+          - ``sha1``: sha1 of the tagged commit
+          - ``author_date_timestamp``: author date of tagged commit
+          - ``committer_date_timestamp``: committer date of tagged commit
+          - ``tagger_date_timestamp``: tagger date if annotated
+
+        Tags pointing to tags have no tagged commit information
+        (valued to ``None``).
+
+        """
+        index = collections.OrderedDict()
+        out = self.git.for_each_ref(["--format=%s" % GIT_TAG_FORMAT_STRING,
+                                     "refs/tags"])
+        timestamp = lambda raw_date: raw_date.split(" ", 1)[0] \
+                    if raw_date else None
+        for line in out.split("\n"):
+            if line == '':
+                continue
+            dct = dict(zip(GIT_TAG_FORMAT_KEYS, line.split("\x00")))
+            annotated = dct["objecttype"] == "tag"
+            if annotated:
+                if dct["peeled_objecttype"] not in ("commit", "tag"):
+                    continue
+                if dct["peeled_objecttype"] == "tag":
+                    ## nested tags: tagged commit will be resolved lazily
+                    dct["peeled_objectname"] = None
+                    dct["peeled_authordate"] = None
+                    dct["peeled_committerdate"] = None
+                commit = dict((key, dct["peeled_%s" % key])
+                              for key in ("objectname", "authordate",
+                                          "committerdate"))
+            else:
+                if dct["objecttype"] != "commit":
+                    continue
+                commit = dct
+            index[dct["refname"][len("refs/tags/"):]] = {
+                "annotated": annotated,
+                "sha1": commit["objectname"],
+                "author_date_timestamp": timestamp(commit["authordate"]),
+                "committer_date_timestamp": timestamp(commit["committerdate"]),
+                "tagger_date_timestamp":
+                    timestamp(dct["taggerdate"]) if annotated else None,
+            }
+        return index
+
+    def tags(self, contains=None, filter_regexp=None):
+        """List of repository's tags as ``GitCommit``
 
         Current tag order is committer date timestamp of tagged commit.
         No firm reason for that, and it could change in future version.
 
+        Only tags with name matching ``filter_regexp`` are returned if
+        it is provided. Tags metadata are loaded once for all from
+        ``tag_index()``.
+
         """
+        index = self.tag_index()
         if contains:
-            tags = self.git.tag(contains=contains).split("\n")
+            contains = self.commit(contains).sha1
+            by_sha1 = collections.defaultdict(list)
+            for name, info in index.items():
+                by_sha1[info["sha1"]].append(name)
+            shas = None if self.ancestry is None else \
+                self.ancestry.contains(contains, list(by_sha1.keys()))
+            if shas is None:
+                ## no ancestry index, or commits unknown to it
+                names = [name for name
+                         in self.git.tag(contains=contains).split("\n")
+                         if name in index]
+            else:
+                shas = set(shas)
+                names = [name for name, info in index.items()
+                         if info["sha1"] in shas]
         else:
-            tags = self.git.tag().split("\n")
+            names = list(index.keys())
+        if filter_regexp is not None:
+            names = [name for name in names if re.match(filter_regexp, name)]
+
+        tags = []
+        for name in names:
+            tag = self.commit(name)
+            tag._tag_info = info = index[name]
+            for attr in ("sha1", "author_date_timestamp",
+                         "committer_date_timestamp"):
+                if info[attr] is not None:
+                    setattr(tag, attr, info[attr])
+            tags.append(tag)
+
         ## Should we use new version name sorting ?  refering to :
         ## ``git tags --sort -v:refname`` in git version >2.0.
         ## Sorting and reversing with command line is not available on
         ## git version <2.0
-        return sorted([self.commit(tag) for tag in tags if tag != ''],
-                      key=lambda x: int(x.committer_date_timestamp))
+        return sorted(tags, key=lambda x: int(x.committer_date_timestamp))
+
+    def revlist_range(self, revlist):
+        """Return newest and oldest commit of ``revlist`` and its excludes
+
+        ``revlist`` is resolved by one ``git rev-parse --revs-only``,
+        which fails on invalid revisions and gives the excluded
+        revisions (``^rev``) as sha1. The resolved arguments are then
+        given to one ``git rev-list`` whose output is streamed, so that
+        memory usage doesn't depend on the size of the range.
+
+        Returns a ``(first, last, excludes)`` tuple of sha1, ``first``
+        and ``last`` being ``None`` if ``revlist`` selects no commits.
+
+        """
+        revs = [rev for rev in self.git.rev_parse(
+            ["--revs-only", ] + revlist + ["--", ]).split("\n") if rev]
+        excludes = [rev[1:] for rev in revs if rev.startswith("^")]
+        command = ["git", "rev-list"] + revs + ["--", ]
+        ## errors go to a file: reading them after the whole output
+        ## can't block git on a full pipe.
+        errors = tempfile.TemporaryFile()
+        try:
+            with set_cwd(self._orig_path):
+                plog = Popen(command, stdout=PIPE, stderr=errors,
+                             close_fds=PLT_CFG['close_fds'])
+            first = last = None
+            try:
+                for line in Phile(plog.stdout).read("\n"):
+                    if line:
+                        if first is None:
+                            first = line
+                        last = line
+            finally:
+                plog.stdout.close()
+            errlvl = plog.wait()
+            errors.seek(0)
+            err = errors.read().decode(_preferred_encoding, "replace").strip()
+        finally:
+            errors.close()
+        if errlvl != 0:
+            raise ShellError(
+                "Wrapped command %r exited with errorlevel %d.\n%s"
+                % (" ".join(command), errlvl,
+                   indent("stderr:\n%s" % indent(err, "| "), chars="  ")),
+                errlvl=errlvl, command=command, out="", err=err)
+        return first, last, excludes
+
+    def _commits(self, refs):
+        """Return list of commits of ``refs``, given as commits or names"""
+        return [ref if isinstance(ref, (GitCommit, CommitRecord))
+                else self.commit(ref) for ref in refs]
 
     def log(self, includes=["HEAD", ], excludes=[], include_merge=True,
-            encoding=_preferred_encoding):
+            encoding=_preferred_encoding, with_parents=False, fields=None):
         """Reverse chronological list of git repository's commits
 
         Note: rev lists can be GitCommit instance list or identifier list.
 
+        If ``with_parents`` is set, each commit yielded will also get a
+        ``parents`` attribute holding the list of its parents sha1.
+
+        Only ``fields`` of ``GIT_FORMAT_KEYS`` are asked to ``git log``
+        if provided (``sha1`` is always asked). Other attributes are
+        read upon access, one commit at a time.
+
         """
 
-        refs = {'includes': includes,
-                'excludes': excludes}
-        for ref_type in ('includes', 'excludes'):
-            for idx, ref in enumerate(refs[ref_type]):
-                if not isinstance(ref, GitCommit):
-                    refs[ref_type][idx] = self.commit(ref)
+        format_keys = log_format_keys(fields, with_parents)
 
         ## --topo-order: don't mix commits from separate branches.
         plog = Proc("git log --stdin -z --topo-order --pretty=format:%s %s --"
-                    % (GIT_FULL_FORMAT_STRING,
+                    % ("%x00".join(format_keys.values()),
                        '--no-merges' if not include_merge else ''),
                     encoding=encoding)
-        for ref in refs["includes"]:
+        for ref in self._commits(includes):
             plog.stdin.write("%s\n" % ref.sha1)
 
-        for ref in refs["excludes"]:
+        for ref in self._commits(excludes):
             plog.stdin.write("^%s\n" % ref.sha1)
         plog.stdin.close()
 
-        def mk_commit(dct):
-            """Creates an already set commit from a dct"""
-            c = self.commit(dct["sha1"])
-            for k, v in dct.items():
-                setattr(c, k, v)
-            return c
-
+        fields = tuple(format_keys)  ## shared by all records
         values = plog.stdout.read("\x00")
 
+        self._procs.add(plog)
         try:
             while True:  ## next(values) will eventualy raise a StopIteration
-                yield mk_commit(dict([(key, next(values))
-                                      for key in GIT_FORMAT_KEYS]))
+                yield CommitRecord(self, fields,
+                                   [next(values) for _key in fields])
         except StopIteration:
-            pass  ## since 3.7, we are not allowed anymore to trickle down
-                  ## StopIteration.
-        finally:
             plog.stdout.close()
             plog.stderr.close()
+            plog.wait()
+        finally:
+            ## consumer stopped before the end: don't let git walk on
+            self._procs.discard(plog)
+            terminate(plog)
+
+
+def bit_indexes(bits):
+    """Yield indexes of the set bits of integer ``bits``, lowest first
+
+        >>> list(bit_indexes(0b10110))
+        [1, 2, 4]
+
+    """
+    while bits:
+        lowest = bits & -bits
+        yield lowest.bit_length() - 1
+        bits ^= lowest
+
+
+def count_bits(counts, bits, delta=1):
+    """Add ``delta`` to items of ``counts`` at the indexes of set ``bits``
+
+        >>> counts = [0, 0, 0]
+        >>> count_bits(counts, 0b101)
+        >>> counts
+        [1, 0, 1]
+
+    """
+    for idx in bit_indexes(bits):
+        counts[idx] += delta
+
+
+def topo_order(commits):
+    """Order ``commits`` as ``git log --topo-order`` would walk them alone
+
+    ``commits`` must hold ``parents`` attributes. Like git, a commit is
+    output once all its children are, the last parent queued being
+    walked first:
+
+        >>> from collections import namedtuple
+        >>> C = namedtuple("C", "sha1 parents")
+        >>> commits = [C("m", ["a", "b"]), C("a", ["o"]), C("b", ["o"]),
+        ...            C("o", ["x"])]
+        >>> [commit.sha1 for commit in topo_order(commits)]
+        ['m', 'b', 'a', 'o']
+
+    """
+    by_sha1 = dict((commit.sha1, commit) for commit in commits)
+    indegree = dict.fromkeys(by_sha1, 0)
+    for commit in commits:
+        for parent in commit.parents:
+            if parent in indegree:
+                indegree[parent] += 1
+
+    stack = [commit for commit in reversed(commits)
+             if not indegree[commit.sha1]]
+    ordered = []
+    while stack:
+        commit = stack.pop()
+        for parent in commit.parents:
+            if parent in indegree:
+                indegree[parent] -= 1
+                if not indegree[parent]:
+                    stack.append(by_sha1[parent])
+        ordered.append(commit)
+    return ordered
+
+
+def partition_log(repository, tips, excluders, excludes=[],
+                  include_merge=True, encoding=_preferred_encoding,
+                  fields=None):
+    """Partition commits of a single history walk between versions
+
+    Version ``idx`` holds the commits reachable from ``tips[idx]`` that
+    are neither reachable from any of ``excluders[idx + 1:]`` nor from
+    ``excludes``. This is exactly what one ``git log`` per version
+    would return, in the same order, but only one ``git log`` is
+    launched whatever the number of versions.
+
+    As ``--topo-order`` guarantees that a commit is always output
+    after all its children, reachability can be propagated from
+    children to parents while streaming: each commit carries the
+    bitmask of the tips reaching it, and the highest index of the
+    excluders reaching it.
+
+    Yields one commit list for each tip, as soon as no commit left to
+    walk can belong to it, so that the walk can be stopped early.
+
+    """
+
+    tip_masks = collections.defaultdict(int)
+    for idx, tip in enumerate(tips):
+        tip_masks[tip.sha1] |= 1 << idx
+
+    ## first excluder is never used as an exclusion
+    excluder_ranks = {}
+    for idx, excluder in enumerate(excluders[1:], 1):
+        excluder_ranks[excluder.sha1] = max(
+            excluder_ranks.get(excluder.sha1, 0), idx)
+
+    partition = [[] for _tip in tips]
+    ## sha1 -> (tip mask, excluder rank) from children, tips not walked
+    ## yet are pending also.
+    inherited = dict((sha1, (mask, 0)) for sha1, mask in tip_masks.items())
+    ## number of commits not walked yet that could belong to each version,
+    ## at first its tip only.
+    nb_pending = [1 for _tip in tips]
+
+    def version(idx):
+        commits = topo_order(partition[idx])
+        partition[idx] = None
+        return commits if include_merge else \
+            [commit for commit in commits if len(commit.parents) <= 1]
+
+    current = 0  ## index of the next version to yield
+
+    ## merges are always walked to propagate reachability through them,
+    ## they are filtered out afterwards if required.
+    for commit in repository.log(includes=list(tips) + list(excluders[1:]),
+                                 excludes=list(excludes),
+                                 include_merge=True,
+                                 encoding=encoding,
+                                 with_parents=True,
+                                 fields=fields):
+        mask, rank = inherited.pop(commit.sha1, (0, 0))
+        count_bits(nb_pending, mask >> rank << rank, -1)
+        rank = max(rank, excluder_ranks.get(commit.sha1, 0))
+        for parent in commit.parents:
+            ## only versions not excluded by an older excluder are
+            ## pending, and no more of them once a version is excluded.
+            parent_mask, parent_rank = inherited.get(parent, (0, 0))
+            old = parent_mask >> parent_rank << parent_rank
+            parent_mask, parent_rank = inherited[parent] = (
+                parent_mask | mask, max(parent_rank, rank))
+            new = parent_mask >> parent_rank << parent_rank
+            count_bits(nb_pending, old & ~new, -1)
+            count_bits(nb_pending, new & ~old, 1)
+
+        ## commit belongs to any reaching tip not excluded by an older
+        ## excluder.
+        for idx in bit_indexes(mask >> rank << rank):
+            partition[idx].append(commit)
+
+        while current < len(tips) and not nb_pending[current]:
+            yield version(current)
+            current += 1
+
+    ## commits still pending are excluded by ``excludes``: never walked
+    for idx in range(current, len(tips)):
+        yield version(idx)
 
 
 def first_matching(section_regexps, string):
@@ -1249,6 +3294,107 @@ def first_matching(section_regexps, string):
                 return section
 
 
+## patterns that can't be nested in a bigger regex as is, as group
+## numbers change: back references and conditional groups.
+REGEX_UNCOMBINABLE = r'\\[1-9]|\(\?\('
+
+## python before 3.5 doesn't compile regexes with more groups
+REGEX_MAX_GROUPS = 99 if sys.version_info < (3, 5) else float("inf")
+
+
+class CommitClassifier(object):
+    r"""Classify commit subjects in sections, or as ignored
+
+    It gives the same results as checking ``ignore_regexps`` and then
+    calling ``first_matching()``, but all patterns are compiled once:
+
+        >>> classifier = CommitClassifier(
+        ...     ignore_regexps=[r'!minor'],
+        ...     section_regexps=[('New', [r'^new:', r'^add ']),
+        ...                      ('Fix', [r'fix:']),
+        ...                      ('Other', None)])
+        >>> classifier.classify("new: stuff !minor") is classifier.IGNORED
+        True
+        >>> classifier.classify_all(["new: fix: foo", "add bar", "foo"])
+        ['New', 'New', 'Other']
+
+    Subjects matching no section are classified in section ``None``.
+
+    Consecutive patterns are also merged by chunks in alternations, so
+    that one scan of the subject tells if any of them matches. Only
+    patterns of the first matching chunk are then tried in order.
+
+    """
+
+    IGNORED = object()
+    CHUNK_SIZE = 32  ## bigger alternations get slower in ``re``
+
+    def __init__(self, ignore_regexps=[], section_regexps=[(None, '')]):
+        rules = [(self.IGNORED, regexp) for regexp in ignore_regexps]
+        self._default = None
+        for section, regexps in section_regexps:
+            if regexps is None:
+                self._default = section
+                break  ## next ones would never be reached
+            rules.extend((section, regexp) for regexp in regexps)
+
+        ## list of (alternation search or None, [(search, label), ...])
+        self._chunks = []
+        chunk, nb_groups = [], 0
+        for label, regexp in rules:
+            compiled = re.compile(regexp)
+            combinable = isinstance(regexp, basestring) and \
+                not compiled.groupindex and \
+                not compiled.flags & ~re.UNICODE and \
+                re.search(REGEX_UNCOMBINABLE, regexp) is None
+            if not combinable or len(chunk) == self.CHUNK_SIZE or \
+                   nb_groups + compiled.groups > REGEX_MAX_GROUPS:
+                self._add_chunk(chunk)
+                chunk, nb_groups = [], 0
+            if not combinable:
+                self._chunks.append((None, [(compiled.search, label)]))
+                continue
+            chunk.append((regexp, compiled, label))
+            nb_groups += compiled.groups
+        self._add_chunk(chunk)
+
+    def _add_chunk(self, chunk):
+        if not chunk:
+            return
+        alternation = re.compile(
+            "|".join("(?:%s)" % regexp for regexp, _c, _l in chunk))
+        self._chunks.append((
+            alternation.search if len(chunk) > 1 else None,
+            [(compiled.search, label) for _r, compiled, label in chunk]))
+
+    def classify(self, subject):
+        """Return the section label of ``subject``, or ``IGNORED``"""
+        for alternation, rules in self._chunks:
+            if alternation is not None and alternation(subject) is None:
+                continue
+            for search, label in rules:
+                if search(subject) is not None:
+                    return label
+        return self._default
+
+    def classify_all(self, subjects):
+        """Return the list of the section labels of ``subjects``
+
+        Identical subjects (as automatic merge ones) are classified once.
+
+        """
+        labels = {}
+        classify = self.classify
+        result = []
+        for subject in subjects:
+            try:
+                label = labels[subject]
+            except KeyError:
+                label = labels[subject] = classify(subject)
+            result.append(label)
+        return result
+
+
 def ensure_template_file_exists(label, template_name):
     """Return template file path given a label hint and the template name
 
@@ -1262,7 +3408,7 @@ def ensure_template_file_exists(label, template_name):
     """
 
     try:
-        template_path = GitRepos(os.getcwd()).config.get(
+        template_path = GitRepos.session(os.getcwd()).config.get(
             "gitchangelog.template-path")
     except ShellError as e:
         stderr(
@@ -1301,98 +3447,985 @@ def ensure_template_file_exists(label, template_name):
 ## Output Engines
 ##
 
-@available_in_config
-def rest_py(data, opts={}):
-    """Returns ReStructured Text changelog content from data"""
+def rest_py_title(label, char="="):
+    return (label.strip() + "\n") + (char * len(label) + "\n")
+
+
+def rest_py_commit(commit):
+    """Returns ReStructured Text entry of a commit for ``rest_py``"""
+    subject = commit["subject"]
+    subject += " [%s]" % (", ".join(commit["authors"]), )
+
+    entry = indent('\n'.join(wrap_text(subject)),
+                   first="- ").strip() + "\n"
+
+    if commit["body"]:
+        entry += "\n" + indent(commit["body"])
+        entry += "\n"
+
+    return entry
+
+
+def rest_py_fragment(commit, fragments=None, rendered=None):
+    """Returns ``rest_py_commit(commit)``, reused from ``fragments`` if any
+
+    ``fragments`` is a ``FragmentCache.fragments()`` object. Newly
+    rendered entries are appended to the ``rendered`` list as ``(sha1,
+    text)`` pairs, for the main process to store them in ``fragments``
+    (render workers can't).
+
+    """
+    if fragments is None:
+        return rest_py_commit(commit)
+    entry = fragments.get(commit)
+    if entry is None:
+        entry = rest_py_commit(commit)
+        rendered.append((fragments.sha1(commit), entry))
+    return entry
+
+
+@available_in_config
+def rest_py(data, opts={}):
+    """Returns ReStructured Text changelog content from data
+
+    (see ``rest_py_iter()`` to get it one version at a time)
+
+    """
+    return "".join(rest_py_iter(data, opts))
+
+
+def rest_py_iter(data, opts={}):
+    """Yield ReStructured Text changelog content from data
+
+    Each version is yielded as soon as it is rendered.
+
+    Commits' entries are reused from (and stored in) the
+    ``FragmentCache`` object of ``opts["fragment_cache"]`` if any.
+    Versions are rendered by ``opts["render_workers"]`` processes if
+    more than one is asked for (see ``render_versions()``).
+
+    """
+    fragment_cache = opts.get("fragment_cache")
+    fragments = fragment_cache.fragments("rest_py") \
+                if fragment_cache is not None else None
+
+    def render_version(version):
+        rendered = []  ## new fragments
+        title = "%s (%s)" % (version["tag"], version["date"]) \
+                if version["tag"] else \
+                opts["unreleased_version_label"]
+        parts = [rest_py_title(title, char="-")]
+
+        sections = version["sections"]
+        nb_sections = len(sections)
+        for section in sections:
+
+            section_label = section["label"] if section.get("label", None) \
+                            else "Other"
+
+            if not (section_label == "Other" and nb_sections == 1):
+                parts.append("\n" + rest_py_title(section_label, "~"))
+
+            for commit in section["commits"]:
+                parts.append(rest_py_fragment(commit, fragments, rendered))
+        return "".join(parts), rendered
+
+    if data["title"]:
+        yield rest_py_title(data["title"], char="=") + "\n\n"
+
+    versions = (version for version in data["versions"]
+                if len(version["sections"]) > 0)
+    for text, rendered in render_versions(render_version, versions,
+                                          opts.get("render_workers")):
+        for sha1, entry in rendered:
+            fragments.store(sha1, entry)
+        yield text + "\n\n"
+
+    if fragment_cache is not None:
+        ## last versions can come from workers after the history walk
+        ## (and its save of the cache) ended.
+        fragment_cache.save()
+
+
+## ``git log`` fields used besides the ones of ``versions_data_iter``
+rest_py.log_fields = rest_py_iter.log_fields = ()
+## streaming variant used by ``iter_changelog()``
+rest_py.iter = rest_py_iter
+
+
+class _WriterCancelled(Exception):
+    """Raised in writers of ``iter_writes()`` when nobody reads anymore"""
+
+
+class _WriteBuffer(object):
+    """File-like object given to producers of ``iter_writes()``
+
+    Written text is put in the ``chunks`` queue by chunks of about
+    ``chunk_size`` chars, as ``(text, None)`` tuples.
+
+    """
+
+    def __init__(self, chunks, cancelled, chunk_size):
+        self._chunks = chunks
+        self._cancelled = cancelled
+        self._chunk_size = chunk_size
+        self._pending = []
+        self._size = 0
+
+    def write(self, text):
+        if self._cancelled.is_set():
+            raise _WriterCancelled()
+        self._pending.append(text)
+        self._size += len(text)
+        if self._size >= self._chunk_size:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            self._chunks.put(("".join(self._pending), None))
+            self._pending = []
+            self._size = 0
+
+    def put(self, item):
+        if self._cancelled.is_set():
+            raise _WriterCancelled()
+        self.flush()
+        self._chunks.put((item, None))
+
+
+def _cancel_writer(thread, chunks, cancelled):
+    """Stop the producer ``thread`` of ``iter_writes()`` and wait for it"""
+    cancelled.set()
+    ## unblock the producer if it is waiting for us
+    while thread.is_alive():
+        try:
+            chunks.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    thread.join()
+
+
+def iter_writes(producer, chunk_size=8192, max_chunks=16):
+    """Iterate through what ``producer`` writes while it is running
+
+    ``producer`` is called in a separate thread with a file-like object
+    whose ``write`` method is to be used. Written text is yielded by
+    chunks of about ``chunk_size`` chars, and the producer waits when
+    ``max_chunks`` chunks are not consumed yet. Exceptions of the
+    producer are raised to the consumer.
+
+        >>> def producer(buf):
+        ...     for c in "abc":
+        ...         buf.write(c)
+        >>> list(iter_writes(producer, chunk_size=2))
+        ['ab', 'c']
+
+    Non-text items can be sent with ``put``: they are yielded as is, in
+    their place between written texts.
+
+        >>> def producer(buf):
+        ...     buf.write("a")
+        ...     buf.put(1)
+        ...     buf.write("b")
+        >>> list(iter_writes(producer))
+        ['a', 1, 'b']
+
+    """
+    chunks = queue.Queue(maxsize=max_chunks)
+    done = object()
+    cancelled = threading.Event()
+
+    def run():
+        try:
+            buf = _WriteBuffer(chunks, cancelled, chunk_size)
+            producer(buf)
+            buf.flush()
+            chunks.put((done, None))
+        except BaseException as e:  ## pylint: disable=broad-except
+            chunks.put((done, e))
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            chunk, exception = chunks.get()
+            if chunk is done:
+                if exception is not None:
+                    raise exception
+                return
+            yield chunk
+    finally:
+        _cancel_writer(thread, chunks, cancelled)
+
+
+_pool_functions = {}  ## ``ForkPool`` workers' functions, by pool key
+
+
+def _set_pool_function(key, function):
+    _pool_functions[key] = function
+
+
+def _pool_call(key, arg):
+    return _pool_functions[key](arg)
+
+
+class ForkPool(object):
+    """Apply ``function`` in worker processes
+
+    ``function`` is usually a closure over objects that can't be pickled
+    (templates, ``TextProc`` chains, config file functions...): workers
+    are forked with it whenever the platform allows it. Otherwise it is
+    pickled to the workers, unless ``fork_only`` is set, and
+    ``ValueError`` is raised if this fails.
+
+    Arguments and results are pickled: commits lose their repository on
+    the way, and only values already read are available to ``function``.
+
+    """
+
+    def __init__(self, function, workers, label="", fork_only=False):
+        if hasattr(multiprocessing, "get_context"):
+            forks = "fork" in multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                "fork" if forks else None)
+        else:  ## python 2
+            forks = not WIN32
+            context = multiprocessing
+        self._key = id(self)
+        self._call = functools.partial(_pool_call, self._key)
+        if forks:
+            _set_pool_function(self._key, function)
+            self._pool = context.Pool(workers)
+        elif fork_only:
+            raise ValueError("Can't fork %s worker processes." % label)
+        else:
+            try:
+                pickle.dumps(function)
+            except Exception as e:
+                raise ValueError(
+                    "Can't send %s function to worker processes (%s)."
+                    % (label, e))
+            self._pool = context.Pool(workers,
+                                      initializer=_set_pool_function,
+                                      initargs=(self._key, function))
+        self.workers = workers
+
+    def submit(self, arg):
+        """Return the ``AsyncResult`` of ``function(arg)``"""
+        return self._pool.apply_async(self._call, (arg, ))
+
+    def map(self, args, chunk_size=1):
+        """Return the list of ``function(arg)`` for each of ``args``"""
+        return self._pool.map(self._call, args, chunk_size)
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+        _pool_functions.pop(self._key, None)
+
+
+def version_render_pool(render_version, workers):
+    """Return a ``ForkPool`` of ``render_version``, or None if not used
+
+    Workers are forked, as ``render_version`` is usually a closure over
+    the whole rendering context. A warning is issued if ``workers`` asks
+    for a pool that can't be created.
+
+    """
+    if workers is None or workers <= 1:
+        return None
+    try:
+        return ForkPool(render_version, workers, label="render",
+                        fork_only=True)
+    except ValueError as e:
+        warn("%s Versions are rendered serially." % e)
+        return None
+
+
+def render_versions(render_version, versions, workers=None):
+    """Yield ``render_version(version)`` for each of ``versions``
+
+    With more than one of ``workers``, versions are rendered in parallel
+    by a ``ForkPool``, and results are yielded in the order of
+    ``versions``: the output is the same as with a serial rendering.
+
+        >>> list(render_versions(str.upper, ["a", "b"]))
+        ['A', 'B']
+        >>> list(render_versions(str.upper, ["a", "b", "c"], workers=2))
+        ['A', 'B', 'C']
+
+    """
+    pool = version_render_pool(render_version, workers)
+    if pool is None:
+        for version in versions:
+            yield render_version(version)
+        return
+    try:
+        ## only a few versions are sent ahead of the one being yielded
+        pending = collections.deque()
+        for version in versions:
+            pending.append(pool.submit(version))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.close()
+
+
+## formatter engines
+
+def template_cache_dir(label):
+    """Return the writable cache directory named ``label``, or None
+
+    Caches (as templates compiled by the ``label`` engine) are stored in
+    the ``gitchangelog/<label>`` directory of the current git
+    repository's git dir.
+
+    """
+    try:
+        cache_dir = os.path.join(GitRepos.session(os.getcwd()).gitdir,
+                                 "gitchangelog", label)
+    except (ShellError, EnvironmentError):
+        return None
+    try:
+        os.makedirs(cache_dir)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            return None
+    return cache_dir if os.access(cache_dir, os.W_OK) else None
+
+
+def template_cache_path(cache_dir, template_path, content, salt, ext):
+    """Return the path of a compiled template in ``cache_dir``
+
+    The name depends on the template path, its ``content`` (as bytes) and
+    ``salt`` (the version of the compiler), so that any change of these
+    uses a new file. Files previously compiled from the same template
+    path are removed.
+
+    """
+    template_path = os.path.realpath(template_path)
+    prefix = hashlib.sha1(
+        repr(template_path).encode("utf-8", "replace")).hexdigest()[:16]
+    key = hashlib.sha1(
+        ("%s\0" % (salt, )).encode("utf-8") + content).hexdigest()
+    name = "%s-%s" % (prefix, key)
+    ## including python's bytecode of compiled modules
+    for stale in glob.glob(os.path.join(cache_dir, prefix + "-*")) + \
+            glob.glob(os.path.join(cache_dir, "__pycache__", prefix + "-*")):
+        if not os.path.basename(stale).startswith(name + "."):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return os.path.join(cache_dir, name + ext)
+
+
+class FragmentCache(object):
+    """Persistent cache of commit entries, keyed by commit's sha1
+
+    Entries hold what ``versions_data_iter()`` computes from a commit
+    (its section, processed subject and body, and authors), and the
+    last text an output engine rendered for it (see ``fragments()``).
+
+    These only depend on the commit and on the configuration, that is
+    summarized by ``fingerprint`` (see ``FragmentCache.fingerprint()``):
+    the cache is stored in ``<fingerprint>.marshal`` file of
+    ``cache_dir``, and files of other fingerprints are removed when
+    saving it.
+
+        >>> import tempfile
+        >>> cache_dir = tempfile.mkdtemp()
+        >>> cache = FragmentCache(cache_dir, FragmentCache.fingerprint("rc"))
+        >>> cache.set("abc", {"ignored": True})
+        >>> cache.save()
+        >>> cache = FragmentCache(cache_dir, FragmentCache.fingerprint("rc"))
+        >>> cache.get("abc"), cache.get("def")
+        ({'ignored': True}, None)
+        >>> cache = FragmentCache(cache_dir, FragmentCache.fingerprint("rc2"))
+        >>> cache.get("abc")
+
+    """
+
+    def __init__(self, cache_dir, fingerprint):
+        self.cache_dir = cache_dir
+        self.filename = os.path.join(cache_dir, fingerprint + ".marshal")
+        self._entries = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(*parts):
+        """Return the fingerprint of the configuration given in ``parts``
+
+        ``parts`` are strings (or bytes) as the content of configuration
+        files. The version of gitchangelog is part of the fingerprint.
+
+        """
+        fingerprint = hashlib.sha1(("%s\0" % __version__).encode("utf-8"))
+        for part in parts:
+            fingerprint.update(part if isinstance(part, bytes)
+                               else part.encode("utf-8"))
+            fingerprint.update(b"\0")
+        return fingerprint.hexdigest()
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.filename):
+                try:
+                    with open(self.filename, "rb") as f:
+                        self._entries = marshal.load(f)
+                except (EOFError, ValueError, TypeError):
+                    pass  ## truncated or incompatible, start over
+        return self._entries
+
+    def get(self, sha1):
+        entry = self.entries.get(sha1)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, sha1, entry):
+        self.entries[sha1] = entry
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        """Have next ``save()`` write the cache, as an entry was changed"""
+        self._dirty = True
+
+    def fragments(self, key):
+        """Return an object to get and set texts rendered for commits
+
+        ``key`` identifies the output engine (with its template if any):
+        only the last rendered text of a commit is kept, so that
+        fragments of outdated templates are dropped.
+
+            >>> import tempfile
+            >>> cache = FragmentCache(tempfile.mkdtemp(), "x")
+            >>> cache.set("abc", {"ignored": False})
+            >>> fragments = cache.fragments("engine")
+            >>> class Commit(object):
+            ...     sha1 = "abc"
+            >>> commit = {"commit": Commit()}
+            >>> print(fragments.get(commit))
+            None
+            >>> fragments.set(commit, "- text")
+            >>> fragments.get(commit)
+            '- text'
+            >>> print(cache.fragments("other engine").get(commit))
+            None
+
+        """
+        return _Fragments(self, key)
+
+    def save(self):
+        """Write the cache if it changed, ignoring write errors"""
+        if not self._dirty:
+            return
+        tmp_filename = "%s.%d.tmp" % (self.filename, os.getpid())
+        try:
+            with open(tmp_filename, "wb") as f:
+                marshal.dump(self.entries, f)
+            if WIN32 and os.path.exists(self.filename):
+                os.remove(self.filename)
+            os.rename(tmp_filename, self.filename)
+        except (OSError, IOError):
+            return
+        self._dirty = False
+        for filename in glob.glob(os.path.join(self.cache_dir, "*.marshal")):
+            if filename != self.filename:
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+
+
+class _Fragments(object):
+    """Texts rendered by an output engine for commits, see ``fragments()``"""
+
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+
+    @staticmethod
+    def sha1(commit):
+        """Return sha1 of ``commit`` entry, or None"""
+        try:
+            return commit["commit"].sha1
+        except (TypeError, KeyError, AttributeError):
+            return None  ## not a commit of ``versions_data_iter()``
+
+    def get(self, commit):
+        """Return text rendered for ``commit`` entry, or None"""
+        entry = self.cache.entries.get(self.sha1(commit))
+        if entry is None:
+            return None
+        fragment = entry.get("fragment")
+        return fragment[1] if fragment and fragment[0] == self.key else None
+
+    def set(self, commit, text):
+        self.store(self.sha1(commit), text)
+
+    def store(self, sha1, text):
+        """Set text rendered for the commit ``sha1``"""
+        entry = self.cache.entries.get(sha1)
+        if entry is not None:
+            entry["fragment"] = (self.key, text)
+            self.cache.mark_dirty()
+
+
+def mustache_split(template, section):
+    r"""Split template around its only top level ``section``
+
+    Returns the parsed templates before, of, and after the section,
+    or ``None`` if the section is not found exactly once, or is not
+    at top level. Standalone section tags are cut with their whole
+    line, so that rendering the three parts gives the same output
+    as rendering the template:
+
+        >>> prefix, section, suffix = mustache_split(
+        ...     "a\n{{#s}}\n{{v}}\n{{/s}}\nb", "s")
+        >>> pystache.render(prefix, {})
+        'a\n'
+        >>> pystache.render(section, {"s": [{"v": 1}, {"v": 2}]})
+        '1\n2\n'
+        >>> pystache.render(suffix, {})
+        'b'
+
+        >>> print(mustache_split("{{#a}}{{#s}}{{/s}}{{/a}}", "s"))
+        None
+
+    """
+    opening = list(re.finditer(r"\{\{[#^]\s*%s\s*\}\}" % section,
+                               template))
+    closing = list(re.finditer(r"\{\{/\s*%s\s*\}\}" % section,
+                               template))
+    if len(opening) != 1 or len(closing) != 1 or \
+           opening[0].group(0)[2] != "#":
+        return None
+    start, end = opening[0].start(), closing[0].end()
+    line_start = template.rfind("\n", 0, start) + 1
+    if not template[line_start:start].strip():
+        start = line_start
+    line_end = template.find("\n", end)
+    line_end = len(template) if line_end < 0 else line_end + 1
+    if not template[end:line_end].strip():
+        end = line_end
+    try:
+        return tuple(pystache.parse(part)
+                     for part in (template[:start],
+                                  template[start:end],
+                                  template[end:]))
+    except Exception:  ## pylint: disable=broad-except
+        return None  ## sections are not balanced in some part
+
+
+_MUSTACHE_NOT_FOUND = object()
+_BUILTIN_MODULE = type(0).__module__
+
+
+def mustache_get_value(item, key):
+    """Return value of ``key`` in a context item as pystache does"""
+    if isinstance(item, dict):
+        if key in item:
+            return item[key]
+    elif type(item).__module__ != _BUILTIN_MODULE:
+        try:
+            attr = getattr(item, key)
+        except AttributeError:
+            pass
+        else:
+            return attr() if callable(attr) else attr
+    return _MUSTACHE_NOT_FOUND
+
+
+def mustache_lookup(stack, parts):
+    """Return value of a dotted name (split in ``parts``) in ``stack``
+
+    ``parts`` is None for the implicit iterator ``.``. As in pystache
+    (with its default ``missing_tags``), missing names have an empty
+    string value.
+
+    """
+    if parts is None:
+        return stack[-1] if stack else ""
+    for item in reversed(stack):
+        value = mustache_get_value(item, parts[0])
+        if value is not _MUSTACHE_NOT_FOUND:
+            break
+    else:
+        return ""
+    for part in parts[1:]:
+        value = mustache_get_value(value, part)
+        if value is _MUSTACHE_NOT_FOUND:
+            return ""
+    return value
+
+
+def mustache_to_text(value):
+    if isinstance(value, bytes):
+        return value.decode(pystache.defaults.STRING_ENCODING,
+                            pystache.defaults.DECODE_ERRORS)
+    return value if isinstance(value, basestring) else str(value)
+
+
+def mustache_render_value(stack, value, delimiters=None):
+    """Render ``value`` returned by a lambda as a template"""
+    return pystache.Renderer().render(
+        pystache.parse(mustache_to_text(value), delimiters),
+        pystache.context.ContextStack(*stack))
+
+
+def mustache_text(stack, value):
+    """Return the text of an interpolated ``value``"""
+    if callable(value):
+        return mustache_render_value(stack, value())
+    return mustache_to_text(value)
+
+
+def mustache_items(value):
+    """Return the list of context items of a section's ``value``"""
+    if not value:
+        return []
+    try:
+        iter(value)
+    except TypeError:
+        return [value]
+    if isinstance(value, (basestring, bytes, dict)):
+        return [value]
+    return value
+
+
+## keys of commits in mustache data (see ``mustache_stuffed_versions()``)
+MUSTACHE_COMMIT_KEYS = set([
+    ".", "author", "authors", "subject", "body", "commit",
+    "author_names_joined", "body_indented"])
+
+
+def mustache_python(template):
+    """Return python source of a generator rendering ``template``
+
+    The source defines a ``render(stack, fragments=None)`` generator
+    function, with ``stack`` the list of context items (usually
+    ``[data]``), that gives the same output as
+    ``pystache.render(template, data)``. Output is yielded after each
+    iteration of sections holding other sections (typically for each
+    version and commit).
+
+    Iterations of ``commits`` sections that only use the keys of
+    commits (see ``MUSTACHE_COMMIT_KEYS``) are read from, and stored
+    in, the ``fragments`` object (see ``FragmentCache.fragments()``)
+    if one is given.
+
+    Templates are parsed by ``pystache``, and ``None`` is returned for
+    the ones that can't be compiled (with partials, or unbalanced
+    sections).
+
+        >>> print(mustache_python("{{#a}}<{{.}}>{{/a}}"))
+        ... # doctest: +ELLIPSIS
+        def render(stack, fragments=None):
+            out = []
+            write = out.append
+            for item0 in items(lookup(stack, ('a',))):
+                if callable(item0):
+                    write(render_value(stack, item0('<{{.}}>'), ...))
+                    continue
+                stack.append(item0)
+                write('<')
+                write(escape(text(stack, lookup(stack, None))))
+                write('>')
+                stack.pop()
+            if out:
+                yield "".join(out)
+        >>> print(mustache_python("{{>partial}}"))
+        None
+
+    """
+    try:
+        parsed = pystache.parse(template, raise_on_mismatch=True)
+    except Exception:  ## pylint: disable=broad-except
+        return None  ## unbalanced sections, or older pystache
+    compiler = MustacheCompiler()
+    try:
+        compiler.compile_tree(parsed._parse_tree, 1, 0)
+    except ValueError:
+        return None
+    compiler.emit(1, "if out:")
+    compiler.emit(2, 'yield "".join(out)')
+    return "\n".join(compiler.lines)
+
+
+def mustache_names(tree):
+    """Yield first part of names used in the parse tree"""
+    for node in tree:
+        if hasattr(node, "key"):
+            yield node.key if node.key == "." else node.key.split(".")[0]
+        for subtree in (getattr(node, "parsed", None),
+                        getattr(node, "parsed_section", None)):
+            if subtree is not None:
+                for name in mustache_names(subtree._parse_tree):
+                    yield name
+
+
+class MustacheCompiler(object):
+    """Emit the python source lines of a ``render`` generator
 
-    def rest_title(label, char="="):
-        return (label.strip() + "\n") + (char * len(label) + "\n")
+    (see ``mustache_python()``)
 
-    def render_version(version):
-        title = "%s (%s)" % (version["tag"], version["date"]) \
-                if version["tag"] else \
-                opts["unreleased_version_label"]
-        s = rest_title(title, char="-")
+    Each kind of node of the pystache parse tree is compiled by its
+    method (see ``NODE_METHODS``), that returns True if the node holds
+    sections.
 
-        sections = version["sections"]
-        nb_sections = len(sections)
-        for section in sections:
+    """
 
-            section_label = section["label"] if section.get("label", None) \
-                            else "Other"
+    NODE_METHODS = {
+        "_EscapeNode": "variable",
+        "_LiteralNode": "literal",
+        "_SectionNode": "section",
+        "_InvertedNode": "inverted",
+        "_PartialNode": "partial",
+        "_CommentNode": "skip",
+        "_ChangeNode": "skip",
+    }
 
-            if not (section_label == "Other" and nb_sections == 1):
-                s += "\n" + rest_title(section_label, "~")
+    def __init__(self):
+        self.lines = ["def render(stack, fragments=None):",
+                      "    out = []",
+                      "    write = out.append"]
+
+    def emit(self, level, code):
+        self.lines.append("    " * level + code)
+
+    @staticmethod
+    def lookup(key):
+        return "lookup(stack, %r)" % (
+            None if key == "." else tuple(key.split(".")), )
+
+    def compile_tree(self, tree, level, depth, can_flush=True):
+        """Emit code of the parse tree, return True if it has sections"""
+        has_sections = False
+        for node in tree:
+            if isinstance(node, basestring):
+                self.emit(level, "write(%r)" % (node, ))
+                continue
+            method = self.NODE_METHODS.get(type(node).__name__, "partial")
+            if getattr(self, method)(node, level, depth, can_flush):
+                has_sections = True
+        return has_sections
+
+    def skip(self, node, level, depth, can_flush):
+        return False
+
+    def variable(self, node, level, depth, can_flush):
+        self.emit(level, "write(escape(text(stack, %s)))"
+                  % self.lookup(node.key))
+        return False
+
+    def literal(self, node, level, depth, can_flush):
+        self.emit(level, "write(text(stack, %s))" % self.lookup(node.key))
+        return False
+
+    def partial(self, node, level, depth, can_flush):
+        raise ValueError("Unsupported node %r" % (node, ))
+
+    def inverted(self, node, level, depth, can_flush):
+        self.emit(level, "if not %s:" % self.lookup(node.key))
+        self.emit(level + 1, "pass")
+        self.compile_tree(node.parsed_section._parse_tree,
+                          level + 1, depth, can_flush)
+        return True
+
+    def section(self, node, level, depth, can_flush):
+        item = "item%d" % depth
+        self.emit(level, "for %s in items(%s):"
+                  % (item, self.lookup(node.key)))
+        ## lambdas get the unprocessed section's content
+        self.emit(level + 1, "if callable(%s):" % item)
+        self.emit(level + 2, "write(render_value(stack, %s(%r), %r))"
+                  % (item, node.template[node.index_begin:node.index_end],
+                     tuple(node.delimiters)))
+        self.emit(level + 2, "continue")
+        cached = can_flush and node.key == "commits" and \
+            set(mustache_names(node.parsed._parse_tree)) <= \
+            MUSTACHE_COMMIT_KEYS
+        if cached:
+            self.fragment_lookup(item, level + 1)
+        self.emit(level + 1, "stack.append(%s)" % item)
+        ## a cached commit's output is kept until it's complete
+        flush = self.compile_tree(node.parsed._parse_tree,
+                                  level + 1, depth + 1,
+                                  can_flush and not cached)
+        self.emit(level + 1, "stack.pop()")
+        if cached:
+            self.emit(level + 1, "if fragments is not None:")
+            self.emit(level + 2,
+                      'fragments.set(%s, "".join(out[start:]))' % item)
+        if flush and can_flush:
+            self.emit(level + 1, "if out:")
+            self.emit(level + 2, 'yield "".join(out)')
+            self.emit(level + 2, "del out[:]")
+        return True
+
+    def fragment_lookup(self, item, level):
+        """Emit code writing the cached fragment of ``item`` if any"""
+        self.emit(level, "fragment = None if fragments is None "
+                  "else fragments.get(%s)" % item)
+        self.emit(level, "if fragment is not None:")
+        self.emit(level + 1, "write(fragment)")
+        self.emit(level + 1, "continue")
+        self.emit(level, "start = len(out)")
+
+
+def mustache_compile(template, template_path, cache_dir=None):
+    """Return the ``render(stack, fragments=None)`` generator of template
+
+    If ``cache_dir`` is given, the python code object is cached there
+    (see ``template_cache_path()``) and reused instead of parsing and
+    compiling the template again. ``None`` is returned for templates
+    that can't be compiled (see ``mustache_python()``).
 
-            for commit in section["commits"]:
-                s += render_commit(commit)
-        return s
+    """
+    filename = template_cache_path(
+        cache_dir, template_path, template.encode("utf-8"),
+        "%s %s %s" % (__version__, pystache.__version__, sys.version),
+        ".marshal") if cache_dir else None
+    code = None
+    if filename and os.path.exists(filename):
+        try:
+            with open(filename, "rb") as f:
+                code = marshal.load(f)
+        except (EOFError, ValueError, TypeError):
+            code = None  ## truncated or incompatible, compile again
+    if code is None:
+        source = mustache_python(template)
+        if source is None:
+            return None
+        code = compile(source, template_path, "exec")
+        if filename:
+            tmp_filename = "%s.%d.tmp" % (filename, os.getpid())
+            try:
+                with open(tmp_filename, "wb") as f:
+                    marshal.dump(code, f)
+                os.rename(tmp_filename, filename)
+            except OSError:
+                pass
+    namespace = {
+        "lookup": mustache_lookup,
+        "items": mustache_items,
+        "text": mustache_text,
+        "escape": pystache.defaults.TAG_ESCAPE,
+        "render_value": mustache_render_value,
+    }
+    exec(code, namespace)  ## pylint: disable=exec-used
+    return namespace["render"]
 
-    def render_commit(commit, opts=opts):
-        subject = commit["subject"]
-        subject += " [%s]" % (", ".join(commit["authors"]), )
 
-        entry = indent('\n'.join(textwrap.wrap(subject)),
-                       first="- ").strip() + "\n"
+def mustache_stuffed_versions(versions, opts):
+    """Yield ``versions`` with the intermediate values templates use
 
-        if commit["body"]:
-            entry += "\n" + indent(commit["body"])
-            entry += "\n"
+    (mustache is very simple)
 
-        return entry
+    """
+    for version in versions:
+        title = "%s (%s)" % (version["tag"], version["date"]) \
+                if version["tag"] else \
+                opts["unreleased_version_label"]
+        version["label"] = title
+        version["label_chars"] = list(version["label"])
+        for section in version["sections"]:
+            section["label_chars"] = list(section["label"])
+            section["display_label"] = \
+                not (section["label"] == "Other" and
+                     len(version["sections"]) == 1)
+            for commit in section["commits"]:
+                commit["author_names_joined"] = ", ".join(
+                    commit["authors"])
+                commit["body_indented"] = indent(commit["body"])
+        yield version
 
-    if data["title"]:
-        yield rest_title(data["title"], char="=") + "\n\n"
 
-    for version in data["versions"]:
-        if len(version["sections"]) > 0:
-            yield render_version(version) + "\n\n"
+def mustache_iter_renderer(template, render):
+    """Return a generator function rendering data with ``template``
 
+    ``render`` is the compiled template (see ``mustache_compile()``), or
+    None to render it with ``pystache``, one version at a time if
+    possible (see ``mustache_split()``).
+
+    """
+    parts = mustache_split(template, "versions") \
+            if render is None else None
+    fragments_label = "mustache %s" % hashlib.sha1(
+        template.encode("utf-8")).hexdigest()
+
+    def iter_renderer(data, opts):
+
+        ## mustache is very simple so we need to add some intermediate
+        ## values
+        data["general_title"] = True if data["title"] else False
+        data["title_chars"] = list(data["title"]) if data["title"] else []
+
+        versions = mustache_stuffed_versions(data["versions"], opts)
+        if render is not None:
+            ## versions are rendered one at a time as they come
+            data["versions"] = versions
+            fragment_cache = opts.get("fragment_cache")
+            fragments = fragment_cache.fragments(fragments_label) \
+                if fragment_cache is not None else None
+            for chunk in render([data], fragments):
+                yield chunk
+            return
+
+        if parts is None:
+            data["versions"] = versions
+            yield pystache.render(template, data)
+            return
+
+        ## render versions one at a time as they come
+        prefix, section, suffix = parts
+        engine = pystache.Renderer()
+        data["versions"] = []
+        yield engine.render(prefix, data)
+        for version in versions:
+            yield engine.render(section, data, {"versions": [version]})
+        yield engine.render(suffix, data)
+
+    return iter_renderer
 
-## formatter engines
 
 if pystache:
 
     @available_in_config
-    def mustache(template_name):
+    def mustache(template_name, cache=True):
         """Return a callable that will render a changelog data structure
 
         returned callable must take 2 arguments ``data`` and ``opts``.
 
+        The template is compiled to python (see ``mustache_compile()``),
+        and unless ``cache`` is false, the compiled code is cached on disk
+        (see ``template_cache_dir()``) for later runs. Templates that
+        can't be compiled are rendered by ``pystache``.
+
         """
         template_path = ensure_template_file_exists("mustache", template_name)
 
         template = file_get_contents(template_path)
-
-        def stuffed_versions(versions, opts):
-            for version in versions:
-                title = "%s (%s)" % (version["tag"], version["date"]) \
-                        if version["tag"] else \
-                        opts["unreleased_version_label"]
-                version["label"] = title
-                version["label_chars"] = list(version["label"])
-                for section in version["sections"]:
-                    section["label_chars"] = list(section["label"])
-                    section["display_label"] = \
-                        not (section["label"] == "Other" and
-                             len(version["sections"]) == 1)
-                    for commit in section["commits"]:
-                        commit["author_names_joined"] = ", ".join(
-                            commit["authors"])
-                        commit["body_indented"] = indent(commit["body"])
-                yield version
+        render = mustache_compile(
+            template, template_path,
+            template_cache_dir("mustache") if cache else None)
+        iter_renderer = mustache_iter_renderer(template, render)
 
         def renderer(data, opts):
+            return "".join(iter_renderer(data, opts))
 
-            ## mustache is very simple so we need to add some intermediate
-            ## values
-            data["general_title"] = True if data["title"] else False
-            data["title_chars"] = list(data["title"]) if data["title"] else []
-
-            data["versions"] = stuffed_versions(data["versions"], opts)
-
-            return pystache.render(template, data)
-
+        renderer.iter = iter_renderer
+        renderer.log_fields = template_log_fields(template)
         return renderer
 
 else:
@@ -1402,30 +4435,133 @@ else:
         die("Required 'pystache' python module not found.")
 
 
+def mako_load_template(template_path, cache_dir=None):
+    """Return the ``mako`` template of file ``template_path``
+
+    If ``cache_dir`` is given, the python module compiled from the
+    template is stored there (see ``template_cache_path()``).
+
+    """
+    if not cache_dir:
+        return mako.template.Template(filename=template_path)
+    with open(template_path, "rb") as f:
+        content = f.read()
+    return mako.template.Template(
+        filename=template_path,
+        module_filename=template_cache_path(
+            cache_dir, template_path, content, mako.__version__, ".py"))
+
+
+def mako_render_in_pool(template, kwargs, pool):
+    """Yield output of ``template``, its versions rendered by ``pool``
+
+    The template body is rendered here, with its ``render_version``
+    def replaced by a function that sends the version to ``pool``
+    and puts the pending result in place in the output. Workers of
+    ``pool`` render the actual def.
+
+    """
+    body = template.module.render_body
+
+    def producer(buf):
+
+        def render_version(context, version):
+            ## pylint: disable=unused-argument
+            buf.put(pool.submit(version))
+            return ""
+
+        ## defs are called through the module globals of the body
+        namespace = dict(body.__globals__,
+                         render_render_version=render_version)
+        render_body = types.FunctionType(
+            body.__code__, namespace, body.__name__,
+            body.__defaults__, body.__closure__)
+        mako.template.DefTemplate(template, render_body).render_context(
+            mako.runtime.Context(buf, **kwargs))
+
+    try:
+        for item in iter_writes(producer):
+            yield item if isinstance(item, basestring) else item.get()
+    finally:
+        pool.close()
+
+
+def mako_iter_renderer(template):
+    """Return a function returning an iterator on output of ``template``
+
+    Versions are rendered by ``opts["render_workers"]`` processes if the
+    template defines a ``render_version`` def (see ``makotemplate()``).
+
+    """
+    ## inheriting templates are rendered by their base template
+    parallel = template.has_def("render_version") and \
+               not hasattr(template.module, "_mako_inherit")
+
+    def iter_renderer(data, opts):
+        kwargs = mako_env.copy()
+        kwargs.update({"data": data,
+                       "opts": opts})
+        if parallel:
+            version_def = template.get_def("render_version")
+            pool = version_render_pool(
+                lambda version: version_def.render(version, **kwargs),
+                opts.get("render_workers"))
+            if pool is not None:
+                return mako_render_in_pool(template, kwargs, pool)
+        ## output is streamed while the template is rendered
+        return iter_writes(
+            lambda buf: template.render_context(
+                mako.runtime.Context(buf, **kwargs)))
+
+    return iter_renderer
+
+
 if mako:
 
     import mako.template ## pylint: disable=wrong-import-position
+    import mako.runtime ## pylint: disable=wrong-import-position
+
+    class _MakoTextwrap(object):
+        """``textwrap`` module of templates, with a faster ``wrap()``"""
+
+        wrap = staticmethod(wrap_text)
 
-    mako_env = dict((f.__name__, f) for f in (ucfirst, indent, textwrap,
+        def __getattr__(self, label):
+            return getattr(textwrap, label)
+
+    mako_env = dict((f.__name__, f) for f in (ucfirst, indent,
                                               paragraph_wrap))
+    mako_env["textwrap"] = _MakoTextwrap()
 
     @available_in_config
-    def makotemplate(template_name):
+    def makotemplate(template_name, cache=True):
         """Return a callable that will render a changelog data structure
 
         returned callable must take 2 arguments ``data`` and ``opts``.
 
+        Unless ``cache`` is false, the python module compiled from the
+        template is cached on disk (see ``template_cache_dir()``) and reused
+        by later runs instead of parsing and compiling the template again.
+        ``mako`` itself recompiles it if the template is newer than the
+        module or if its code generator changed.
+
+        If the template defines ``<%def name="render_version(version)">``,
+        the def is rendered in parallel for each version when
+        ``opts["render_workers"]`` asks for more than one process. The def
+        must then only use its argument and the template globals (not
+        the variables of the template body).
+
         """
         template_path = ensure_template_file_exists("mako", template_name)
-
-        template = mako.template.Template(filename=template_path)
+        template = mako_load_template(
+            template_path, template_cache_dir("mako") if cache else None)
+        iter_renderer = mako_iter_renderer(template)
 
         def renderer(data, opts):
-            kwargs = mako_env.copy()
-            kwargs.update({"data": data,
-                           "opts": opts})
-            return template.render(**kwargs)
+            return "".join(iter_renderer(data, opts))
 
+        renderer.iter = iter_renderer
+        renderer.log_fields = template_log_fields(template.source)
         return renderer
 
 else:
@@ -1435,6 +4571,115 @@ else:
         die("Required 'mako' python module not found.")
 
 
+## compact JSON, with non-ascii chars left as is
+json_encode = json.JSONEncoder(ensure_ascii=False,
+                               separators=(",", ":")).encode
+## same for strings only, but without the dispatch on value types
+json_encode_string = json.encoder.encode_basestring
+
+
+def json_object_format(keys):
+    """Return a format string of the JSON object of given ``keys``
+
+    Keys are encoded once, values are to be given already encoded:
+
+        >>> fmt = json_object_format(["a", "100%"])
+        >>> fmt % (json_encode(1), json_encode("x"))
+        '{"a":1,"100%":"x"}'
+
+    """
+    return "{%s}" % ",".join(json_encode(key).replace("%", "%%") + ":%s"
+                             for key in keys)
+
+
+## Commit attributes output by default by ``jsonlines``
+JSONLINES_COMMIT_FIELDS = ("sha1", "author_name", "author_email", "date",
+                           "author_date_timestamp")
+
+
+@available_in_config
+def jsonlines(commits=False, fields=JSONLINES_COMMIT_FIELDS):
+    r"""Return an output engine streaming changelog data as JSON Lines
+
+    Each version is output on its own line as soon as it is computed,
+    with its sections and their commits. With ``commits`` set, versions
+    are output without their sections, each one followed by a line per
+    commit. Commits get the processed ``subject``, ``body`` and
+    ``authors``, and the values of ``fields`` attributes of their
+    ``GitCommit`` (``null`` if missing, as unset trailers):
+
+        >>> class Commit(object):
+        ...     sha1 = "000000"
+        >>> data = {"title": "Changelog", "versions": [{
+        ...     "tag": "0.1", "date": "2000-01-01", "commit_date": None,
+        ...     "tagger_date": None, "commit": Commit(),
+        ...     "sections": [{"label": "New", "commits": [{
+        ...         "subject": "Add", "body": "", "authors": ["Bob"],
+        ...         "commit": Commit()}]}]}]}
+        >>> renderer = jsonlines(commits=True, fields=["sha1"])
+        >>> lines = renderer(data, {}).splitlines()
+        >>> print(lines[0])  ## doctest: +ELLIPSIS
+        {"type":"version","tag":"0.1",...,"sha1":"000000"}
+        >>> print(lines[1])  ## doctest: +ELLIPSIS
+        {"type":"commit",...,"sha1":"000000","subject":"Add",...}
+
+    """
+    fields = tuple(fields)
+    version_format = json_object_format(
+        ("type", "tag", "date", "tagger_date", "commit_date", "sha1") +
+        (() if commits else ("sections", )))
+    section_format = json_object_format(("label", "commits"))
+    commit_format = json_object_format(
+        (("type", "version", "section") if commits else ()) + fields +
+        ("subject", "body", "authors"))
+    encoded_version_type = json_encode("version")
+    encoded_commit_type = json_encode("commit")
+
+    def encode(value):
+        return json_encode_string(value) \
+               if isinstance(value, basestring) else json_encode(value)
+
+    def encode_commit(commit, prefix=()):
+        obj = commit["commit"]
+        return commit_format % (
+            prefix +
+            tuple(encode(getattr(obj, field, None)) for field in fields) +
+            (json_encode_string(commit["subject"]),
+             json_encode_string(commit["body"]),
+             "[%s]" % ",".join(map(json_encode_string, commit["authors"]))))
+
+    def iter_renderer(data, opts):  ## pylint: disable=unused-argument
+        for version in data["versions"]:
+            values = (encoded_version_type, json_encode(version["tag"]),
+                      json_encode(version["date"]),
+                      json_encode(version["tagger_date"]),
+                      json_encode(version["commit_date"]),
+                      json_encode(version["commit"].sha1))
+            if not commits:
+                sections = ",".join(
+                    section_format % (
+                        json_encode(section["label"]),
+                        "[%s]" % ",".join(encode_commit(commit)
+                                          for commit in section["commits"]))
+                    for section in version["sections"])
+                yield version_format % (values + ("[%s]" % sections, )) + \
+                    "\n"
+                continue
+            yield version_format % values + "\n"
+            prefix = (encoded_commit_type, values[1])
+            for section in version["sections"]:
+                section_prefix = prefix + (json_encode(section["label"]), )
+                yield "".join(encode_commit(commit, section_prefix) + "\n"
+                              for commit in section["commits"])
+
+    def renderer(data, opts):
+        return "".join(iter_renderer(data, opts))
+
+    renderer.iter = iter_renderer
+    renderer.log_fields = git_log_fields(fields)
+    return renderer
+
+
 ##
 ## Publish action
 ##
@@ -1504,6 +4749,147 @@ def FileRegexSubst(filename, pattern, replace, flags=0):
 ## Data Structure
 ##
 
+def _text_process(subject_process, body_process, texts):
+    subject, body = texts
+    return subject_process(subject), body_process(body)
+
+
+class TextProcessPool(ForkPool):
+    """Apply ``subject_process`` and ``body_process`` in worker processes
+
+    Texts are sent to workers by chunks, and results come back in the
+    same order, so that the output is the same as processing them
+    serially.
+
+    """
+
+    def __init__(self, subject_process, body_process, workers,
+                 chunk_size=64):
+        super(TextProcessPool, self).__init__(
+            functools.partial(_text_process, subject_process, body_process),
+            workers, label="text process")
+        self.chunk_size = chunk_size
+
+    def map(self, texts, chunk_size=None):
+        """Return the list of processed (subject, body) of ``texts``"""
+        return super(TextProcessPool, self).map(
+            texts, chunk_size or self.chunk_size)
+
+
+def text_process_pool(subject_process, body_process, workers, warn=warn):
+    """Return a ``TextProcessPool``, or None if it is not to be used
+
+    A warning is issued if ``workers`` asks for a pool that can't be
+    created.
+
+    """
+    if workers is None or workers <= 1:
+        return None
+    try:
+        return TextProcessPool(subject_process, body_process, workers)
+    except ValueError as e:
+        warn("%s Processing texts in main process." % e)
+        return None
+
+
+def serial_texts_process(subject_process, body_process):
+    """Return a callable processing a list of (subject, body) in order"""
+
+    def texts_process(texts):
+        return zip(text_map(subject_process,
+                            [subject for subject, _body in texts]),
+                   text_map(body_process,
+                            [body for _subject, body in texts]))
+    return texts_process
+
+
+def version_tags(repository, revlist, tag_filter_regexp,
+                 single_pass=False):
+    """Return the version tags of ``revlist``, newest first
+
+    Along with the newest commit of the range, and its excluded
+    revisions. ``HEAD`` is the tag of the unreleased version.
+
+    """
+    ## Only the newest and oldest commits of the range are needed, along
+    ## with its excluded revisions.
+    first_rev, last_rev, excludes = resolve_revlist(repository, revlist)
+
+    tags = repository.tags(contains=last_rev,
+                           filter_regexp=tag_filter_regexp)
+
+    tags.append(repository.commit("HEAD"))
+
+    if single_pass:
+        ## history of versions is walked anyway, ancestry of their tips
+        ## is then known without asking git for each comparison.
+        repository.index_ancestry(tags)
+
+    if revlist:
+        max_rev = repository.commit(first_rev)
+        new_tags = []
+        for tag in tags:
+            new_tags.append(tag)
+            if max_rev <= tag:
+                break
+        tags = new_tags
+    else:
+        max_rev = tags[-1]
+
+    return list(reversed(tags)), max_rev, excludes
+
+
+def classify_commits(commits, classifier, fragment_cache=None):
+    """Return (section, commit, entry) of commits that are not ignored
+
+    ``entry`` is the cached entry of the commit in ``fragment_cache`` if
+    any, None otherwise. Commits found ignored are stored as such in
+    ``fragment_cache``.
+
+    """
+    entries = []
+    for commit in commits:
+        cached = None if fragment_cache is None else \
+                 fragment_cache.get(commit.sha1)
+        if cached is not None:
+            if not cached["ignored"]:
+                entries.append((cached["section"], commit, cached))
+            continue
+        matched_section = classifier.classify(commit.subject)
+        if matched_section is classifier.IGNORED:
+            if fragment_cache is not None:
+                fragment_cache.set(commit.sha1, {"ignored": True})
+            continue
+        entries.append((matched_section, commit, None))
+    return entries
+
+
+def commit_entries(entries, texts_process, fragment_cache=None):
+    """Yield (section, commit, entry) with entries of all commits
+
+    Missing entries of ``entries`` (see ``classify_commits()``) get the
+    processed subject and body of their commit from ``texts_process``,
+    all at once, and are stored in ``fragment_cache``.
+
+    """
+    todo = [commit for _s, commit, cached in entries if cached is None]
+    texts = iter(texts_process([(commit.subject, commit.body)
+                                for commit in todo]))
+    for matched_section, commit, cached in entries:
+        if cached is None:
+            subject, body = next(texts)
+            cached = {
+                "ignored": False,
+                "section": matched_section,
+                "authors": commit.author_names,
+                "subject": subject,
+                "body": body,
+            }
+            if fragment_cache is not None:
+                fragment_cache.set(commit.sha1, cached)
+        yield matched_section, commit, cached
+
+
 def versions_data_iter(repository, revlist=None,
                        ignore_regexps=[],
                        section_regexps=[(None, '')],
@@ -1512,6 +4898,11 @@ def versions_data_iter(repository, revlist=None,
                        body_process=lambda x: x,
                        subject_process=lambda x: x,
                        log_encoding=DEFAULT_GIT_LOG_ENCODING,
+                       single_pass=False,
+                       log_fields=None,
+                       max_versions=None,
+                       texts_process=None,
+                       fragment_cache=None,
                        warn=warn,        ## Mostly used for test
                        ):
     """Returns an iterator through versions data structures
@@ -1527,6 +4918,17 @@ def versions_data_iter(repository, revlist=None,
     :param body_process: text processing object to apply to body
     :param subject_process: text processing object to apply to subject
     :param log_encoding: the encoding used in git logs
+    :param single_pass: whether to walk the history with only one git log
+    :param log_fields: commit attributes to ask ``git log`` for, besides
+        the ones used here (``None`` to ask for all of them)
+    :param max_versions: maximum number of versions to output (newest
+        first), older history is not walked at all
+    :param texts_process: callable processing a list of (subject, body)
+        of commits, as the ``map`` of a ``TextProcessPool`` (``None`` to
+        apply ``subject_process`` and ``body_process`` in this process)
+    :param fragment_cache: ``FragmentCache`` object of the section,
+        processed texts and authors of commits (``None`` to compute them
+        for each commit)
     :param warn: callable to output warnings, mocked by tests
 
     :returns: iterator of versions data_structures
@@ -1535,109 +4937,107 @@ def versions_data_iter(repository, revlist=None,
 
     revlist = revlist or []
 
-    ## Hash to speedup lookups
-    versions_done = {}
-    excludes = [rev[1:]
-                for rev in repository.git.rev_parse([
-                    "--rev-only", ] + revlist + ["--", ]).split("\n")
-                if rev.startswith("^")] if revlist else []
-
-    revs = repository.git.rev_list(*revlist).split("\n") if revlist else []
-    revs = [rev for rev in revs if rev != ""]
-
-    if revlist and not revs:
-        die("No commits matching given revlist: %s" % (" ".join(revlist), ))
-
-    tags = [tag
-            for tag in repository.tags(contains=revs[-1] if revs else None)
-            if re.match(tag_filter_regexp, tag.identifier)]
-
-    tags.append(repository.commit("HEAD"))
+    fields = None if log_fields is None else \
+             git_log_fields(GIT_LOG_BASE_FIELDS + tuple(log_fields))
 
-    if revlist:
-        max_rev = repository.commit(revs[0])
-        new_tags = []
-        for tag in tags:
-            new_tags.append(tag)
-            if max_rev <= tag:
-                break
-        tags = new_tags
-    else:
-        max_rev = tags[-1]
+    tags, max_rev, excludes = version_tags(
+        repository, revlist, tag_filter_regexp, single_pass)
 
     section_order = [k for k, _v in section_regexps]
+    classifier = CommitClassifier(ignore_regexps, section_regexps)
 
-    tags = list(reversed(tags))
-
-    ## Get the changes between tags (releases)
-    for idx, tag in enumerate(tags):
-
-        ## New version
-        current_version = {
-            "date": tag.tagger_date if tag.has_annotated_tag else tag.date,
-            "commit_date": tag.date,
-            "tagger_date": tag.tagger_date if tag.has_annotated_tag else None,
-            "tag": tag.identifier if tag.identifier != "HEAD" else None,
-            "commit": tag,
-        }
-
-        sections = collections.defaultdict(list)
-        commits = repository.log(
-            includes=[min(tag, max_rev)],
-            excludes=tags[idx + 1:] + excludes,
-            include_merge=include_merge,
-            encoding=log_encoding)
-
-        for commit in commits:
-            if any(re.search(pattern, commit.subject) is not None
-                   for pattern in ignore_regexps):
-                continue
+    partition = partition_log(
+        repository,
+        tips=[min(tag, max_rev) for tag in tags],
+        excluders=tags,
+        excludes=excludes,
+        include_merge=include_merge,
+        encoding=log_encoding,
+        fields=fields) if single_pass else None
 
-            matched_section = first_matching(section_regexps, commit.subject)
+    if texts_process is None:
+        texts_process = serial_texts_process(subject_process, body_process)
 
-            ## Finally storing the commit in the matching section
+    nb_versions = 0
 
-            sections[matched_section].append({
-                "author": commit.author_name,
-                "authors": commit.author_names,
-                "subject": subject_process(commit.subject),
-                "body": body_process(commit.body),
-                "commit": commit,
-            })
-
-        ## Flush current version
-        current_version["sections"] = [{"label": k, "commits": sections[k]}
-                                       for k in section_order
-                                       if k in sections]
-        if len(current_version["sections"]) != 0:
-            yield current_version
-        versions_done[tag] = current_version
-
-
-def changelog(output_engine=rest_py,
-              unreleased_version_label="unreleased",
-              warn=warn,        ## Mostly used for test
-              **kwargs):
-    """Returns a string containing the changelog of given repository
+    try:
+        ## Get the changes between tags (releases)
+        for idx, tag in enumerate(tags):
+            if max_versions is not None and nb_versions >= max_versions:
+                return
 
-    This function returns a string corresponding to the template rendered with
-    the changelog data tree.
+            ## New version
+            tagger_date = tag.tagger_date if tag.has_annotated_tag else None
+            current_version = {
+                "date": tagger_date or tag.date,
+                "commit_date": tag.date,
+                "tagger_date": tagger_date,
+                "tag": tag.identifier if tag.identifier != "HEAD" else None,
+                "commit": tag,
+            }
+
+            sections = collections.defaultdict(list)
+            if single_pass:
+                commits = next(partition)
+            else:
+                commits = repository.log(
+                    includes=[min(tag, max_rev)],
+                    excludes=tags[idx + 1:] + excludes,
+                    include_merge=include_merge,
+                    encoding=log_encoding,
+                    fields=fields)
 
-    (see ``gitchangelog.rc.sample`` file for more info)
+            try:
+                entries = classify_commits(commits, classifier,
+                                           fragment_cache)
+            finally:
+                ## stop ``git log`` right away if anything went wrong
+                if hasattr(commits, "close"):
+                    commits.close()
+
+            ## Finally storing the commits in their matching section
+            for matched_section, commit, cached in commit_entries(
+                    entries, texts_process, fragment_cache):
+                sections[matched_section].append({
+                    "author": commit.author_name,
+                    "authors": cached["authors"],
+                    "subject": cached["subject"],
+                    "body": cached["body"],
+                    "commit": commit,
+                })
+
+            ## Flush current version
+            current_version["sections"] = [
+                {"label": k, "commits": sections[k]}
+                for k in section_order
+                if k in sections]
+            if len(current_version["sections"]) != 0:
+                nb_versions += 1
+                yield current_version
+    finally:
+        ## stop the single pass walk if versions are left
+        if partition is not None:
+            partition.close()
+        if fragment_cache is not None:
+            fragment_cache.save()
 
-    For an exact list of arguments, see the arguments of
-    ``versions_data_iter(..)``.
 
-    :param unreleased_version_label: version label for untagged commits
-    :param output_engine: callable to render the changelog data
-    :param warn: callable to output warnings, mocked by tests
+def changelog_data(output_engine=rest_py,
+                   unreleased_version_label="unreleased",
+                   render_workers=None,
+                   warn=warn,
+                   **kwargs):
+    """Returns the data tree, options and versions to render a changelog
 
-    :returns: content of changelog
+    (see ``changelog()`` for arguments)
 
     """
 
     opts = {
         'unreleased_version_label': unreleased_version_label,
+        ## output engines can store rendered commits there
+        'fragment_cache': kwargs.get("fragment_cache"),
+        'render_workers': render_workers,
     }
 
     ## Setting main container of changelog elements
@@ -1645,7 +5045,19 @@ def changelog(output_engine=rest_py,
     data = {"title": title,
             "versions": []}
 
+    ## only ask ``git log`` for what the output engine declares to use
+    if kwargs.get("log_fields") is None:
+        kwargs["log_fields"] = getattr(output_engine, "log_fields", None)
+
+    ## text processing workers live as long as the history walk
+    pool = text_process_pool(kwargs.get("subject_process", noop),
+                             kwargs.get("body_process", noop),
+                             kwargs.pop("process_workers", None), warn)
+    if pool is not None:
+        kwargs["texts_process"] = pool.map
     versions = versions_data_iter(warn=warn, **kwargs)
+    if pool is not None:
+        versions = closing_chain(versions, pool)
 
     ## poke once in versions to know if there's at least one:
     try:
@@ -1656,7 +5068,71 @@ def changelog(output_engine=rest_py,
     else:
         data["versions"] = itertools.chain([first_version], versions)
 
-    return output_engine(data=data, opts=opts)
+    return data, opts, versions
+
+
+def changelog(output_engine=rest_py, **kwargs):
+    """Returns a string containing the changelog of given repository
+
+    This function returns a string corresponding to the template rendered with
+    the changelog data tree.
+
+    (see ``gitchangelog.rc.sample`` file for more info)
+
+    For an exact list of arguments, see the arguments of
+    ``versions_data_iter(..)``.
+
+    :param unreleased_version_label: version label for untagged commits
+    :param output_engine: callable to render the changelog data
+    :param render_workers: number of worker processes rendering versions
+        in output engines that support it (``None`` to render serially)
+    :param process_workers: number of worker processes applying
+        ``subject_process`` and ``body_process`` (``None`` to apply
+        them in this process)
+    :param warn: callable to output warnings, mocked by tests
+
+    :returns: content of changelog
+
+    """
+    data, opts, versions = changelog_data(output_engine, **kwargs)
+    content = output_engine(data=data, opts=opts)
+    if isinstance(content, basestring) or iter(content) is not content:
+        return content  ## not a stream
+    return "".join(closing_chain(content, versions))
+
+
+def iter_changelog(output_engine=rest_py, **kwargs):
+    """Returns an iterator on chunks of the changelog of given repository
+
+    Takes the same arguments than ``changelog()``, but renders with the
+    ``iter`` attribute of ``output_engine`` if any, so that versions are
+    output as soon as they are computed. Closing the returned iterator
+    stops walking the history.
+
+    """
+    data, opts, versions = changelog_data(output_engine, **kwargs)
+    render = getattr(output_engine, "iter", output_engine)
+    content = render(data=data, opts=opts)
+    if isinstance(content, basestring):
+        content = content.splitlines(True)
+    return closing_chain(iter(content), versions)
+
+
+def closing_chain(content, *generators):
+    """Yield from ``content``, and close it with ``generators`` when done
+
+    Closing the returned generator (or exhausting it) closes all of
+    them, so that nothing more is computed once the consumer stopped.
+
+    """
+    try:
+        for chunk in content:
+            yield chunk
+    finally:
+        for generator in (content, ) + generators:
+            close = getattr(generator, "close", None)
+            if close is not None:
+                close()
 
 ##
 ## Manage obsolete options
@@ -1770,18 +5246,39 @@ def get_revision(repository, config, opts):
             die("Invalid type for revision in revs list from config file. "
                 "'str' type is required, and a %r was given."
                 % type(rev).__name__)
-        try:
-            repository.git.rev_parse([rev, "--rev_only", "--"])
-        except ShellError:
-            if DEBUG:
-                raise
-            die("Revision %r is not valid." % rev)
 
+    ## revisions are checked once resolved by ``resolve_revlist()``
     if revs == ["HEAD", ]:
         return []
     return revs
 
 
+def resolve_revlist(repository, revlist):
+    """Return newest and oldest commits of ``revlist``, and its excludes
+
+    Exits with an error message if ``revlist`` holds invalid revisions,
+    or selects no commits.
+
+    """
+    if not revlist:
+        return None, None, []
+    try:
+        first, last, excludes = repository.revlist_range(revlist)
+    except ShellError:
+        if DEBUG:
+            raise
+        ## only check revisions one by one to report the culprit
+        for rev in revlist:
+            try:
+                repository.git.rev_parse(["--revs-only", rev, "--"])
+            except ShellError:
+                die("Revision %r is not valid." % rev)
+        die("Revisions %r are not valid." % " ".join(revlist))
+    if first is None:
+        die("No commits matching given revlist: %s" % (" ".join(revlist), ))
+    return first, last, excludes
+
+
 def get_log_encoding(repository, config):
 
     log_encoding = config.get("log_encoding", None)
@@ -1798,6 +5295,54 @@ def get_log_encoding(repository, config):
     return log_encoding or DEFAULT_GIT_LOG_ENCODING
 
 
+def make_repository(config=None):
+    """Return the repository session of current directory
+
+    Its object backend is set from ``config`` if provided. Lookups
+    from the top level directory of the repository get the same
+    session.
+
+    """
+    try:
+        repository = GitRepos.session(".")
+    except EnvironmentError as e:
+        if DEBUG:
+            raise
+        try:
+            die(str(e))
+        except Exception as e2:
+            die(repr(e2))
+
+    if config is not None:
+        try:
+            repository.object_backend = config.get("object_backend",
+                                                   "subprocess")
+        except ValueError as e:
+            die(str(e))
+    return repository
+
+
+def make_fragment_cache(config, config_filenames, log_encoding):
+    """Return the ``FragmentCache`` asked by ``config``, or None
+
+    The cache is only used if the ``fragment_cache`` option is set. Its
+    entries depend on the content of ``config_filenames`` and on the
+    ``log_encoding``.
+
+    """
+    if not config.get("fragment_cache", False):
+        return None
+    cache_dir = template_cache_dir("fragments")
+    if not cache_dir:
+        return None
+    fingerprint = FragmentCache.fingerprint(
+        *[file_get_contents(filename)
+          for filename in config_filenames
+          if filename and os.path.isfile(filename)] +
+        [log_encoding])
+    return FragmentCache(cache_dir, fingerprint)
+
+
 ##
 ## Config Manager
 ##
@@ -1872,6 +5417,37 @@ def safe_print(content):
 ## Main
 ##
 
+def memoizers_stats(label, memoizers):
+    """Print hit and miss counts of ``memoizers`` of process ``label``"""
+    for memoizer in memoizers:
+        name = label if len(memoizers) == 1 else \
+               "%s %s" % (label, memoizer.label)
+        stderr("%s cache: %d hits, %d misses." % (
+            name, memoizer.hits, memoizer.misses))
+
+
+def publish_changelog(content, config, repository, fragment_cache=None):
+    """Publish ``content`` chunks with the ``publish`` action of ``config``
+
+    History walk and git processes of ``repository`` are stopped once
+    done, even if publishing stopped early (broken pipe, interruption...).
+
+    """
+    try:
+        config.get("publish", stdout)(content)
+        if DEBUG:
+            for label in ("subject_process", "body_process"):
+                process = config.get(label, None)
+                if isinstance(process, TextProc):
+                    memoizers_stats(label, process.memoizers())
+            if fragment_cache is not None:
+                stderr("fragment cache: %d hits, %d misses." % (
+                    fragment_cache.hits, fragment_cache.misses))
+    finally:
+        content.close()
+        repository.close()
+
+
 def main():
 
     global DEBUG
@@ -1897,15 +5473,7 @@ def main():
                           version=__version__)
     DEBUG = DEBUG or opts.debug
 
-    try:
-        repository = GitRepos(".")
-    except EnvironmentError as e:
-        if DEBUG:
-            raise
-        try:
-            die(str(e))
-        except Exception as e2:
-            die(repr(e2))
+    repository = make_repository()
 
     try:
         gc_rc = repository.config.get("gitchangelog.rc-path")
@@ -1939,21 +5507,26 @@ def main():
     ## of git repository
     os.chdir(repository.toplevel)
 
+    changelogrc = os.path.expanduser(changelogrc) if changelogrc else None
     config = load_config_file(
-        os.path.expanduser(changelogrc),
+        changelogrc,
         default_filename=reference_config,
         fail_if_not_present=False)
 
     config = Config(config)
 
+    repository = make_repository(config)
     log_encoding = get_log_encoding(repository, config)
     revlist = get_revision(repository, config, opts)
     config['unreleased_version_label'] = eval_if_callable(
         config['unreleased_version_label'])
     manage_obsolete_options(config)
 
+    fragment_cache = make_fragment_cache(
+        config, (reference_config, changelogrc), log_encoding)
+
     try:
-        content = changelog(
+        content = iter_changelog(
             repository=repository, revlist=revlist,
             ignore_regexps=config['ignore_regexps'],
             section_regexps=config['section_regexps'],
@@ -1964,12 +5537,14 @@ def main():
             body_process=config.get("body_process", noop),
             subject_process=config.get("subject_process", noop),
             log_encoding=log_encoding,
+            single_pass=config.get("single_pass", False),
+            log_fields=config.get("log_fields", None),
+            max_versions=config.get("max_versions", None),
+            process_workers=config.get("process_workers", None),
+            render_workers=config.get("render_workers", None),
+            fragment_cache=fragment_cache,
         )
-
-        if isinstance(content, basestring):
-            content = content.splitlines(True)
-
-        config.get("publish", stdout)(content)
+        publish_changelog(content, config, repository, fragment_cache)
 
     except KeyboardInterrupt:
         if DEBUG:
@@ -1,10 +1,4 @@
-% if data["title"]:
-${data["title"]}
-${"=" * len(data["title"])}
-
-
-% endif
-% for version in data["versions"]:
+<%def name="render_version(version)">\
 <%
 title = "%s (%s)" % (version["tag"], version["date"]) if version["tag"] else opts["unreleased_version_label"]
 
@@ -30,4 +24,13 @@ ${indent(commit["body"])}
 % endfor
 % endfor
 
+</%def>\
+% if data["title"]:
+${data["title"]}
+${"=" * len(data["title"])}
+
+
+% endif
+% for version in data["versions"]:
+${render_version(version)}\
 % endfor
@@ -0,0 +1,86 @@
+# -*- encoding: utf-8 -*-
+"""Microbenchmark of commit subjects classification
+
+Compares the loop over ``ignore_regexps`` and ``first_matching()``, as
+``versions_data_iter`` used to do, to ``CommitClassifier``, with the
+reference configuration and with a big shared one. Run with::
+
+    PYTHONPATH=src python -m test.bench_classifier
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import re
+import timeit
+
+from .common import gitchangelog
+
+
+REFERENCE_IGNORE = [
+    r'@minor', r'!minor', r'@cosmetic', r'!cosmetic',
+    r'@refactor', r'!refactor', r'@wip', r'!wip',
+    r'^([cC]hg|[fF]ix|[nN]ew)\s*:\s*[p|P]kg:',
+    r'^([cC]hg|[fF]ix|[nN]ew)\s*:\s*[d|D]ev:',
+    r'^(.{3,3}\s*:)?\s*[fF]irst commit.?\s*$',
+    r'^$',
+]
+
+REFERENCE_SECTIONS = [
+    ('New', [r'^[nN]ew\s*:\s*((dev|use?r|pkg|test|doc)\s*:\s*)?([^\n]*)$']),
+    ('Changes',
+     [r'^[cC]hg\s*:\s*((dev|use?r|pkg|test|doc)\s*:\s*)?([^\n]*)$']),
+    ('Fix', [r'^[fF]ix\s*:\s*((dev|use?r|pkg|test|doc)\s*:\s*)?([^\n]*)$']),
+    ('Other', None),
+]
+
+
+def big_config(size):
+    """Per-component sections, more patterns than ``re`` caches"""
+    ignore = REFERENCE_IGNORE + [r'^skip-%d\b' % i for i in range(size)]
+    sections = [("Component %d" % i, [r'^(fix|new|chg)\(comp%d\):' % i,
+                                      r'\[comp-%d\]' % i])
+                for i in range(size)] + REFERENCE_SECTIONS
+    return ignore, sections
+
+
+def subjects(nb):
+    kinds = ["new: usr: add feature %d", "fix: crash in %d !minor",
+             "chg: dev: refactor %d", "fix(comp%d): oops",
+             "random commit %d", "update [comp-%d] settings"]
+    return ["%s #%d" % (kinds[i % len(kinds)] % (i % 300), i)
+            for i in range(nb)]
+
+
+def loop(ignore_regexps, section_regexps, subjects):
+    result = []
+    for subject in subjects:
+        if any(re.search(pattern, subject) is not None
+               for pattern in ignore_regexps):
+            continue
+        result.append(gitchangelog.first_matching(section_regexps, subject))
+    return result
+
+
+def classifier(ignore_regexps, section_regexps, subjects):
+    return gitchangelog.CommitClassifier(
+        ignore_regexps, section_regexps).classify_all(subjects)
+
+
+def bench(fun, *args):
+    return min(timeit.repeat(lambda: fun(*args), number=1, repeat=3))
+
+
+def main():
+    commits = subjects(2000)
+    for name, (ignore, sections) in [
+            ("reference config", (REFERENCE_IGNORE, REFERENCE_SECTIONS)),
+            ("300 components", big_config(300))]:
+        print("%-16s %d subjects: loop %.3fs, classifier %.3fs"
+              % (name, len(commits),
+                 bench(loop, ignore, sections, commits),
+                 bench(classifier, ignore, sections, commits)))
+
+
+if __name__ == "__main__":
+    main()
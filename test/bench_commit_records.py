@@ -0,0 +1,77 @@
+# -*- encoding: utf-8 -*-
+"""Memory benchmark of commits kept alive by ``versions_data_iter``
+
+Compares the memory held by ``GitCommit`` instances, as ``GitRepos.log()``
+used to build them, and by ``CommitRecord`` instances. Run with::
+
+    PYTHONPATH=src python -m test.bench_commit_records
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import gc
+import tracemalloc
+
+from .common import gitchangelog
+
+
+def fields(idx):
+    """Fresh strings for each commit, as decoded from ``git log`` output"""
+    sha1 = "%040x" % idx
+    return dict((key, "%s" % value) for key, value in {
+        "sha1": sha1,
+        "sha1_short": sha1[:7],
+        "subject": "new: commit number %d" % idx,
+        "author_name": "John Smith %d" % (idx % 10),
+        "author_email": "john.smith@example.com%d" % (idx % 10),
+        "author_date": "Tue Feb 14 20:31:22 2017 +%04d" % (idx % 10),
+        "author_date_timestamp": "%d" % (1487079082 + idx),
+        "committer_name": "Alice Wang %d" % (idx % 10),
+        "committer_date_timestamp": "%d" % (1487079082 + idx),
+        "raw_body": "new: commit number %d\n\nSome body.\n" % idx,
+        "body": "Some body %d.\n" % idx,
+    }.items())
+
+
+def git_commit(idx):
+    commit = gitchangelog.GitCommit(None, fields(idx)["sha1"])
+    for key, value in fields(idx).items():
+        setattr(commit, key, value)
+    commit.author_names  ## as read by ``versions_data_iter``
+    return commit
+
+
+FIELDS = tuple(gitchangelog.GIT_FORMAT_KEYS)
+
+
+def commit_record(idx):
+    values = fields(idx)
+    record = gitchangelog.CommitRecord(None, FIELDS,
+                                       [values[key] for key in FIELDS])
+    record.author_names
+    return record
+
+
+def measure(factory, count):
+    gc.collect()
+    tracemalloc.start()
+    commits = [factory(idx) for idx in range(count)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del commits
+    return current, peak
+
+
+def main():
+    for count in (10000, 100000):
+        for factory in (git_commit, commit_record):
+            current, peak = measure(factory, count)
+            print("%7d %-13s: %7.1f MiB held, %7.1f MiB peak, "
+                  "%5d bytes/commit"
+                  % (count, factory.__name__, current / 1024.0 / 1024,
+                     peak / 1024.0 / 1024, current // count))
+
+
+if __name__ == "__main__":
+    main()
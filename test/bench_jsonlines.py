@@ -0,0 +1,92 @@
+# -*- encoding: utf-8 -*-
+"""Microbenchmark of the ``jsonlines`` output engine
+
+Compares ``jsonlines()`` to flattening each version in dicts dumped by
+``json.dumps()``. Run with::
+
+    PYTHONPATH=src python -m test.bench_jsonlines
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import json
+import timeit
+
+from .common import gitchangelog
+
+
+class Commit(object):
+
+    def __init__(self, num):
+        self.sha1 = "%040x" % num
+        self.author_name = "Bob"
+        self.author_email = "bob@example.com"
+        self.date = "2000-01-01"
+        self.author_date_timestamp = "946720800"
+
+
+def changelog_data(nb_versions, nb_commits):
+    return {
+        "title": "Changelog",
+        "versions": [{
+            "tag": "0.%d" % idx,
+            "date": "2000-01-01",
+            "tagger_date": None,
+            "commit_date": "2000-01-01",
+            "commit": Commit(idx),
+            "sections": [{
+                "label": label,
+                "commits": [{
+                    "subject": "fix the ``parser`` & the <cache> (#%d)" % num,
+                    "authors": ["Bob", "Alice"],
+                    "body": "Some details\n\nover a few lines." * (num % 2),
+                    "commit": Commit(num),
+                } for num in range(nb_commits)],
+            } for label in ("New", "Fix", "Other")],
+        } for idx in range(nb_versions)],
+    }
+
+
+def dumps(data, opts):  ## pylint: disable=unused-argument
+    for version in data["versions"]:
+        yield json.dumps({
+            "type": "version",
+            "tag": version["tag"],
+            "date": version["date"],
+            "tagger_date": version["tagger_date"],
+            "commit_date": version["commit_date"],
+            "sha1": version["commit"].sha1,
+            "sections": [{
+                "label": section["label"],
+                "commits": [dict(
+                    [(field, getattr(commit["commit"], field, None))
+                     for field in gitchangelog.JSONLINES_COMMIT_FIELDS] +
+                    [("subject", commit["subject"]),
+                     ("body", commit["body"]),
+                     ("authors", commit["authors"])])
+                    for commit in section["commits"]],
+            } for section in version["sections"]],
+        }, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def render(renderer, data):
+    return "".join(renderer(data, {}))
+
+
+def main():
+    data = changelog_data(100, 100)
+    jsonlines = gitchangelog.jsonlines()
+    assert [json.loads(line) for line in render(jsonlines, data).split("\n")
+            if line] == \
+        [json.loads(line) for line in render(dumps, data).split("\n")
+         if line]
+    print("30000 commits: json.dumps %.3fs, jsonlines %.3fs" % (
+        min(timeit.repeat(lambda: render(dumps, data),
+                          number=1, repeat=3)),
+        min(timeit.repeat(lambda: render(jsonlines, data),
+                          number=1, repeat=3))))
+
+
+if __name__ == "__main__":
+    main()
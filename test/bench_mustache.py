@@ -0,0 +1,62 @@
+# -*- encoding: utf-8 -*-
+"""Microbenchmark of the ``mustache`` output engine
+
+Compares ``pystache`` rendering of the bundled templates to the python
+code compiled from them by ``mustache_compile()``. Run with::
+
+    PYTHONPATH=src python -m test.bench_mustache
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import timeit
+
+from .common import gitchangelog
+
+
+OPTS = {"unreleased_version_label": "(unreleased)"}
+
+
+def changelog_data(nb_versions, nb_commits):
+    return {
+        "title": "Changelog",
+        "versions": [{
+            "tag": "0.%d" % idx,
+            "date": "2000-01-01",
+            "sections": [{
+                "label": label,
+                "commits": [{
+                    "subject": "fix the ``parser`` & the <cache> (#%d)" % num,
+                    "authors": ["Bob", "Alice"],
+                    "body": "Some details\n\nover a few lines." * (num % 2),
+                } for num in range(nb_commits)],
+            } for label in ("New", "Fix", "Other")],
+        } for idx in range(nb_versions)],
+    }
+
+
+def render(renderer):
+    return "".join(renderer(changelog_data(100, 30), OPTS))
+
+
+def main():
+    for name in ("restructuredtext", "markdown"):
+        compiled = gitchangelog.mustache(name, cache=False)
+        orig_compile = gitchangelog.mustache_compile
+        gitchangelog.mustache_compile = lambda *args: None
+        try:
+            interpreted = gitchangelog.mustache(name)
+        finally:
+            gitchangelog.mustache_compile = orig_compile
+        assert render(compiled) == render(interpreted)
+        print("%-17s 9000 commits: pystache %.3fs, compiled %.3fs" % (
+            name,
+            min(timeit.repeat(lambda: render(interpreted),
+                              number=1, repeat=3)),
+            min(timeit.repeat(lambda: render(compiled),
+                              number=1, repeat=3))))
+
+
+if __name__ == "__main__":
+    main()
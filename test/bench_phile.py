@@ -0,0 +1,40 @@
+# -*- encoding: utf-8 -*-
+"""Microbenchmark of ``Phile`` record scanner
+
+Reads ``git log -z`` like streams whose records are multi-MB squash
+merge bodies. Run with::
+
+    PYTHONPATH=src python -m test.bench_phile
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import io
+import timeit
+
+from .common import gitchangelog
+
+
+def stream(body_size, nb_records=5):
+    body = ("* squashed commit with some text é\n" *
+            (body_size // 35 + 1))[:body_size]
+    return ("\x00".join(["subject", body] * nb_records)).encode("utf-8")
+
+
+def bench(content, repeat=3):
+    def run():
+        for _record in gitchangelog.Phile(io.BytesIO(content)).read("\x00"):
+            pass
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def main():
+    for size in (1, 2, 4, 8):
+        content = stream(size * 1024 * 1024)
+        print("%2d MiB bodies (%5.1f MiB stream): %.3fs"
+              % (size, len(content) / 1024.0 / 1024, bench(content)))
+
+
+if __name__ == "__main__":
+    main()
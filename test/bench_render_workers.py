@@ -0,0 +1,62 @@
+# -*- encoding: utf-8 -*-
+"""Microbenchmark of versions rendered in worker processes
+
+Compares serial rendering of ``rest_py`` and of the bundled mako
+``restructuredtext`` template to their rendering by ``render_workers``
+processes. Gains depend on the number of available CPUs. Run with::
+
+    PYTHONPATH=src python -m test.bench_render_workers
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import multiprocessing
+import timeit
+
+from .common import gitchangelog
+
+
+def changelog_data(nb_versions, nb_commits):
+    return {
+        "title": "Changelog",
+        "versions": [{
+            "tag": "0.%d" % idx,
+            "date": "2000-01-01",
+            "sections": [{
+                "label": label,
+                "commits": [{
+                    "subject": "fix the ``parser`` and the cache (#%d) " % num
+                               * (1 + num % 4),
+                    "authors": ["Bob", "Alice"],
+                    "body": "Some details\n\nover a few lines." * (num % 2),
+                } for num in range(nb_commits)],
+            } for label in ("New", "Fix", "Other")],
+        } for idx in range(nb_versions)],
+    }
+
+
+def render(renderer, workers):
+    opts = {"unreleased_version_label": "(unreleased)",
+            "render_workers": workers}
+    return "".join(renderer(changelog_data(100, 100), opts))
+
+
+def main():
+    workers = max(2, multiprocessing.cpu_count())
+    for name, renderer in (
+            ("rest_py", gitchangelog.rest_py),
+            ("mako", gitchangelog.makotemplate("restructuredtext",
+                                               cache=False))):
+        assert render(renderer, None) == render(renderer, workers)
+        print("%-7s 30000 commits: serial %.3fs, %d workers %.3fs" % (
+            name,
+            min(timeit.repeat(lambda: render(renderer, None),
+                              number=1, repeat=3)),
+            workers,
+            min(timeit.repeat(lambda: render(renderer, workers),
+                              number=1, repeat=3))))
+
+
+if __name__ == "__main__":
+    main()
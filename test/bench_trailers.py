@@ -0,0 +1,49 @@
+# -*- encoding: utf-8 -*-
+"""Microbenchmark of trailers parsing on pathological commit bodies
+
+Compares the former ``REGEX_RFC822_POSTFIX`` search to the line scanner
+of ``trailers_start()``. Run with::
+
+    PYTHONPATH=src python -m test.bench_trailers
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import re
+import timeit
+
+from .common import gitchangelog
+
+
+def key_lines(size):
+    """Many ``Key: value`` lines not ending the body (quadratic)"""
+    return "Key-Id: value\n" * size + "end of message"
+
+
+def blank_continuations(size):
+    """Many blank continuation lines not ending the body (exponential)"""
+    return "Key: value\n" + "\n \n" * size + "text\nend of message"
+
+
+def bench(fun, body):
+    return min(timeit.repeat(lambda: fun(body), number=1, repeat=3))
+
+
+def regex_search(body):
+    return re.search(gitchangelog.REGEX_RFC822_POSTFIX, body)
+
+
+def main():
+    for name, body_fun, sizes in [
+            ("key lines", key_lines, (500, 1000, 2000)),
+            ("blank continuations", blank_continuations, (8, 10, 12))]:
+        for size in sizes:
+            body = body_fun(size)
+            print("%-20s %5d lines: regex %.4fs, scanner %.4fs"
+                  % (name, body.count("\n") + 1, bench(regex_search, body),
+                     bench(gitchangelog.trailers_start, body)))
+
+
+if __name__ == "__main__":
+    main()
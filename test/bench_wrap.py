@@ -0,0 +1,56 @@
+# -*- encoding: utf-8 -*-
+"""Microbenchmark of the wrapping and indentation of commit entries
+
+Compares ``textwrap.wrap()`` and the former ``indent()`` to
+``wrap_text()`` and the current ``indent()``, as used by ``rest_py``
+on each commit subject and body. Run with::
+
+    PYTHONPATH=src python -m test.bench_wrap
+
+"""
+
+from __future__ import print_function, unicode_literals
+
+import random
+import textwrap
+import timeit
+
+from .common import gitchangelog
+from .test_wrap import old_indent
+
+
+WORDS = ["fix", "new", "the", "parser", "of", "``config``", "when",
+         "files", "are", "missing", "(#42)", "a", "cache", "é"]
+
+
+def corpus(nb, seed=0):
+    rand = random.Random(seed)
+    subjects = [" ".join(rand.choice(WORDS)
+                         for _ in range(rand.randint(3, 25)))
+                for _ in range(nb)]
+    bodies = ["\n".join(" ".join(rand.choice(WORDS)
+                                 for _ in range(rand.randint(3, 15)))
+                        for _ in range(rand.randint(0, 8)))
+              for _ in range(nb)]
+    return subjects, bodies
+
+
+def render(wrap, indent, subjects, bodies):
+    for subject, body in zip(subjects, bodies):
+        indent('\n'.join(wrap(subject + " [Bob]")), first="- ")
+        indent(body, chars="    ")
+
+
+def main():
+    subjects, bodies = corpus(10000)
+    for name, wrap, indent in [
+            ("textwrap", textwrap.wrap, old_indent),
+            ("wrap_text", gitchangelog.wrap_text, gitchangelog.indent)]:
+        print("%-10s %d entries: %.4fs" % (
+            name, len(subjects),
+            min(timeit.repeat(lambda: render(wrap, indent, subjects, bodies),
+                              number=1, repeat=3))))
+
+
+if __name__ == "__main__":
+    main()
@@ -174,6 +174,10 @@ class BaseGitReposTest(BaseTmpDirTest):
             user="The Committer")
         os.chdir("repos")
 
+    def tearDown(self):
+        self.repos.close()
+        super(BaseGitReposTest, self).tearDown()
+
     @property
     def git(self):
         return self.repos.git
@@ -184,6 +188,12 @@ class BaseGitReposTest(BaseTmpDirTest):
         return lambda **kw: gitchangelog.changelog(
             repository=self.repos, **kw)
 
+    @property
+    def iter_changelog(self):
+        ## Currifyed streaming main function
+        return lambda **kw: gitchangelog.iter_changelog(
+            repository=self.repos, **kw)
+
     @property
     def raw_changelog(self):
         ## Currifyed main function
@@ -0,0 +1,79 @@
+# -*- encoding: utf-8 -*-
+"""Testing in-memory ancestry index
+
+Answers must be the same than the ones of ``git merge-base
+--is-ancestor`` and ``git tag --contains``.
+
+"""
+
+from __future__ import unicode_literals
+
+import itertools
+
+from .common import BaseGitReposTest, gitchangelog
+
+
+class AncestryIndexTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(AncestryIndexTest, self).setUp()
+
+        ## Target tree:
+        ##
+        ## *   Merge branch 'master' into develop  (HEAD, develop)
+        ## |\
+        ## | * fix: hotfix on master  (tag: 0.0.3, master)
+        ## * | new: second commit on develop branch
+        ## * | new: first commit on develop branch  (tag: 0.0.2)
+        ## |/
+        ## * first commit  (tag: 0.0.1)
+
+        self.git.commit(message='first commit', allow_empty=True)
+        self.git.tag("0.0.1")
+        self.git.checkout(b="develop")
+        self.git.commit(message='new: first commit on develop branch',
+                        allow_empty=True)
+        self.git.tag("0.0.2")
+        self.git.commit(message='new: second commit on develop branch',
+                        allow_empty=True)
+        self.git.checkout("master")
+        self.git.commit(message='fix: hotfix on master', allow_empty=True)
+        self.git.tag("0.0.3")
+        self.git.checkout("develop")
+        self.git.merge("master", no_ff=True)
+        self.shas = self.git.rev_list("--all").split("\n")
+
+    def test_not_built_by_default(self):
+        self.assertIs(self.repos.ancestry, None)
+        self.assertTrue(self.repos.commit("0.0.1") < "HEAD")
+        self.changelog()
+        self.assertIs(self.repos.ancestry, None)
+
+    def test_built_by_single_pass(self):
+        self.changelog(single_pass=True)
+        self.assertIsInstance(self.repos.ancestry, gitchangelog.AncestryIndex)
+        self.assertIn(self.repos.commit("0.0.1").sha1, self.repos.ancestry)
+
+    def test_is_ancestor(self):
+        self.repos.index_ancestry(["develop", "master"])
+        for ancestor, descendant in itertools.product(self.shas, repeat=2):
+            try:
+                self.git.merge_base(descendant, is_ancestor=ancestor)
+                expected = True
+            except gitchangelog.ShellError:
+                expected = False
+            self.assertEqual(
+                self.repos.ancestry.is_ancestor(ancestor, descendant),
+                expected)
+
+    def test_tags_contains(self):
+        for index in (False, True):
+            if index:
+                self.repos.index_ancestry(["develop", "master"])
+            for sha1 in self.shas:
+                self.assertEqual(
+                    sorted(tag.identifier
+                           for tag in self.repos.tags(contains=sha1)),
+                    sorted(name for name
+                           in self.git.tag(contains=sha1).split("\n")
+                           if name))
@@ -0,0 +1,86 @@
+# -*- encoding: utf-8 -*-
+"""Testing early termination
+
+Once nobody reads the output anymore, no more history must be walked
+and running git processes must be stopped.
+
+"""
+
+from __future__ import unicode_literals
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+class CancellationTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(CancellationTest, self).setUp()
+
+        for idx in range(1, 6):
+            self.git.commit(message='new: commit %d' % idx,
+                            date='2000-01-0%d 10:00:00' % idx,
+                            allow_empty=True)
+            self.git.tag("0.0.%d" % idx)
+
+        self.log_calls = 0
+        orig_log = self.repos.log
+
+        def log(*args, **kwargs):
+            self.log_calls += 1
+            return orig_log(*args, **kwargs)
+        self.repos.log = log
+
+    def test_log_process_stopped(self):
+        commits = self.repos.log()
+        next(commits)
+        procs = list(self.repos._procs)
+        self.assertEqual(len(procs), 1)
+        commits.close()
+        self.assertEqual(self.repos._procs, set())
+        self.assertNotEqual(procs[0].returncode, None)
+
+    def test_log_process_stopped_on_repos_close(self):
+        commits = self.repos.log()
+        next(commits)
+        procs = list(self.repos._procs)
+        self.repos.close()
+        self.assertNotEqual(procs[0].returncode, None)
+
+    def test_log_process_reaped(self):
+        list(self.repos.log())
+        self.assertEqual(self.repos._procs, set())
+
+    def test_close_stream(self):
+        chunks = self.iter_changelog()
+        next(chunks)  ## title
+        next(chunks)  ## first version
+        log_calls = self.log_calls
+        chunks.close()
+        self.assertEqual(self.log_calls, log_calls)
+        self.assertEqual(self.repos._procs, set())
+
+    def test_exception_in_engine(self):
+        def engine(data, opts):
+            for version in data["versions"]:
+                yield version["tag"]
+                raise ValueError("engine failed")
+        chunks = self.iter_changelog(output_engine=engine)
+        with self.assertRaises(ValueError):
+            list(chunks)
+        ## HEAD is tagged: the unreleased version is empty
+        self.assertEqual(self.log_calls, 2)
+
+    def test_max_versions(self):
+        content = "".join(self.changelog(max_versions=2))
+        self.assertContains(content, "0.0.4")
+        self.assertNotContains(content, "0.0.3")
+        ## HEAD is tagged: the unreleased version is empty
+        self.assertEqual(self.log_calls, 3)
+
+    def test_max_versions_in_config(self):
+        gitchangelog.file_put_contents(".gitchangelog.rc",
+                                       "max_versions = 1")
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertContains(out, "0.0.5")
+        self.assertNotContains(out, "0.0.4")
@@ -0,0 +1,105 @@
+# -*- encoding: utf-8 -*-
+"""Testing commit lookups through ``git cat-file --batch``
+
+Values read from the commit object must be the same than the ones given
+by ``git log``.
+
+"""
+
+from __future__ import unicode_literals
+
+import textwrap
+from subprocess import Popen, PIPE
+
+from .common import BaseGitReposTest, gitchangelog
+
+
+class CatFileTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(CatFileTest, self).setUp()
+
+        self.git.commit(
+            message='new: first commit',
+            author='Bob <bob@example.com>',
+            date='2000-01-01 10:00:00',
+            allow_empty=True)
+        self.git.tag("0.0.1")
+        self.git.commit(
+            message=textwrap.dedent("""
+
+                subject on
+                two lines \t
+
+                add ``b`` with non-ascii chars éèàâ§µ
+
+                Change-Id: Ic8aaa0728a43936cd4c6e1ed590e01ba8f0fbf5b
+                """),
+            author='Alice <alice@example.com>',
+            date='2000-01-02 11:00:00',
+            allow_empty=True,
+            cleanup="verbatim")
+
+    def assertSameAsGitLog(self, identifier):
+        values = self.repos.read_commit(identifier)
+        keys = [key for key in gitchangelog.GIT_FORMAT_KEYS
+                if key not in ("sha1_short", "author_date")]
+        ret = self.git.log([
+            identifier, "--max-count=1", "--pretty=format:%s" %
+            "%x00".join(gitchangelog.GIT_FORMAT_KEYS[key] for key in keys),
+            "--"])
+        for key, value in zip(keys, ret.split("\x00")):
+            self.assertEqual(values[key].strip(), value.strip(), key)
+
+    def test_same_values_as_git_log(self):
+        self.assertSameAsGitLog("HEAD")
+        self.assertSameAsGitLog("0.0.1")
+
+    def test_commit_encoding(self):
+        raw = ("tree %s\n"
+               "author Bob <bob@example.com> 946720800 +0000\n"
+               "committer Bob <bob@example.com> 946720800 +0000\n"
+               "encoding ISO-8859-1\n"
+               "\n"
+               "subject with non-ascii chars éèà\n"
+               % self.git.rev_parse("HEAD^{tree}")).encode("latin-1")
+        p = Popen(["git", "hash-object", "-t", "commit", "-w", "--stdin"],
+                  stdin=PIPE, stdout=PIPE)
+        sha1 = p.communicate(raw)[0].decode("ascii").strip()
+        self.assertSameAsGitLog(sha1)
+        self.assertEqual(self.repos.commit(sha1).subject,
+                         "subject with non-ascii chars éèà")
+
+    def test_unexistent_commit(self):
+        self.assertEqual(self.repos.read_commit("XXX"), None)
+        self.assertEqual(self.repos.read_commit("HEAD^{tree}"), None)
+
+    def test_no_process_per_commit(self):
+        calls = []
+        orig_swrap = gitchangelog.swrap
+
+        def swrap(command, **kwargs):
+            calls.append(command)
+            return orig_swrap(command, **kwargs)
+
+        gitchangelog.swrap = swrap
+        try:
+            self.assertEqual(self.repos.commit("HEAD").committer_name,
+                             "The Committer")
+            self.assertTrue(self.repos.commit("0.0.1") < "HEAD")
+        finally:
+            gitchangelog.swrap = orig_swrap
+        ## only the ``merge-base`` call
+        self.assertEqual(len(calls), 1)
+
+    def test_broken_pipe(self):
+        self.assertEqual(self.repos.commit("HEAD").author_name, "Alice")
+        self.repos._cat_file._proc.kill()
+        self.repos._cat_file._proc.wait()
+        ## falls back on ``git log``
+        self.assertEqual(self.repos.commit("HEAD").author_name, "Alice")
+        ## process is launched again
+        self.assertEqual(self.repos.read_commit("HEAD")["author_name"],
+                         "Alice")
+        self.repos.close()
+        self.assertEqual(self.repos._cat_file._proc, None)
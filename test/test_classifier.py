@@ -0,0 +1,82 @@
+# -*- encoding: utf-8 -*-
+"""Testing ``CommitClassifier``
+
+"""
+
+from __future__ import unicode_literals
+
+import re
+import unittest
+
+from .common import gitchangelog
+
+
+def classify(ignore_regexps, section_regexps, subject):
+    """Reference implementation, as ``versions_data_iter`` used to do"""
+    if any(re.search(pattern, subject) is not None
+           for pattern in ignore_regexps):
+        return "IGNORED"
+    return gitchangelog.first_matching(section_regexps, subject)
+
+
+class CommitClassifierTest(unittest.TestCase):
+
+    subjects = [
+        "", "new: foo", "new: dev: foo", "fix: foo !minor", "foo new: bar",
+        "chg: usr: foo\n", "Fix: FOO", "aa bb", "ab ab", "x\ny", "é: fix:",
+        "first commit", "chg: pkg: foo @wip",
+    ]
+
+    def assertSameAsReference(self, ignore_regexps, section_regexps):
+        classifier = gitchangelog.CommitClassifier(ignore_regexps,
+                                                   section_regexps)
+        labels = [
+            "IGNORED" if label is classifier.IGNORED else label
+            for label in classifier.classify_all(self.subjects)]
+        self.assertEqual(
+            labels,
+            [classify(ignore_regexps, section_regexps, subject)
+             for subject in self.subjects])
+
+    def test_reference_config(self):
+        ## from ``gitchangelog.rc.reference``
+        self.assertSameAsReference(
+            [r'@minor', r'!minor', r'@cosmetic', r'!cosmetic',
+             r'@refactor', r'!refactor', r'@wip', r'!wip',
+             r'^([cC]hg|[fF]ix|[nN]ew)\s*:\s*[p|P]kg:',
+             r'^([cC]hg|[fF]ix|[nN]ew)\s*:\s*[d|D]ev:',
+             r'^(.{3,3}\s*:)?\s*[fF]irst commit.?\s*$',
+             r'^$'],
+            [('New', [
+                r'^[nN]ew\s*:\s*((dev|use?r|pkg|test|doc)\s*:\s*)?([^\n]*)$']),
+             ('Changes', [
+                r'^[cC]hg\s*:\s*((dev|use?r|pkg|test|doc)\s*:\s*)?([^\n]*)$']),
+             ('Fix', [
+                r'^[fF]ix\s*:\s*((dev|use?r|pkg|test|doc)\s*:\s*)?([^\n]*)$']),
+             ('Other', None)])
+
+    def test_default_config(self):
+        self.assertSameAsReference([], [(None, '')])
+
+    def test_no_matching_section(self):
+        self.assertSameAsReference([r'minor'], [("Fix", [r'fix'])])
+
+    def test_order_prevails_over_position(self):
+        self.assertSameAsReference(
+            [], [("A", [r'bar$', r'(?<=o) ']), ("B", [r'new']),
+                 ("C", [r'foo', r'fix']), ("D", None), ("E", [r'.'])])
+
+    def test_uncombinable_patterns(self):
+        self.assertSameAsReference(
+            [r'(?i)^fix: foo$', r'(a)b \1'],
+            [("A", [r'(?P<x>b)b', r'^f(o)(?(1)o|x)']),
+             ("B", [re.compile(r'NEW', re.I), r'(x)\n(y)',
+                    r'(?P<z>a)(?P=z)']),
+             ("C", [r'(?m)^y', r'^é']),
+             ("D", [r'chg'])])
+
+    def test_many_patterns(self):
+        self.assertSameAsReference(
+            [r'^skip-%d$' % i for i in range(50)] + [r'!minor'],
+            [("S%d" % i, [r'^%s\b' % word, r'(%s)\s*:' % word])
+             for i, word in enumerate(["x"] * 40 + ["new", "fix", "chg"])])
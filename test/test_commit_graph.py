@@ -0,0 +1,102 @@
+# -*- encoding: utf-8 -*-
+"""Testing ``commit-graph`` file reader
+
+"""
+
+from __future__ import unicode_literals
+
+import os
+import itertools
+
+from .common import BaseGitReposTest, gitchangelog
+
+
+class CommitGraphTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(CommitGraphTest, self).setUp()
+
+        ## Target tree:
+        ##
+        ## *-.   Merge branches 'b1' and 'b2'  (HEAD, master)
+        ## |\ \
+        ## | | * b2 commit  (tag: 0.0.3, b2)
+        ## | * | b1 commit  (tag: 0.0.2, b1)
+        ## | |/
+        ## * / master commit
+        ## |/
+        ## * first commit  (tag: 0.0.1)
+
+        self.git.commit(message='first commit', allow_empty=True)
+        self.git.tag("0.0.1")
+        for branch in ("b1", "b2"):
+            self.git.checkout(["-b", branch, "0.0.1"])
+            self.git.commit(message='%s commit' % branch, allow_empty=True)
+        self.git.tag(["0.0.2", "b1"])
+        self.git.tag(["0.0.3", "b2"])
+        self.git.checkout("master")
+        self.git.commit(message='master commit', allow_empty=True)
+        self.git.merge(["b1", "b2"])
+        self.git.commit_graph(["write", "--reachable"])
+
+        self.shas = self.git.rev_list("--all").split("\n")
+
+    def test_parents_and_dates(self):
+        graph = gitchangelog.CommitGraph.open(self.repos.gitdir)
+        self.assertEqual(len(graph), len(self.shas))
+        for sha1 in self.shas:
+            parents, date = self.git.log(
+                [sha1, "--max-count=1", "--pretty=format:%P%x00%ct"]
+            ).split("\x00")
+            self.assertEqual(graph.parents(sha1), parents.split())
+            self.assertEqual(graph.commit_date_timestamp(sha1), int(date))
+        self.assertEqual(
+            len(graph.parents(self.git.rev_parse("HEAD"))), 3)
+        self.assertEqual(graph.parents("0" * 40), None)
+        graph.close()
+
+    def test_generations(self):
+        graph = gitchangelog.CommitGraph.open(self.repos.gitdir)
+        index = gitchangelog.AncestryIndex(
+            self.git.rev_list(["--parents", "--topo-order", "--all"])
+            .split("\n"))
+        for sha1 in self.shas:
+            self.assertEqual(graph.generation(sha1),
+                             index._generation_of(index._number(sha1)))
+        graph.close()
+
+    def test_is_ancestor(self):
+        self.assertIsInstance(self.repos.ancestry, gitchangelog.CommitGraph)
+        for ancestor, descendant in itertools.product(self.shas, repeat=2):
+            try:
+                self.git.merge_base(descendant, is_ancestor=ancestor)
+                expected = True
+            except gitchangelog.ShellError:
+                expected = False
+            self.assertEqual(
+                self.repos.ancestry.is_ancestor(ancestor, descendant),
+                expected)
+
+    def test_tags_contains(self):
+        self.assertIsInstance(self.repos.ancestry, gitchangelog.CommitGraph)
+        for sha1 in self.shas:
+            self.assertEqual(
+                sorted(tag.identifier
+                       for tag in self.repos.tags(contains=sha1)),
+                sorted(name for name in self.git.tag(contains=sha1).split("\n")
+                       if name))
+
+    def test_stale_commit_graph(self):
+        self.git.commit(message='new commit', allow_empty=True)
+        self.assertIs(self.repos.ancestry, None)
+        self.repos.index_ancestry(["HEAD"])
+        self.assertIsInstance(self.repos.ancestry, gitchangelog.AncestryIndex)
+
+    def test_no_commit_graph(self):
+        os.unlink(os.path.join(self.repos.gitdir,
+                               "objects", "info", "commit-graph"))
+        self.assertEqual(gitchangelog.CommitGraph.open(self.repos.gitdir),
+                         None)
+        self.assertIs(self.repos.ancestry, None)
+        self.repos.index_ancestry(["HEAD"])
+        self.assertIsInstance(self.repos.ancestry, gitchangelog.AncestryIndex)
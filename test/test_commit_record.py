@@ -0,0 +1,75 @@
+# -*- encoding: utf-8 -*-
+"""Testing compact commit records yielded by ``GitRepos.log()``
+
+"""
+
+from __future__ import unicode_literals
+
+import textwrap
+
+from .common import BaseGitReposTest, gitchangelog
+
+
+class CommitRecordTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(CommitRecordTest, self).setUp()
+
+        self.git.commit(message='new: first commit',
+                        date='2000-01-01 10:00:00',
+                        allow_empty=True)
+        self.git.tag(["-a", "0.0.1", "-m", "first release"])
+        self.git.commit(
+            message=textwrap.dedent("""\
+                new: second commit éà
+
+                Some body
+
+                Change-Id: 1234
+                Co-Authored-By: Bob <bob@example.com>
+                Co-Authored-By: Alice <alice@example.com>"""),
+            date='2000-01-02 10:00:00',
+            allow_empty=True)
+
+    def test_same_attributes_than_git_commit(self):
+        for record in self.repos.log():
+            self.assertIsInstance(record, gitchangelog.CommitRecord)
+            commit = self.repos.commit(record.sha1)
+            for attr in list(gitchangelog.GIT_FORMAT_KEYS) + [
+                    "identifier", "date", "authors", "author_names",
+                    "trailer_change_id"]:
+                value = getattr(record, attr, None)
+                self.assertEqual(
+                    value.strip() if attr == "raw_body" else value,
+                    getattr(commit, attr, None),
+                    msg=attr)
+            self.assertEqual(record._commit, None)  ## not upgraded
+
+    def test_upgrade_on_unknown_attribute(self):
+        first = list(self.repos.log())[-1]
+        ## identified by sha1, not by the tag name
+        self.assertFalse(first.has_annotated_tag)
+        self.assertIsInstance(first._commit, gitchangelog.GitCommit)
+        self.assertEqual(first.subject, "new: first commit")
+        with self.assertRaises(AttributeError):
+            first.foo
+
+    def test_comparisons(self):
+        second, first = list(self.repos.log())
+        self.assertTrue(first < second)
+        self.assertTrue(first <= "HEAD")
+        self.assertTrue(second == "HEAD")
+        self.assertTrue(self.repos.commit("HEAD") == second)
+        self.assertFalse(second <= first)
+        self.assertEqual(len(set([first, second,
+                                  self.repos.commit("0.0.1")])), 2)
+
+    def test_immutable(self):
+        record = next(self.repos.log())
+        with self.assertRaises(AttributeError):
+            record.subject = "foo"
+
+    def test_parents(self):
+        second, first = list(self.repos.log(with_parents=True))
+        self.assertEqual(second.parents, (first.sha1, ))
+        self.assertEqual(first.parents, ())
@@ -0,0 +1,122 @@
+# -*- encoding: utf-8 -*-
+"""Testing the persistent cache of commit entries
+
+"""
+
+from __future__ import unicode_literals
+
+import glob
+import os
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+class FragmentCacheTest(BaseGitReposTest):
+
+    OPTIONS = {
+        "section_regexps": [("New", [r"^new"]), ("Other", None)],
+        "ignore_regexps": [r"!minor"],
+    }
+
+    def setUp(self):
+        super(FragmentCacheTest, self).setUp()
+
+        self.git.commit(
+            message='new: add a feature\n\nWith a body.',
+            author='Bob <bob@example.com>',
+            date='2000-01-01 10:00:00',
+            allow_empty=True)
+        self.git.tag("0.0.1")
+        self.git.commit(
+            message='fix: second commit',
+            author='Alice <alice@example.com>',
+            date='2000-01-02 10:00:00',
+            allow_empty=True)
+        self.git.commit(
+            message='ignored !minor',
+            date='2000-01-03 10:00:00',
+            allow_empty=True)
+
+    def cache(self):
+        return gitchangelog.FragmentCache(
+            os.path.join(self.tmpdir, "cache"), "fingerprint")
+
+    def test_same_output(self):
+        for output_engine in (gitchangelog.rest_py,
+                              gitchangelog.mustache("markdown"),
+                              gitchangelog.makotemplate("restructuredtext")):
+            reference = "".join(self.changelog(output_engine=output_engine,
+                                                **self.OPTIONS))
+            cache = self.cache()
+            for _ in range(2):
+                self.assertNoDiff(
+                    reference,
+                    "".join(self.changelog(output_engine=output_engine,
+                                           fragment_cache=cache,
+                                           **self.OPTIONS)))
+            self.assertEqual((cache.hits, cache.misses), (3, 3))
+
+    def test_rendered_fragments_are_reused(self):
+        for output_engine in (gitchangelog.rest_py,
+                              gitchangelog.mustache("restructuredtext")):
+            cache = self.cache()
+            "".join(self.changelog(output_engine=output_engine,
+                                   fragment_cache=cache, **self.OPTIONS))
+            sha1 = self.repos.commit("0.0.1").sha1
+            key, _text = cache.entries[sha1]["fragment"]
+            cache.entries[sha1]["fragment"] = (key, "- CACHED\n")
+            out = "".join(self.changelog(output_engine=output_engine,
+                                         fragment_cache=cache,
+                                         **self.OPTIONS))
+            self.assertContains(out, "- CACHED\n")
+            self.assertNotContains(out, "Add a feature")
+
+    def test_rc_file_changes(self):
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc", "fragment_cache = True\n")
+        reference, err, errlvl = cmd('$tprog')
+        self.assertEqual(err, "")
+        cached = glob.glob(os.path.join(".git", "gitchangelog", "fragments",
+                                        "*"))
+        self.assertEqual(len(cached), 1)
+
+        out, err, errlvl = cmd('$tprog --debug')
+        self.assertContains(err, "fragment cache: 3 hits, 0 misses.")
+        self.assertNoDiff(reference, out)
+
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "fragment_cache = True\n"
+            "subject_process = lambda s: s.upper()\n")
+        out, err, errlvl = cmd('$tprog --debug')
+        self.assertContains(err, "fragment cache: 0 hits, 3 misses.")
+        self.assertContains(out, "NEW: ADD A FEATURE")
+        new_cached = glob.glob(os.path.join(".git", "gitchangelog",
+                                            "fragments", "*"))
+        self.assertEqual(len(new_cached), 1)
+        self.assertNotEqual(new_cached, cached)
+
+    def test_template_changes(self):
+        gitchangelog.file_put_contents(
+            "mytemplate.tpl",
+            "{{#versions}}{{#sections}}{{#commits}}"
+            "* {{subject}}\n{{/commits}}{{/sections}}{{/versions}}")
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "fragment_cache = True\n"
+            "output_engine = mustache('mytemplate.tpl')\n")
+        out, err, errlvl = cmd('$tprog')
+        self.assertContains(out, "* Add a feature.\n")
+        gitchangelog.file_put_contents(
+            "mytemplate.tpl",
+            "{{#versions}}{{#sections}}{{#commits}}"
+            "+ {{subject}}\n{{/commits}}{{/sections}}{{/versions}}")
+        out, err, errlvl = cmd('$tprog --debug')
+        self.assertContains(err, "fragment cache: 3 hits, 0 misses.")
+        self.assertContains(out, "+ Add a feature.\n")
+        self.assertNotContains(out, "* Add a feature.\n")
+
+    def test_not_used_by_default(self):
+        cmd('$tprog')
+        self.assertFalse(os.path.exists(
+            os.path.join(".git", "gitchangelog", "fragments")))
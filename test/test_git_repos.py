@@ -21,9 +21,32 @@ class GitReposInstantiationTest(BaseTmpDirTest):
         out, err, errlvl = cmd('$tprog')
         self.assertEqual(
             err.strip(),
-            "Not in a git repository. (calling ``git remote`` failed.)")
+            "Not in a git repository. (calling ``git rev-parse`` failed.)")
         self.assertEqual(errlvl, 1)
 
+    def test_instanciate_on_bare_repos(self):
+        gitchangelog.wrap("git init --bare repos.git")
+        repos = gitchangelog.GitRepos("repos.git")
+        self.assertTrue(repos.bare)
+        self.assertEqual(repos.toplevel, None)
+        self.assertEqual(repos.gitdir,
+                         os.path.realpath(os.path.join(self.tmpdir,
+                                                       "repos.git")))
+        repos.close()
+
+    def test_session(self):
+        gitchangelog.wrap("git init repos")
+        os.mkdir(os.path.join("repos", "subdir"))
+        repos = gitchangelog.GitRepos.session(os.path.join("repos", "subdir"))
+        self.assertIs(gitchangelog.GitRepos.session("repos"), repos)
+        self.assertIs(
+            gitchangelog.GitRepos.session(os.path.join("repos", "subdir")),
+            repos)
+        self.assertFalse(repos.bare)
+        repos.close()
+        self.assertIsNot(gitchangelog.GitRepos.session("repos"), repos)
+        gitchangelog.GitRepos.session("repos").close()
+
 
 class GitReposTest(BaseGitReposTest):
 
@@ -64,3 +87,31 @@ class GitReposTest(BaseGitReposTest):
         self.assertTrue(self.repos.commit("HEAD") == "HEAD")
         self.assertTrue(self.repos.commit("0.0.1") <= "HEAD")
         self.assertTrue(self.repos.commit("HEAD") <= "HEAD")
+
+    def test_commit_less_or_equal_unknown_to_ancestry_index(self):
+        self.repos.index_ancestry(["HEAD"])
+        self.assertTrue(self.repos.commit("0.0.1") < "HEAD")
+        self.git.commit(
+            message='new: third commit',
+            allow_empty=True)
+        self.assertNotContains(self.repos.ancestry,
+                               self.repos.commit("HEAD").sha1)
+        self.assertTrue(self.repos.commit("0.0.1") < "HEAD")
+        self.assertFalse(self.repos.commit("HEAD") <= "0.0.1")
+
+    def test_config_snapshot(self):
+        self.git.config(["--add", "foo.multi", "a"])
+        self.git.config(["--add", "foo.multi", "b"])
+        self.git.config(["Bar.SubSec.Key", "x y"])
+        config = self.repos.config
+        self.assertIs(self.repos.config, config)
+        self.assertEqual(config["foo.multi"], self.git.config("foo.multi"))
+        self.assertEqual(config.get_all("foo.multi"), ["a", "b"])
+        self.assertEqual(config["bar.SubSec.key"], "x y")
+        self.assertEqual(config.get("bar.subsec.key"), None)
+        self.assertEqual(config.origin("foo.multi"), "file:.git/config")
+
+        self.git.config(["foo.multi", "c", "b"])
+        self.assertEqual(config["foo.multi"], "b")
+        config.invalidate()
+        self.assertEqual(config.get_all("foo.multi"), ["a", "c"])
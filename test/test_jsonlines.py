@@ -0,0 +1,111 @@
+# -*- encoding: utf-8 -*-
+"""Testing the JSON Lines output engine
+
+"""
+
+from __future__ import unicode_literals
+
+import json
+import textwrap
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+class JsonLinesTest(BaseGitReposTest):
+
+    OPTIONS = {
+        "section_regexps": [("New", [r"^new"]), ("Other", None)],
+    }
+
+    def setUp(self):
+        super(JsonLinesTest, self).setUp()
+
+        self.git.commit(
+            message='new: add a feature',
+            author='Bob <bob@example.com>',
+            date='2000-01-01 10:00:00',
+            allow_empty=True)
+        self.git.tag("0.0.1")
+        self.git.commit(
+            message=textwrap.dedent("""\
+                fix: non-ascii chars éà and "quotes"
+
+                Some body.
+
+                Change-Id: 1234
+                Co-Authored-By: Alice <alice@example.com>"""),
+            author='Bob <bob@example.com>',
+            date='2000-01-02 10:00:00',
+            allow_empty=True)
+
+    def lines(self, **kwargs):
+        output_engine = gitchangelog.jsonlines(**kwargs)
+        out = "".join(self.changelog(output_engine=output_engine,
+                                     **self.OPTIONS))
+        self.assertTrue(out.endswith("\n"))
+        return [json.loads(line) for line in out.splitlines()]
+
+    def test_versions(self):
+        unreleased, version = self.lines()
+        self.assertEqual(version["type"], "version")
+        self.assertEqual(version["tag"], "0.0.1")
+        self.assertEqual(version["date"], "2000-01-01")
+        self.assertEqual(version["sha1"], self.repos.commit("0.0.1").sha1)
+        self.assertEqual(version["sections"], [{
+            "label": "New",
+            "commits": [{
+                "sha1": self.repos.commit("0.0.1").sha1,
+                "author_name": "Bob",
+                "author_email": "bob@example.com",
+                "date": "2000-01-01",
+                "author_date_timestamp":
+                    self.repos.commit("0.0.1").author_date_timestamp,
+                "subject": "new: add a feature",
+                "body": "",
+                "authors": ["Bob"],
+            }],
+        }])
+        self.assertEqual(unreleased["tag"], None)
+        self.assertEqual(unreleased["sha1"], self.repos.commit("HEAD").sha1)
+        commit = unreleased["sections"][0]["commits"][0]
+        self.assertEqual(unreleased["sections"][0]["label"], "Other")
+        self.assertEqual(commit["subject"],
+                         'fix: non-ascii chars éà and "quotes"')
+        self.assertEqual(commit["body"], "Some body.\n")
+        self.assertEqual(commit["authors"], ["Alice", "Bob"])
+
+    def test_commit_lines(self):
+        lines = self.lines(commits=True,
+                           fields=["sha1_short", "trailer_change_id"])
+        self.assertEqual([line["type"] for line in lines],
+                         ["version", "commit", "version", "commit"])
+        self.assertNotIn("sections", lines[0])
+        self.assertEqual(lines[1], {
+            "type": "commit",
+            "version": None,
+            "section": "Other",
+            "sha1_short": self.repos.commit("HEAD").sha1_short,
+            "trailer_change_id": "1234",
+            "subject": 'fix: non-ascii chars éà and "quotes"',
+            "body": "Some body.\n",
+            "authors": ["Alice", "Bob"],
+        })
+        self.assertEqual(lines[3]["version"], "0.0.1")
+        self.assertEqual(lines[3]["trailer_change_id"], None)
+
+    def test_log_fields(self):
+        self.assertEqual(
+            gitchangelog.jsonlines(fields=["date", "sha1_short"]).log_fields,
+            ("sha1_short", "author_date_timestamp"))
+
+    def test_in_config(self):
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "output_engine = jsonlines(commits=True)\n")
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertEqual(err, "")
+        lines = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1]["subject"],
+                         'Non-ascii chars éà and "quotes"')
@@ -0,0 +1,108 @@
+# -*- encoding: utf-8 -*-
+"""Testing projection of ``git log`` fields
+
+Only fields used by the output engine are asked to ``git log``, other
+attributes stay available.
+
+"""
+
+from __future__ import unicode_literals
+
+import textwrap
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+def fields_renderer(data, opts):
+    return [commit["commit"]._fields
+            for version in data["versions"]
+            for section in version["sections"]
+            for commit in section["commits"]]
+
+
+class LogFieldsTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(LogFieldsTest, self).setUp()
+
+        self.git.commit(message='new: first commit',
+                        date='2000-01-01 10:00:00',
+                        allow_empty=True)
+        self.git.tag("0.0.1")
+        self.git.commit(
+            message=textwrap.dedent("""\
+                fix: second commit
+
+                Some body
+
+                Co-Authored-By: Bob <bob@example.com>"""),
+            date='2000-01-02 10:00:00',
+            allow_empty=True)
+
+    def test_log_projection(self):
+        records = list(self.repos.log(fields=["subject"]))
+        self.assertEqual([r._fields for r in records],
+                         [("sha1", "subject")] * 2)
+        ## other attributes are still available
+        self.assertEqual([r.date for r in records],
+                         ["2000-01-02", "2000-01-01"])
+        self.assertEqual(records[0].sha1_short,
+                         self.git.rev_parse(["--short", "HEAD"]))
+
+    def test_engine_declared_fields(self):
+        fields_renderer.log_fields = ("date", )
+        try:
+            self.assertEqual(
+                self.changelog(output_engine=fields_renderer),
+                [("sha1", "subject", "author_name", "author_email",
+                  "author_date_timestamp", "body")] * 2)
+        finally:
+            del fields_renderer.log_fields
+
+    def test_undeclared_fields(self):
+        self.assertEqual(
+            self.changelog(output_engine=fields_renderer),
+            [tuple(gitchangelog.GIT_FORMAT_KEYS)] * 2)
+
+    def test_explicit_fields(self):
+        self.assertEqual(
+            self.changelog(output_engine=fields_renderer,
+                           log_fields=["sha1_short"]),
+            [("sha1", "sha1_short", "subject", "author_name",
+              "author_email", "body")] * 2)
+
+    def test_rest_py(self):
+        self.assertEqual(gitchangelog.rest_py.log_fields, ())
+
+    def test_template_fields(self):
+        self.assertEqual(
+            gitchangelog.template_log_fields(
+                '${commit["commit"].sha1_short} ${commit["authors"]}'),
+            ("sha1_short", "author_name", "author_email", "body"))
+        self.assertEqual(
+            gitchangelog.mustache("restructuredtext").log_fields,
+            ("subject", "author_name", "author_email", "body"))
+        ## ``version["date"]`` is taken for a commit ``date``: analysis
+        ## is conservative.
+        self.assertEqual(
+            gitchangelog.makotemplate("restructuredtext").log_fields,
+            ("subject", "author_name", "author_email",
+             "author_date_timestamp", "body"))
+
+    def test_same_output_with_templates(self):
+        for output_engine in ('mustache("restructuredtext")',
+                              'mustache("markdown")',
+                              'makotemplate("restructuredtext")'):
+            gitchangelog.file_put_contents(
+                ".gitchangelog.rc",
+                "output_engine = %s\nlog_fields = %r"
+                % (output_engine,
+                   [str(key) for key in gitchangelog.GIT_FORMAT_KEYS]))
+            reference, err, errlvl = cmd('$tprog')
+            self.assertEqual(errlvl, 0, msg=err)
+            gitchangelog.file_put_contents(
+                ".gitchangelog.rc",
+                "output_engine = %s" % output_engine)
+            out, err, errlvl = cmd('$tprog')
+            self.assertEqual(errlvl, 0, msg=err)
+            self.assertNoDiff(reference, out)
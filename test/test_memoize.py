@@ -0,0 +1,96 @@
+# -*- encoding: utf-8 -*-
+"""Testing ``Memoize`` text processing cache
+
+"""
+
+from __future__ import unicode_literals
+
+import unittest
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+class MemoizeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def upper(text):
+            self.calls.append(text)
+            return text.upper()
+        self.upper = gitchangelog.TextProc(upper)
+
+    def test_least_recently_used_evicted(self):
+        process = gitchangelog.Memoize(self.upper | gitchangelog.strip,
+                                       maxsize=2)
+        self.assertEqual(process.map([" a", "b", " a", "c", "b", " a"]),
+                         ["A", "B", "A", "C", "B", "A"])
+        self.assertEqual(self.calls, [" a", "b", "c", "b", " a"])
+        self.assertEqual(process.stats(),
+                         {"hits": 1, "misses": 5, "size": 2, "maxsize": 2})
+        process.clear()
+        self.assertEqual(process.stats(),
+                         {"hits": 0, "misses": 0, "size": 0, "maxsize": 2})
+
+    def test_unbounded_and_disabled(self):
+        process = gitchangelog.Memoize(self.upper, maxsize=None)
+        process.map(["a", "b", "c", "a", "b", "c"])
+        self.assertEqual(self.calls, ["a", "b", "c"])
+        process = gitchangelog.Memoize(self.upper, maxsize=0)
+        process.map(["a", "a"])
+        self.assertEqual(self.calls, ["a", "b", "c", "a", "a"])
+        self.assertEqual(process.stats()["size"], 0)
+
+    def test_impure_stages_always_applied(self):
+        seen = []
+
+        def record(text):
+            seen.append(text)
+            return text
+        process = gitchangelog.Memoize(
+            self.upper | gitchangelog.TextProc(record, pure=False) |
+            gitchangelog.final_dot)
+        self.assertEqual(process.map(["a", "a", "b"]), ["A.", "A.", "B."])
+        self.assertEqual(self.calls, ["a", "b"])
+        self.assertEqual(seen, ["A", "A", "B"])
+        self.assertFalse(process.pure)
+
+    def test_chained(self):
+        process = gitchangelog.strip | \
+            gitchangelog.Memoize(self.upper) | gitchangelog.final_dot
+        self.assertEqual(process.map([" a ", "a"]), ["A.", "A."])
+        self.assertEqual(self.calls, ["a"])
+        self.assertEqual(process.describe(),
+                         ["strip", "Memoize(upper, maxsize=1024)",
+                          "final_dot"])
+
+
+class MemoizeConfigTest(BaseGitReposTest):
+
+    def test_debug_stats(self):
+        for idx in range(3):
+            self.git.commit(message='new: same subject',
+                            allow_empty=True)
+        self.git.commit(message='fix: other subject',
+                        allow_empty=True)
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "subject_process = Memoize(ucfirst | final_dot)\n")
+        out, err, errlvl = cmd('$tprog --debug')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertContains(out, "- New: same subject.")
+        self.assertEqual(
+            err, "subject_process cache: 2 hits, 2 misses.\n")
+
+    def test_debug_stats_of_memoized_stage(self):
+        for idx in range(3):
+            self.git.commit(message='new: same subject',
+                            allow_empty=True)
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "subject_process = strip | Memoize(ucfirst) | final_dot\n")
+        out, err, errlvl = cmd('$tprog --debug')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertContains(out, "- New: same subject.")
+        self.assertEqual(
+            err, "subject_process cache: 2 hits, 1 misses.\n")
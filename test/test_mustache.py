@@ -0,0 +1,124 @@
+# -*- encoding: utf-8 -*-
+"""Testing the compilation of mustache templates to python
+
+"""
+
+from __future__ import unicode_literals
+
+import glob
+import os
+import unittest
+
+from .common import BaseGitReposTest, cmd, gitchangelog
+
+
+class Obj(object):
+
+    attr = "<attr>"
+
+    def method(self):
+        return "method & co"
+
+
+TEMPLATES = [
+    "", "text", "{{a}}", "{{{a}}}", "{{& a }}", "{{ a.b.c }}", "{{missing}}",
+    "{{#list}}{{.}},{{/list}}", "{{#list}}{{a}}{{/list}}",
+    "{{^list}}empty{{/list}}", "{{^missing}}empty{{/missing}}",
+    "  {{#a}}\n  inside\n  {{/a}}\n", "{{! comment }}\nb\n  {{! c }}  \nd",
+    "{{#obj}}{{attr}} {{method}} {{a}}{{/obj}}", "{{obj.method}}",
+    "{{#a.b}}{{c}}{{/a.b}}", "{{#num}}{{.}}{{/num}}", "{{none}}{{zero}}",
+    "{{#bytes}}{{.}}{{/bytes}}{{bytes}}", "{{lambda}}", "{{#lambda}}x{{/lambda}}",
+    "{{#list}}{{#lambda}}{{.}}{{/lambda}}{{/list}}",
+    "{{=<% %>=}}\n<% a %>\n<%#list%>{{.}}<%/list%>",
+    "{{#dict}}{{k}}{{/dict}}{{^dict}}no{{/dict}}\r\n{{#list}}\r\n{{/list}}\r\n",
+]
+
+
+def data():
+    return {
+        "a": {"b": {"c": "<&\"'>"}},
+        "list": ["x", None, {"a": "in list"}],
+        "obj": Obj(),
+        "num": 2.5,
+        "none": None,
+        "zero": 0,
+        "bytes": "é".encode("utf-8"),
+        "lambda": lambda *args: "{{num}}!" if not args else args[0] * 2,
+        "dict": {"k": "v"},
+    }
+
+
+@unittest.skipIf(gitchangelog.pystache is None, "pystache is not installed")
+class MustacheCompileTest(unittest.TestCase):
+
+    def test_same_as_pystache(self):
+        for template in TEMPLATES:
+            render = gitchangelog.mustache_compile(template, "t.tpl")
+            self.assertEqual(
+                "".join(render([data()])),
+                gitchangelog.pystache.render(template, data()),
+                msg="template=%r" % template)
+
+    def test_unsupported_templates(self):
+        for template in ["{{>partial}}", "{{#a}}", "{{#a}}{{/b}}"]:
+            self.assertIsNone(gitchangelog.mustache_python(template))
+
+    def test_chunks(self):
+        render = gitchangelog.mustache_compile(
+            "{{#v}}{{#c}}{{#l}}-{{/l}}{{/c}}{{/v}}", "t.tpl")
+        chunks = list(render([{"v": [{"c": [{"l": [1, 2]}, {"l": [3]}]},
+                                     {"c": []}]}]))
+        self.assertEqual(chunks, ["--", "-"])
+
+
+class MustacheCacheTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(MustacheCacheTest, self).setUp()
+
+        self.git.commit(
+            message='new: begin',
+            author='Bob <bob@example.com>',
+            date='2000-01-01 10:00:00',
+            allow_empty=True)
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "output_engine = mustache('mytemplate.tpl')")
+
+    def cached(self):
+        return glob.glob(os.path.join(".git", "gitchangelog", "mustache",
+                                      "*"))
+
+    def test_cache(self):
+        gitchangelog.file_put_contents("mytemplate.tpl", "check: {{title}}")
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(err, "")
+        self.assertNoDiff("check: Changelog", out)
+        cached = self.cached()
+        self.assertEqual(len(cached), 1)
+
+        out, err, errlvl = cmd('$tprog')
+        self.assertNoDiff("check: Changelog", out)
+        self.assertEqual(self.cached(), cached)
+
+        gitchangelog.file_put_contents("mytemplate.tpl", "CHECK: {{title}}")
+        out, err, errlvl = cmd('$tprog')
+        self.assertNoDiff("CHECK: Changelog", out)
+        self.assertEqual(len(self.cached()), 1)
+        self.assertNotEqual(self.cached(), cached)
+
+    def test_corrupted_cache(self):
+        gitchangelog.file_put_contents("mytemplate.tpl", "check: {{title}}")
+        cmd('$tprog')
+        gitchangelog.file_put_contents(self.cached()[0], "")
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(err, "")
+        self.assertNoDiff("check: Changelog", out)
+
+    def test_partials_are_rendered_by_pystache(self):
+        gitchangelog.file_put_contents(
+            "mytemplate.tpl", "check: {{title}}{{>nothing}}")
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(err, "")
+        self.assertNoDiff("check: Changelog", out)
+        self.assertEqual(self.cached(), [])
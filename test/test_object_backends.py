@@ -0,0 +1,123 @@
+# -*- encoding: utf-8 -*-
+"""Testing object backends
+
+All object backends must give the same results than ``git cat-file``
+whatever the storage of objects (loose, packed, deltified).
+
+"""
+
+from __future__ import unicode_literals
+
+import os
+import textwrap
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+class ObjectBackendTest(BaseGitReposTest):
+
+    OBJECT_BACKEND = "subprocess"
+
+    def setUp(self):
+        super(ObjectBackendTest, self).setUp()
+
+        content = ""
+        for idx in range(5):
+            content += "line %d of a file that will get deltified\n" % idx
+            gitchangelog.file_put_contents("file.txt", content * 20)
+            self.git.add("file.txt")
+            self.git.commit(
+                message=textwrap.dedent("""\
+                    new: commit %d
+
+                    Some body éà
+
+                    Change-Id: %d""" % (idx, idx)),
+                date='2000-01-0%d 10:00:00' % (idx + 1))
+            if idx % 2:
+                self.git.tag(["-a", "0.0.%d" % idx, "-m", "tag message"])
+            else:
+                self.git.tag("0.0.%d" % idx)
+        self.git.tag(["-a", "tag-on-tag", "-m", "msg", "0.0.1"])
+
+        self.repos.object_backend = self.OBJECT_BACKEND
+        self.objects = [line.split(" ")[0] for line in
+                        self.git.rev_list("--all", "--objects").split("\n")]
+        self.names = ["HEAD", "master", "refs/heads/master", "0.0.2",
+                      "tags/0.0.3", "tag-on-tag", "HEAD^{tree}",
+                      "0.0.1^{commit}", "tag-on-tag^{}", "tag-on-tag^{tag}",
+                      "HEAD~2", "unknown", "0" * 40] + self.objects
+
+    def assertSameAsCatFile(self):
+        reference = gitchangelog.GitCatFile(self.repos._orig_path)
+        try:
+            for name in self.names:
+                self.assertEqual(self.repos.read_object(name),
+                                 reference.read(name), name)
+        finally:
+            reference.close()
+
+    def test_loose_objects(self):
+        self.assertSameAsCatFile()
+
+    def test_packed_objects(self):
+        self.git.repack(["-a", "-d", "-f", "--window=10", "--depth=10"])
+        self.git.pack_refs(["--all"])
+        self.assertSameAsCatFile()
+
+    def test_packed_objects_ref_delta(self):
+        self.git.config("repack.useDeltaBaseOffset", "false")
+        self.git.repack(["-a", "-d", "-f", "--window=10", "--depth=10"])
+        self.assertSameAsCatFile()
+
+    def test_same_changelog(self):
+        repos = gitchangelog.GitRepos(".")
+        reference = "".join(gitchangelog.changelog(repository=repos))
+        repos.close()
+        self.assertNoDiff(reference, "".join(self.changelog()))
+        self.git.gc()
+        self.assertNoDiff(reference, "".join(self.changelog()))
+
+    def test_config_file(self):
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "object_backend = %r" % str(self.OBJECT_BACKEND))
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertContains(out, "0.0.4 (2000-01-05)")
+
+    def test_make_repository(self):
+        os.mkdir("sub")
+        os.chdir("sub")
+        repos = gitchangelog.make_repository()
+        try:
+            os.chdir(repos.toplevel)
+            self.assertIs(gitchangelog.make_repository(gitchangelog.Config(
+                object_backend=self.OBJECT_BACKEND)), repos)
+            self.assertEqual(repos.object_backend, self.OBJECT_BACKEND)
+        finally:
+            repos.close()
+
+
+class NativeObjectBackendTest(ObjectBackendTest):
+
+    OBJECT_BACKEND = "native"
+
+    def assertSameAsCatFile(self):
+        super(NativeObjectBackendTest, self).assertSameAsCatFile()
+        ## no object needed ``git cat-file``
+        for sha1 in self.objects:
+            self.assertNotEqual(self.repos._object_store.read(sha1), None)
+
+
+class InvalidObjectBackendTest(BaseGitReposTest):
+
+    def test_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            self.repos.object_backend = "foo"
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "object_backend = 'foo'")
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(errlvl, 1)
+        self.assertContains(err, "Invalid object backend 'foo'")
@@ -0,0 +1,42 @@
+# -*- encoding: utf-8 -*-
+"""Testing ``Phile`` record scanner
+
+"""
+
+from __future__ import unicode_literals
+
+import io
+import unittest
+
+from .common import gitchangelog
+
+
+def records(content, delimiter, **kwargs):
+    return list(gitchangelog.Phile(io.BytesIO(content.encode("utf-8")),
+                                   encoding="utf-8", **kwargs)
+                .read(delimiter))
+
+
+class PhileTest(unittest.TestCase):
+
+    def test_same_as_split(self):
+        content = "é\x00à-\n\x00\x00ü--" * 5 + "-"
+        for buffersize in (1, 2, 3, 7, 4096):
+            for delimiter in ("\x00", "\n", "--"):
+                self.assertEqual(
+                    records(content, delimiter, buffersize=buffersize),
+                    content.split(delimiter),
+                    msg="buffersize=%d delimiter=%r" % (buffersize, delimiter))
+
+    def test_empty(self):
+        self.assertEqual(records("", "\x00"), [""])
+
+    def test_huge_record(self):
+        body = "é" * (3 * 1024 * 1024)
+        self.assertEqual(records("a\x00%s\x00b" % body, "\x00"),
+                         ["a", body, "b"])
+
+    def test_invalid_encoding(self):
+        with self.assertRaises(UnicodeDecodeError):
+            list(gitchangelog.Phile(io.BytesIO(b"a\x00\xe9"),
+                                    encoding="utf-8").read("\x00"))
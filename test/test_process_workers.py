@@ -0,0 +1,93 @@
+# -*- encoding: utf-8 -*-
+"""Testing text processing in worker processes
+
+"""
+
+from __future__ import unicode_literals
+
+import textwrap
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+class ProcessWorkersTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(ProcessWorkersTest, self).setUp()
+
+        for idx in range(1, 4):
+            for nb in range(20):
+                self.git.commit(
+                    message=textwrap.dedent("""\
+                        new: commit %d.%d
+
+                        %s
+
+                        Second paragraph.
+                        """ % (idx, nb, "long text %d " % nb * 20)),
+                    date='2000-01-0%d 10:00:00' % idx,
+                    allow_empty=True)
+            self.git.tag("0.0.%d" % idx)
+        self.git.commit(message='fix: unreleased', allow_empty=True)
+
+        self.body_process = gitchangelog.Wrap() | \
+            gitchangelog.TextProc(lambda text: text.upper()) | \
+            gitchangelog.Indent(chars="> ")
+        self.subject_process = gitchangelog.TextProc(
+            lambda text: text[::-1])
+
+    def process_changelog(self, **kwargs):
+        return "".join(self.changelog(
+            body_process=self.body_process,
+            subject_process=self.subject_process, **kwargs))
+
+    def test_same_output(self):
+        serial = self.process_changelog()
+        self.assertContains(serial, "> LONG TEXT 3 LONG TEXT 3")
+        self.assertContains(serial, "0.1 timmoc :wen")
+        for workers in (2, 3):
+            self.assertNoDiff(
+                serial, self.process_changelog(process_workers=workers))
+
+    def test_unpicklable_processors_without_fork(self):
+        warnings = []
+        start_methods = gitchangelog.multiprocessing.get_all_start_methods
+        gitchangelog.multiprocessing.get_all_start_methods = \
+            lambda: ["spawn"]
+        try:
+            with self.assertRaises(ValueError):
+                gitchangelog.TextProcessPool(
+                    self.subject_process, self.body_process, 2)
+            content = self.process_changelog(process_workers=2,
+                                             warn=warnings.append)
+        finally:
+            gitchangelog.multiprocessing.get_all_start_methods = \
+                start_methods
+        self.assertEqual(len(warnings), 1)
+        self.assertContains(warnings[0], "main process")
+        self.assertNoDiff(self.process_changelog(), content)
+
+    def test_fork_pools_side_by_side(self):
+        pools = [gitchangelog.ForkPool(function, 2)
+                 for function in (len, lambda text: text[::-1])]
+        try:
+            self.assertEqual([pool.map(["ab", "cde"]) for pool in pools],
+                             [[2, 3], ["ba", "edc"]])
+        finally:
+            for pool in pools:
+                pool.close()
+        self.assertEqual(gitchangelog._pool_functions, {})
+
+    def test_process_workers_in_config(self):
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "body_process = Wrap() | TextProc(lambda text: text.upper())\n")
+        serial, err, errlvl = cmd('$tprog')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertContains(serial, "LONG TEXT 2")
+        with open(".gitchangelog.rc", "a") as f:
+            f.write("process_workers = 2\n")
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertEqual(err, "")
+        self.assertNoDiff(serial, out)
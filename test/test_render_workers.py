@@ -0,0 +1,158 @@
+# -*- encoding: utf-8 -*-
+"""Testing the rendering of versions in worker processes
+
+"""
+
+from __future__ import unicode_literals
+
+import os
+import pickle
+import textwrap
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+class RenderWorkersTest(BaseGitReposTest):
+
+    OPTIONS = {
+        "section_regexps": [("New", [r"^new"]), ("Other", None)],
+    }
+
+    def setUp(self):
+        super(RenderWorkersTest, self).setUp()
+
+        for idx in range(1, 8):
+            for nb in range(3):
+                self.git.commit(
+                    message='new: commit %d.%d\n\nBody of %d.%d.'
+                            % (idx, nb, idx, nb),
+                    date='2000-01-0%d 10:00:00' % idx,
+                    allow_empty=True)
+            self.git.tag("0.0.%d" % idx)
+        self.git.commit(message='fix: unreleased', allow_empty=True)
+
+    def render(self, output_engine, **kwargs):
+        kwargs.update(self.OPTIONS)
+        return "".join(self.changelog(output_engine=output_engine,
+                                      **kwargs))
+
+    def mako_template(self, content):
+        gitchangelog.file_put_contents("mytemplate.tpl", content)
+        return gitchangelog.makotemplate("mytemplate.tpl", cache=False)
+
+    def test_same_output(self):
+        for output_engine in (gitchangelog.rest_py,
+                              gitchangelog.makotemplate("restructuredtext")):
+            serial = self.render(output_engine)
+            self.assertContains(serial, "0.0.7 (2000-01-07)")
+            self.assertContains(serial, "new: commit 1.2 [The Committer]")
+            for workers in (2, 3):
+                self.assertNoDiff(
+                    serial, self.render(output_engine,
+                                        render_workers=workers))
+
+    def test_mako_body_around_versions(self):
+        output_engine = self.mako_template(textwrap.dedent("""\
+            <%def name="render_version(version)">\\
+            ${version["tag"]}: ${", ".join(
+                commit["commit"].sha1_short + " " + commit["subject"]
+                for section in version["sections"]
+                for commit in section["commits"])}
+            </%def>\\
+            % for version in data["versions"]:
+            [${loop.index}] ${render_version(version)}\\
+            % endfor
+            end
+            """))
+        serial = self.render(output_engine)
+        self.assertContains(serial, "[1] 0.0.7: ")
+        self.assertContains(
+            serial,
+            "%s new: commit 1.2" % self.repos.commit("0.0.1").sha1_short)
+        self.assertNoDiff(
+            serial, self.render(output_engine, render_workers=2))
+
+    def test_mako_template_without_version_def(self):
+        output_engine = self.mako_template(
+            '% for version in data["versions"]:\n'
+            '${version["tag"]}\n'
+            '% endfor\n')
+        self.assertNoDiff(
+            self.render(output_engine),
+            self.render(output_engine, render_workers=2))
+
+    def test_worker_exceptions_are_raised(self):
+        output_engine = self.mako_template(textwrap.dedent("""\
+            <%def name="render_version(version)">\\
+            ${version["tag"].upper()}
+            </%def>\\
+            % for version in data["versions"]:
+            ${render_version(version)}\\
+            % endfor
+            """))
+        ## the unreleased version has no tag
+        with self.assertRaises(AttributeError):
+            self.render(output_engine, render_workers=2)
+
+    def test_without_fork(self):
+        warnings = []
+        start_methods = gitchangelog.multiprocessing.get_all_start_methods
+        warn = gitchangelog.warn
+        gitchangelog.multiprocessing.get_all_start_methods = \
+            lambda: ["spawn"]
+        gitchangelog.warn = warnings.append
+        try:
+            content = self.render(gitchangelog.rest_py, render_workers=2)
+        finally:
+            gitchangelog.multiprocessing.get_all_start_methods = \
+                start_methods
+            gitchangelog.warn = warn
+        self.assertEqual(len(warnings), 1)
+        self.assertContains(warnings[0], "serially")
+        self.assertNoDiff(self.render(gitchangelog.rest_py), content)
+
+    def test_fragment_cache(self):
+        cache_dir = os.path.join(self.tmpdir, "cache")
+        os.mkdir(cache_dir)
+        serial = self.render(gitchangelog.rest_py)
+        for run in range(2):
+            cache = gitchangelog.FragmentCache(cache_dir, "fingerprint")
+            self.assertNoDiff(
+                serial, self.render(gitchangelog.rest_py, render_workers=2,
+                                    fragment_cache=cache))
+        self.assertEqual((cache.hits, cache.misses), (22, 0))
+        ## fragments rendered by workers were stored in the cache
+        sha1 = self.repos.commit("0.0.1").sha1
+        key, text = cache.entries[sha1]["fragment"]
+        self.assertEqual(text, "- new: commit 1.2 [The Committer]\n\n"
+                               "  Body of 1.2.\n\n")
+        cache.entries[sha1]["fragment"] = (key, "- CACHED\n")
+        self.assertContains(
+            self.render(gitchangelog.rest_py, render_workers=2,
+                        fragment_cache=cache),
+            "- CACHED\n")
+
+    def test_commits_are_pickled_without_repository(self):
+        record = next(self.repos.log(fields=("subject", "body")))
+        commit = self.repos.commit("0.0.1")
+        commit.subject  ## read
+        record, commit = pickle.loads(pickle.dumps((record, commit)))
+        self.assertEqual(record.subject, "fix: unreleased")
+        self.assertEqual(commit.subject, "new: commit 1.2")
+        for obj in (record, commit):
+            with self.assertRaises(AttributeError):
+                obj.sha1_short
+
+    def test_render_workers_in_config(self):
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "output_engine = makotemplate('restructuredtext')\n")
+        serial, err, errlvl = cmd('$tprog')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertContains(serial, "Commit 7.2")
+        with open(".gitchangelog.rc", "a") as f:
+            f.write("render_workers = 2\n")
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertEqual(err, "")
+        self.assertNoDiff(serial, out)
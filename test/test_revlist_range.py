@@ -0,0 +1,169 @@
+# -*- encoding: utf-8 -*-
+"""Testing revlist resolution
+
+Only the newest and oldest commits of a revlist and its excluded
+revisions are used, they are found with one ``git rev-parse`` and one
+streamed ``git rev-list``.
+
+"""
+
+from __future__ import unicode_literals
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+class RevlistRangeTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(RevlistRangeTest, self).setUp()
+
+        ## Target tree:
+        ##
+        ## *   Merge branch 'develop'  (HEAD, master)
+        ## |\
+        ## | * new: develop commit  (develop)
+        ## * | new: master commit  (tag: 0.0.2)
+        ## |/
+        ## * new: second commit
+        ## * first commit  (tag: 0.0.1)
+
+        self.git.commit(message='first commit',
+                        date='2000-01-01 10:00:00',
+                        allow_empty=True)
+        self.git.tag("0.0.1")
+        self.git.commit(message='new: second commit',
+                        date='2000-01-02 10:00:00',
+                        allow_empty=True)
+        self.git.checkout(b="develop")
+        self.git.commit(message='new: develop commit',
+                        date='2000-01-03 10:00:00',
+                        allow_empty=True)
+        self.git.checkout("master")
+        self.git.commit(message='new: master commit',
+                        date='2000-01-04 10:00:00',
+                        allow_empty=True)
+        self.git.tag("0.0.2")
+        self.git.merge(["develop", "--no-ff", "-m", "Merge branch 'develop'"])
+
+    def assertRange(self, revlist, excludes):
+        revs = self.git.rev_list(revlist).split("\n")
+        first, last, found = self.repos.revlist_range(revlist)
+        self.assertEqual((first, last), (revs[0], revs[-1]))
+        self.assertEqual(found,
+                         self.git.rev_parse(excludes).split("\n")
+                         if excludes else [])
+
+    def test_whole_history(self):
+        self.assertRange(["HEAD"], [])
+
+    def test_range(self):
+        self.assertRange(["0.0.1..HEAD"], ["0.0.1"])
+        self.assertRange(["^0.0.2", "develop"], ["0.0.2"])
+        self.assertRange(["0.0.2..HEAD"], ["0.0.2"])
+        self.assertRange(["HEAD", "--not", "0.0.2", "develop~"],
+                         ["0.0.2", "develop~"])
+
+    def test_options(self):
+        ## options of ``git rev-list`` are given to it
+        self.assertRange(["--max-count=2", "HEAD"], [])
+        self.assertRange(["--no-merges", "0.0.2..HEAD"], ["0.0.2"])
+
+    def test_empty_range(self):
+        self.assertEqual(self.repos.revlist_range(["HEAD..0.0.2"]),
+                         (None, None, [self.git.rev_parse("HEAD")]))
+
+    def test_invalid_revision(self):
+        with self.assertRaises(gitchangelog.ShellError):
+            self.repos.revlist_range(["foo"])
+
+    def test_changelog(self):
+        self.assertNoDiff(
+            self.simple_changelog(revlist=["^0.0.2", "HEAD"]),
+            "None\n  None:\n"
+            "    * Merge branch 'develop' [The Committer]\n"
+            "    * new: develop commit [The Committer]\n"
+            "\n")
+        self.assertNoDiff(
+            self.simple_changelog(revlist=["0.0.1..develop"]),
+            "None\n  None:\n"
+            "    * new: develop commit [The Committer]\n"
+            "\n"
+            "0.0.2\n  None:\n"
+            "    * new: master commit [The Committer]\n"
+            "    * new: second commit [The Committer]\n"
+            "\n")
+
+    def test_one_rev_parse(self):
+        calls = []
+        orig_swrap = gitchangelog.swrap
+
+        def swrap(command, **kwargs):
+            calls.append(command[:3])
+            return orig_swrap(command, **kwargs)
+
+        gitchangelog.swrap = swrap
+        try:
+            self.simple_changelog(revlist=["0.0.1..HEAD"])
+        finally:
+            gitchangelog.swrap = orig_swrap
+        ## revisions are resolved only once
+        self.assertEqual(calls.count(["git", "rev-parse", "--revs-only"]), 1)
+
+    def test_invalid_revision_in_command_line(self):
+        out, err, errlvl = cmd('$tprog 0.0.1..HEAD foo')
+        self.assertEqual(errlvl, 1)
+        self.assertContains(err, "Revision 'foo' is not valid.")
+
+
+class RevlistExcludesTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(RevlistExcludesTest, self).setUp()
+
+        ## Target tree:
+        ##
+        ## * new: side after merge  (side)
+        ## | *   Merge branch 'side'  (HEAD, tag: 1.0, master)
+        ## | |\
+        ## | |/
+        ## |/|
+        ## * | new: side commit
+        ## | * new: excluded commit
+        ## |/
+        ## * first commit
+
+        self.git.commit(message='first commit',
+                        date='2000-01-01 10:00:00',
+                        allow_empty=True)
+        self.git.checkout(b="side")
+        self.git.commit(message='new: side commit',
+                        date='2000-01-02 10:00:00',
+                        allow_empty=True)
+        self.git.checkout("master")
+        self.git.commit(message='new: excluded commit',
+                        date='2000-01-03 10:00:00',
+                        allow_empty=True)
+        self.git.merge(["side", "--no-ff", "-m", "Merge branch 'side'"])
+        self.git.tag("1.0")
+        self.git.checkout("side")
+        self.git.commit(message='new: side after merge',
+                        date='2000-01-04 10:00:00',
+                        allow_empty=True)
+        self.git.checkout("master")
+
+    def test_excludes(self):
+        self.assertEqual(self.repos.revlist_range(["master~..side"])[2],
+                         [self.git.rev_parse("master~")])
+        self.assertEqual(self.repos.revlist_range(["side"])[2], [])
+
+    def test_merge_reaching_excluded_commit(self):
+        ## the boundary of ``master~..side`` is only ``first commit``,
+        ## which wouldn't keep the merge from reaching ``master~``
+        for single_pass in (False, True):
+            self.assertNoDiff(
+                self.simple_changelog(revlist=["master~..side"],
+                                      single_pass=single_pass),
+                "1.0\n  None:\n"
+                "    * Merge branch 'side' [The Committer]\n"
+                "    * new: side commit [The Committer]\n"
+                "\n")
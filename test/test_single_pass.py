@@ -0,0 +1,151 @@
+# -*- encoding: utf-8 -*-
+"""Testing single pass history walk
+
+Commits attributed to each version, and their order, must be the same
+than with one ``git log`` per version.
+
+"""
+
+from __future__ import unicode_literals
+
+import os
+import random
+
+from .common import BaseGitReposTest, gitchangelog
+
+
+def partition_renderer(data, opts):
+    return [(version["tag"],
+             [commit["commit"].sha1
+              for section in version["sections"]
+              for commit in section["commits"]])
+            for version in data["versions"]]
+
+
+class BaseSinglePassTest(BaseGitReposTest):
+
+    def assertSamePartition(self, **kwargs):
+        reference = self.changelog(output_engine=partition_renderer,
+                                   **kwargs)
+        out = self.changelog(output_engine=partition_renderer,
+                             single_pass=True, **kwargs)
+        self.assertEqual(reference, out)
+        return out
+
+
+class SinglePassTest(BaseSinglePassTest):
+
+    def setUp(self):
+        super(SinglePassTest, self).setUp()
+
+        ## Target tree:
+        ##
+        ## *   Merge branch 'master' into develop  (HEAD, develop)
+        ## |\
+        ## | * fix: hotfix on master  (tag: 0.0.4, master)
+        ## | * new: some new commit  (tag: 0.0.3)
+        ## * | new: second commit on develop branch  (tag: 0.0.5)
+        ## * | new: first commit on develop branch  (tag: 0.0.2)
+        ## |/
+        ## * new: second commit
+        ## * first commit  (tag: 0.0.1)
+
+        self.git.commit(message='first commit',
+                        date='2000-01-01 10:00:00',
+                        allow_empty=True)
+        self.git.tag("0.0.1")
+        self.git.commit(message='new: second commit',
+                        date='2000-01-02 10:00:00',
+                        allow_empty=True)
+        self.git.checkout(b="develop")
+        self.git.commit(message='new: first commit on develop branch',
+                        date='2000-01-03 10:00:00',
+                        allow_empty=True)
+        self.git.tag("0.0.2")
+        self.git.checkout("master")
+        self.git.commit(message='new: some new commit',
+                        date='2000-01-04 10:00:00',
+                        allow_empty=True)
+        self.git.tag("0.0.3")
+        self.git.commit(message='fix: hotfix on master',
+                        date='2000-01-05 10:00:00',
+                        allow_empty=True)
+        self.git.tag("0.0.4")
+        self.git.checkout("develop")
+        self.git.commit(message='new: second commit on develop branch',
+                        date='2000-01-06 10:00:00',
+                        allow_empty=True)
+        self.git.tag("0.0.5")
+        self.git.merge("master", no_ff=True)
+
+    def test_full_history(self):
+        out = self.assertSamePartition()
+        self.assertEqual(
+            [tag for tag, _commits in out],
+            [None, "0.0.5", "0.0.4", "0.0.3", "0.0.2", "0.0.1"])
+
+    def test_without_merges(self):
+        self.assertSamePartition(include_merge=False)
+
+    def test_revlist(self):
+        self.assertSamePartition(revlist=["0.0.2..HEAD"])
+
+    def test_revlist_on_branch(self):
+        self.assertSamePartition(revlist=["0.0.1..master"])
+
+    def test_ignore_regexps(self):
+        self.assertSamePartition(ignore_regexps=[r'^new'])
+
+    def test_versions_are_yielded_as_they_complete(self):
+        walked = []
+        log = self.repos.log
+
+        def walking_log(*args, **kwargs):
+            for commit in log(*args, **kwargs):
+                walked.append(commit.sha1)
+                yield commit
+
+        self.repos.log = walking_log
+        out = self.changelog(output_engine=partition_renderer,
+                             single_pass=True, max_versions=1)
+        self.assertEqual(out, [(None, [self.repos.commit("HEAD").sha1])])
+        ## the walk stopped before reaching older versions
+        self.assertNotIn(self.repos.commit("0.0.1").sha1, walked)
+        self.assertLess(len(walked), 7)
+
+
+class MergeHeavySinglePassTest(BaseSinglePassTest):
+
+    def random_history(self, seed, nb_commits=40):
+        rand = random.Random(seed)
+        branches = ["master"]
+        self.git.commit(message='first commit',
+                        date='2000-01-01 10:00:00',
+                        allow_empty=True)
+        for num in range(nb_commits):
+            date = '2000-01-01 %02d:%02d:00' % (11 + num // 60, num % 60)
+            action = rand.random()
+            if action < 0.15 and len(branches) < 5:
+                branches.append("branch%d" % num)
+                self.git.checkout(b=branches[-1])
+            elif action < 0.5 and len(branches) > 1:
+                self.git.merge([rand.choice(branches), "--no-ff",
+                                "-m", "Merge %d" % num])
+            self.git.commit(message='new: commit %d' % num,
+                            date=date, allow_empty=True)
+            if rand.random() < 0.25:
+                self.git.tag("0.0.%d" % num)
+            self.git.checkout(rand.choice(branches))
+
+    def test_random_histories(self):
+        for seed in range(5):
+            self.repos.close()
+            os.chdir(self.tmpdir)
+            self.repos = gitchangelog.GitRepos.create(
+                "repos%d" % seed,
+                email="committer@example.com",
+                user="The Committer")
+            os.chdir("repos%d" % seed)
+            self.random_history(seed)
+            self.assertSamePartition()
+            self.assertSamePartition(include_merge=False)
@@ -0,0 +1,127 @@
+# -*- encoding: utf-8 -*-
+"""Testing streamed output
+
+Output engines must yield each version as soon as it is known, and give
+the same output as when rendering the whole changelog at once.
+
+"""
+
+from __future__ import unicode_literals
+
+import threading
+
+from .common import BaseGitReposTest, gitchangelog, cmd
+
+
+class StreamingTest(BaseGitReposTest):
+
+    SECTIONS = [("New", [r"^new"]), ("Other", None)]
+
+    def setUp(self):
+        super(StreamingTest, self).setUp()
+
+        for idx in range(1, 5):
+            self.git.commit(message='new: commit %d' % idx,
+                            date='2000-01-0%d 10:00:00' % idx,
+                            allow_empty=True)
+            self.git.tag("0.0.%d" % idx)
+        self.git.commit(message='fix: unreleased commit',
+                        date='2000-01-05 10:00:00',
+                        allow_empty=True)
+
+        self.log_calls = []
+        orig_log = self.repos.log
+
+        def log(*args, **kwargs):
+            self.log_calls.append(kwargs.get("includes", args[:1]))
+            return orig_log(*args, **kwargs)
+        self.repos.log = log
+
+    def assertStreamed(self, output_engine):
+        del self.log_calls[:]
+        chunks = self.iter_changelog(output_engine=output_engine,
+                                     section_regexps=self.SECTIONS)
+        content = next(chunks)
+        while "0.0.4" not in content:
+            content += next(chunks)
+        ## newest version is out, older ones are not walked yet
+        self.assertTrue(len(self.log_calls) < 4,
+                        msg="%d git log calls" % len(self.log_calls))
+        return content + "".join(chunks)
+
+    def test_rest_py(self):
+        content = self.assertStreamed(gitchangelog.rest_py)
+        self.assertContains(content, "0.0.1 (2000-01-01)")
+
+    def test_mustache(self):
+        for name in ("restructuredtext", "markdown"):
+            content = self.assertStreamed(gitchangelog.mustache(name))
+
+            ## same output than rendering the template at once by pystache
+            orig_split = gitchangelog.mustache_split
+            orig_compile = gitchangelog.mustache_compile
+            gitchangelog.mustache_split = lambda *args: None
+            gitchangelog.mustache_compile = lambda *args: None
+            try:
+                output_engine = gitchangelog.mustache(name)
+            finally:
+                gitchangelog.mustache_split = orig_split
+                gitchangelog.mustache_compile = orig_compile
+            self.assertNoDiff(
+                "".join(self.changelog(output_engine=output_engine,
+                                       section_regexps=self.SECTIONS)),
+                content)
+
+    def test_mako(self):
+        gitchangelog.file_put_contents(
+            "big.tpl",
+            '% for version in data["versions"]:\n'
+            '${version["tag"]}${"." * 10000}\n'
+            '% endfor\n')
+        content = self.assertStreamed(gitchangelog.makotemplate("big.tpl"))
+        self.assertEqual(content.count("." * 10000), 5)
+
+    def test_mako_exception(self):
+        gitchangelog.file_put_contents("fail.tpl", '${1 / 0}')
+        with self.assertRaises(ZeroDivisionError):
+            "".join(self.changelog(
+                output_engine=gitchangelog.makotemplate("fail.tpl")))
+
+    def test_changelog_returns_string(self):
+        content = self.changelog(section_regexps=self.SECTIONS)
+        self.assertIsInstance(content, type(""))
+        self.assertNoDiff(
+            "".join(self.iter_changelog(section_regexps=self.SECTIONS)),
+            content)
+        for name in ("restructuredtext", "markdown"):
+            self.assertIsInstance(
+                self.changelog(output_engine=gitchangelog.mustache(name),
+                               section_regexps=self.SECTIONS),
+                type(""))
+
+    def test_publish_receives_chunks(self):
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "def publish(content):\n"
+            "    print(len(list(content)))\n")
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(errlvl, 0, msg=err)
+        self.assertEqual(out.strip(), "6")  ## title and 5 versions
+
+
+class IterWritesTest(BaseGitReposTest):
+
+    def test_early_close(self):
+        writes = []
+
+        def producer(buf):
+            for idx in range(1000):
+                buf.write("x" * 10)
+                writes.append(idx)
+
+        chunks = gitchangelog.iter_writes(producer, chunk_size=10,
+                                          max_chunks=1)
+        next(chunks)
+        chunks.close()
+        self.assertTrue(len(writes) < 10)
+        self.assertEqual(threading.active_count(), 1)
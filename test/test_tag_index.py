@@ -0,0 +1,84 @@
+# -*- encoding: utf-8 -*-
+"""Testing tag metadata loading
+
+Tag discovery should cost a constant number of git calls whatever the
+number of tags.
+
+"""
+
+from __future__ import unicode_literals
+
+from .common import BaseGitReposTest, gitchangelog
+
+
+class TagIndexTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(TagIndexTest, self).setUp()
+
+        self.git.commit(message="a",
+                        date="2017-02-20 11:00:00",
+                        allow_empty=True)
+        self.git.tag("0.1")
+        self.git.tag("not-a-version")
+        self.git.commit(message="b",
+                        date="2017-02-21 11:00:00",
+                        allow_empty=True)
+        self.git.tag(['-a', "0.2", '--message="tag message"'],
+                     env={'GIT_COMMITTER_DATE': "2017-03-17 11:00:00"})
+        self.git.tag(['-a', "0.2.1", '--message="tag on tag"', "0.2"])
+        self.git.tag(["0.3", "HEAD^{tree}"])  ## not a commit
+        self.git.commit(message="c",
+                        date="2017-02-22 11:00:00",
+                        allow_empty=True)
+        for idx in range(10):
+            self.git.tag("1.%d" % idx)
+
+        self.calls = []
+        self.orig_swrap = gitchangelog.swrap
+
+        def swrap(command, **kwargs):
+            self.calls.append(command)
+            return self.orig_swrap(command, **kwargs)
+
+        gitchangelog.swrap = swrap
+
+    def tearDown(self):
+        gitchangelog.swrap = self.orig_swrap
+        super(TagIndexTest, self).tearDown()
+
+    def test_tag_metadata(self):
+        tags = self.repos.tags(filter_regexp=r"^[0-9]+\.[0-9]+$")
+        self.assertEqual(
+            [tag.identifier for tag in tags],
+            ["0.1", "0.2"] + ["1.%d" % idx for idx in range(10)])
+        for tag in tags:
+            tag.has_annotated_tag
+            tag.committer_date_timestamp
+            tag.date
+        self.assertEqual(tags[1].tagger_date, "2017-03-17")
+        self.assertEqual(len(self.calls), 1)
+
+        ## same values than lazily computed ones
+        for tag in tags:
+            ref = gitchangelog.GitCommit(self.repos, tag.identifier)
+            self.assertEqual(tag.sha1, ref.sha1)
+            self.assertEqual(tag.has_annotated_tag, ref.has_annotated_tag)
+            self.assertEqual(tag.committer_date_timestamp,
+                             ref.committer_date_timestamp)
+            self.assertEqual(tag.author_date_timestamp,
+                             ref.author_date_timestamp)
+
+    def test_non_commit_tags_are_ignored(self):
+        self.assertNotContains(self.repos.tag_index(), "0.3")
+
+    def test_tag_on_tag(self):
+        tag, = self.repos.tags(filter_regexp=r"^0\.2\.1$")
+        self.assertTrue(tag.has_annotated_tag)
+        self.assertEqual(tag.sha1, self.repos.commit("0.2").sha1)
+
+    def test_contains(self):
+        tags = self.repos.tags(contains="0.2", filter_regexp=r"^[0-9.]+$")
+        self.assertEqual(
+            [tag.identifier for tag in tags],
+            ["0.2", "0.2.1"] + ["1.%d" % idx for idx in range(10)])
@@ -135,3 +135,44 @@ class TemplatingTest(BaseGitReposTest):
         self.assertNoDiff(
             reference, out)
 
+    def test_mako_compiled_template_cache(self):
+        """Compiled mako templates are cached and follow template changes"""
+
+        gitchangelog.file_put_contents(
+            "mytemplate.tpl", "check: ${data['title']}")
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "output_engine = makotemplate('mytemplate.tpl')")
+        cache_dir = os.path.join(".git", "gitchangelog", "mako")
+
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(err, "")
+        self.assertNoDiff("check: Changelog", out)
+        modules = os.listdir(cache_dir)
+        self.assertEqual(len(modules), 1)
+
+        out, err, errlvl = cmd('$tprog')
+        self.assertNoDiff("check: Changelog", out)
+        self.assertEqual(os.listdir(cache_dir), modules)
+
+        ## same size and mtime, but a new content
+        gitchangelog.file_put_contents(
+            "mytemplate.tpl", "CHECK: ${data['title']}")
+        os.utime("mytemplate.tpl", (0, 0))
+        out, err, errlvl = cmd('$tprog')
+        self.assertNoDiff("CHECK: Changelog", out)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertNotEqual(os.listdir(cache_dir), modules)
+
+    def test_mako_without_cache(self):
+
+        gitchangelog.file_put_contents(
+            "mytemplate.tpl", "check: ${data['title']}")
+        gitchangelog.file_put_contents(
+            ".gitchangelog.rc",
+            "output_engine = makotemplate('mytemplate.tpl', cache=False)")
+
+        out, err, errlvl = cmd('$tprog')
+        self.assertEqual(err, "")
+        self.assertNoDiff("check: Changelog", out)
+        self.assertFalse(os.path.exists(os.path.join(".git", "gitchangelog")))
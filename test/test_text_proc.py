@@ -0,0 +1,99 @@
+# -*- encoding: utf-8 -*-
+"""Testing ``TextProc`` pipelines
+
+"""
+
+from __future__ import unicode_literals
+
+import re
+import textwrap
+import unittest
+
+from .common import gitchangelog
+
+
+TEXTS = [
+    "", "  ", "new: dev: foo", "fix: bar !minor  ", "chg: usr: baz.",
+    "first line\n\nsecond paragraph which is quite long " * 5,
+    "Some body\n\nChange-Id: 1234\nCo-Authored-By: Bob\n  continued",
+    "é à: pkg: ",
+]
+
+
+class TextProcTest(unittest.TestCase):
+
+    def test_reference_config_pipelines(self):
+        """Same results as nested calls of plain functions"""
+        body_process = gitchangelog.ReSub(
+            r'((^|\n)[A-Z]\w+(-\w+)*: .*(\n\s+.*)*)+$', r'') | \
+            gitchangelog.strip
+        subject_process = (
+            gitchangelog.strip |
+            gitchangelog.ReSub(
+                r'^([cC]hg|[fF]ix|[nN]ew)\s*:\s*((dev|use?r|pkg|test|doc)'
+                r'\s*:\s*)?([^\n@]*)(@[a-z]+\s+)*$', r'\4') |
+            gitchangelog.SetIfEmpty("No commit message.") |
+            gitchangelog.ucfirst | gitchangelog.final_dot)
+
+        def reference_body(text):
+            return re.sub(r'((^|\n)[A-Z]\w+(-\w+)*: .*(\n\s+.*)*)+$',
+                          r'', text).strip()
+
+        def reference_subject(text):
+            text = re.sub(
+                r'^([cC]hg|[fF]ix|[nN]ew)\s*:\s*((dev|use?r|pkg|test|doc)'
+                r'\s*:\s*)?([^\n@]*)(@[a-z]+\s+)*$', r'\4', text.strip())
+            text = gitchangelog.set_if_empty(text)
+            return gitchangelog.final_dot(gitchangelog.ucfirst(text))
+
+        self.assertEqual([body_process(text) for text in TEXTS],
+                         [reference_body(text) for text in TEXTS])
+        self.assertEqual(body_process.map(TEXTS),
+                         [reference_body(text) for text in TEXTS])
+        self.assertEqual(subject_process.map(TEXTS),
+                         [reference_subject(text) for text in TEXTS])
+
+    def test_describe(self):
+        pipeline = gitchangelog.noop | gitchangelog.strip | \
+            gitchangelog.strip | gitchangelog.Wrap(r'\n(?=\w+\s*:)') | \
+            gitchangelog.noop | gitchangelog.Indent(chars="> ") | \
+            gitchangelog.TextProc(lambda text: text) | gitchangelog.strip
+        self.assertEqual(pipeline.describe(), [
+            "strip", "Wrap(%r)" % r'\n(?=\w+\s*:)', "Indent(chars='> ')",
+            "<lambda>", "strip"])
+        self.assertEqual(gitchangelog.ucfirst.describe(), ["ucfirst"])
+        self.assertEqual((gitchangelog.noop | gitchangelog.noop)("a"), "a")
+
+    def test_chains_are_flat(self):
+        left = gitchangelog.strip | gitchangelog.ucfirst
+        right = gitchangelog.final_dot | gitchangelog.Indent()
+        pipeline = left | right
+        self.assertIsInstance(pipeline, gitchangelog.TextPipeline)
+        self.assertEqual(
+            pipeline.stages, left.stages + right.stages)
+        self.assertEqual(pipeline(" foo\nbar "), "  Foo\n  bar.")
+        ## ``fun`` is still the callable of the whole chain
+        self.assertEqual(pipeline.fun(" foo "), "  Foo.")
+
+    def test_resub_arguments(self):
+        self.assertEqual(
+            gitchangelog.ReSub(r'a', 'b', count=1, flags=re.I)("AaA"),
+            "baA")
+        with self.assertRaises(TypeError):
+            gitchangelog.ReSub(r'a', 'b', foo=1)
+        with self.assertRaises(re.error):
+            gitchangelog.ReSub(r'(', 'b')
+
+    def test_wrap(self):
+        text = textwrap.dedent("""\
+            New: first paragraph which is quite long, don't you think ? Well, I think so.
+            Fix: second""")  ## noqa
+        self.assertEqual(
+            gitchangelog.Wrap(r'\n(?=\w+\s*:)')(text),
+            gitchangelog.paragraph_wrap(text, r'\n(?=\w+\s*:)'))
+        self.assertEqual(gitchangelog.Wrap()(text),
+                         gitchangelog.paragraph_wrap(text))
+
+    def test_invalid_chain(self):
+        with self.assertRaises(SyntaxError):
+            gitchangelog.strip | (lambda text: text)
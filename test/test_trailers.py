@@ -0,0 +1,96 @@
+# -*- encoding: utf-8 -*-
+"""Testing trailers parsing of commit bodies
+
+"""
+
+from __future__ import unicode_literals
+
+import itertools
+import re
+import textwrap
+import unittest
+
+from .common import BaseGitReposTest, gitchangelog
+
+
+class TrailersStartTest(unittest.TestCase):
+
+    def test_same_as_regex(self):
+        lines = ["Key: v", "Co-Authored-By: Bob", "Ab:x", "ab: v", "Ab-: v",
+                 "Ab: ", "É: v", "  more", " ", "", "\t", "text"]
+        for nb_lines in range(5):
+            for body_lines in itertools.product(lines, repeat=nb_lines):
+                body = "\n".join(body_lines)
+                match = re.search(gitchangelog.REGEX_RFC822_POSTFIX, body)
+                self.assertEqual(
+                    gitchangelog.trailers_start(body),
+                    None if match is None else match.start(),
+                    msg="body=%r" % body)
+
+    def test_pathological_body(self):
+        body = "Key: value\n" + "\n \n" * 1000 + "text\nend of message"
+        self.assertEqual(gitchangelog.trailers_start(body), None)
+        body = "Key-Id: value\n" * 100000 + "end of message"
+        self.assertEqual(gitchangelog.trailers_start(body), None)
+        self.assertEqual(gitchangelog.trailers_start(body[:-15]), 0)
+
+
+class ParseTrailersTest(unittest.TestCase):
+
+    def test_multiline_values_and_lists(self):
+        body, trailers = gitchangelog.parse_trailers(textwrap.dedent("""\
+            Some text
+            Key: not a trailer
+            body
+
+            Value-X: Supports multi
+              line values
+                indented
+            Co-Authored-By: Bob
+            Co-Authored-By: Alice
+            """))
+        self.assertEqual(body, "Some text\nKey: not a trailer\nbody\n")
+        self.assertEqual(trailers, {
+            "trailer_value_x": "Supports multi\nline values\n  indented",
+            "trailer_co_authored_by": ["Bob", "Alice"],
+        })
+
+    def test_no_trailers(self):
+        self.assertEqual(gitchangelog.parse_trailers("Text\nKey: v\ntext"),
+                         ("Text\nKey: v\ntext", {}))
+
+
+class GitCommitTrailersTest(BaseGitReposTest):
+
+    def setUp(self):
+        super(GitCommitTrailersTest, self).setUp()
+
+        self.git.commit(
+            message=textwrap.dedent("""\
+                new: first commit
+
+                Some body
+
+                Change-Id: 1234
+                Co-Authored-By: Bob <bob@example.com>"""),
+            author='Alice <alice@example.com>',
+            allow_empty=True)
+
+    def test_parsed_only_when_requested(self):
+        commit = self.repos.commit("HEAD")
+        self.assertEqual(commit.subject, "new: first commit")
+        self.assertFalse(commit._trailer_parsed)
+        with self.assertRaises(AttributeError):
+            commit.unknown_attribute
+        self.assertFalse(commit._trailer_parsed)
+        self.assertEqual(commit.trailer_change_id, "1234")
+        self.assertTrue(commit._trailer_parsed)
+        self.assertEqual(commit.body, "Some body\n")
+        self.assertEqual(commit.author_names, ["Alice", "Bob"])
+
+    def test_body_parses_trailers(self):
+        commit = self.repos.commit("HEAD")
+        self.assertEqual(commit.body, "Some body\n")
+        self.assertEqual(commit.trailer_change_id, "1234")
+        with self.assertRaises(AttributeError):
+            commit.trailer_unknown
@@ -0,0 +1,90 @@
+# -*- encoding: utf-8 -*-
+"""Testing the text wrapping and indentation helpers
+
+"""
+
+from __future__ import unicode_literals
+
+import random
+import textwrap
+import unittest
+
+from .common import gitchangelog
+
+
+def old_indent(text, chars="  ", first=None):
+    """Former implementation of ``indent()``"""
+    if first:
+        first_line = text.split("\n")[0]
+        rest = '\n'.join(text.split("\n")[1:])
+        return '\n'.join([(first + first_line).rstrip(),
+                          old_indent(rest, chars=chars)])
+    return '\n'.join([(chars + line).rstrip()
+                      for line in text.split('\n')])
+
+
+ATOMS = ["a", "word", "longerword", "x" * 30, " ", "  ", "\n", "\r",
+         "\x0b", "\t", "-", "--", "é", "\xa0", " ", ".",
+         "verylongwordthatexceedswidthforsure"]
+
+
+def random_texts(nb, max_atoms=40, seed=0):
+    rand = random.Random(seed)
+    for _ in range(nb):
+        yield "".join(rand.choice(ATOMS)
+                      for _ in range(rand.randint(0, max_atoms)))
+
+
+class WrapTextTest(unittest.TestCase):
+
+    def test_same_as_textwrap(self):
+        for text in random_texts(5000):
+            for width in (5, 10, 20, 70):
+                self.assertEqual(
+                    gitchangelog.wrap_text(text, width),
+                    textwrap.wrap(text, width),
+                    msg="text=%r, width=%d" % (text, width))
+
+    def test_spaces(self):
+        for text in ["", " ", "   ", " a", "a ", "  a  b  ", "a" * 70 + " ",
+                     " " + "a" * 70, "a" * 35 + "  " + "b" * 35]:
+            self.assertEqual(gitchangelog.wrap_text(text),
+                             textwrap.wrap(text), msg="text=%r" % text)
+
+    def test_options(self):
+        text = "a few words to wrap"
+        self.assertEqual(
+            gitchangelog.wrap_text(text, width=8, initial_indent="> "),
+            textwrap.wrap(text, width=8, initial_indent="> "))
+
+
+class IndentTest(unittest.TestCase):
+
+    def test_same_as_former_implementation(self):
+        for text in ["", "\n", "a", "a\n", "a\nb", "a\n\n  b \n", "\n\na"]:
+            for kwargs in [{}, {"chars": "> "}, {"first": "- "},
+                           {"chars": "", "first": "* "}]:
+                self.assertEqual(
+                    gitchangelog.indent(text, **kwargs),
+                    old_indent(text, **kwargs),
+                    msg="text=%r, kwargs=%r" % (text, kwargs))
+
+
+class ParagraphWrapTest(unittest.TestCase):
+
+    def test_paragraphs(self):
+        text = ("word " * 20 + "\n\n" + "other " * 15).strip()
+        self.assertEqual(
+            gitchangelog.paragraph_wrap(text),
+            "\n".join(textwrap.wrap("word " * 20)) + "\n" +
+            "\n".join(textwrap.wrap("other " * 15)))
+
+
+@unittest.skipIf(gitchangelog.mako is None, "mako is not installed")
+class MakoEnvTest(unittest.TestCase):
+
+    def test_textwrap_helpers(self):
+        mako_textwrap = gitchangelog.mako_env["textwrap"]
+        self.assertIs(mako_textwrap.wrap, gitchangelog.wrap_text)
+        self.assertIs(mako_textwrap.dedent, textwrap.dedent)
+        self.assertEqual(mako_textwrap.fill("a b", width=1), "a\nb")